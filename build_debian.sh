@@ -279,6 +279,7 @@ sudo LANG=C DEBIAN_FRONTEND=noninteractive chroot $FILESYSTEM_ROOT apt-get -y in
     python-setuptools       \
     python3-setuptools      \
     python-apt              \
+    python-dbus             \
     traceroute              \
     iputils-ping            \
     net-tools               \
@@ -3,23 +3,23 @@
 RESTAPI_ARGS=""
 while true
 do
-    has_client_auth=$(sonic-cfggen -d -v "1 if RESTAPI and RESTAPI['config']")
-    if [ "$has_client_auth" == "1" ]; then
-        client_auth=$(sonic-cfggen -d -v "RESTAPI['config']['client_auth']")
-    fi
+    # Read all RESTAPI fields with a single CONFIG_DB dump
+    eval "$(sonic-cfggen -d --var-format shell \
+        -v "client_auth=RESTAPI['config']['client_auth'] if RESTAPI and RESTAPI['config']" \
+        -v "allow_insecure=RESTAPI['config']['allow_insecure'] if RESTAPI and RESTAPI['config']" \
+        -v "log_level=RESTAPI['config']['log_level'] if RESTAPI and RESTAPI['config']" \
+        -v "certs=RESTAPI['certs'] if RESTAPI and RESTAPI['certs']" \
+        -v "SERVER_CRT=RESTAPI['certs']['server_crt'] if RESTAPI and RESTAPI['certs']" \
+        -v "SERVER_KEY=RESTAPI['certs']['server_key'] if RESTAPI and RESTAPI['certs']" \
+        -v "CA_CRT=RESTAPI['certs']['ca_crt'] if RESTAPI and RESTAPI['certs']" \
+        -v "CLIENT_CRT_CNAME=RESTAPI['certs']['client_crt_cname'] if RESTAPI and RESTAPI['certs']")"
     if [[ $client_auth == 'true' ]]; then
-        certs=`sonic-cfggen -d -v "RESTAPI['certs']"`
-        allow_insecure=`sonic-cfggen -d -v "RESTAPI['config']['allow_insecure']"`
         if [[ $allow_insecure == 'true' ]]; then
             RESTAPI_ARGS=" -enablehttp=true"
         else
             RESTAPI_ARGS=" -enablehttp=false"
         fi
         if [[ -n "$certs" ]]; then
-                SERVER_CRT=`sonic-cfggen -d -v "RESTAPI['certs']['server_crt']"`
-                SERVER_KEY=`sonic-cfggen -d -v "RESTAPI['certs']['server_key']"`
-                CA_CRT=`sonic-cfggen -d -v "RESTAPI['certs']['ca_crt']"`
-                CLIENT_CRT_CNAME=`sonic-cfggen -d -v "RESTAPI['certs']['client_crt_cname']"`
                 if [[ -f $SERVER_CRT && -f $SERVER_KEY && -f $CA_CRT ]]; then
                     RESTAPI_ARGS+=" -enablehttps=true -servercert=$SERVER_CRT -serverkey=$SERVER_KEY -clientcert=$CA_CRT -clientcertcommonname=$CLIENT_CRT_CNAME"
                     break
@@ -30,7 +30,7 @@ do
     sleep 60
 done
 
-LOG_LEVEL=`sonic-cfggen -d -v "RESTAPI['config']['log_level']"`
+LOG_LEVEL=$log_level
 if [ ! -z $LOG_LEVEL ]; then
     RESTAPI_ARGS+=" -loglevel=$LOG_LEVEL"
 else
@@ -0,0 +1,343 @@
+#!/usr/bin/env python
+"""bgpcfgd_bench.py
+
+Measure the throughput of bgpcfgd: the real Runner with all the managers
+created by main.do_work() processes the scenarios below, and the time until
+bgpcfgd has nothing left to do is reported for each of them.
+
+The redis subscriptions are replaced with an in-memory stand-in: the writes
+of a scenario are queued to the SubscriberStateTable objects following the
+table, and Select returns the subscribers with queued messages. FRR is
+replaced with a fake, which records the vtysh invocations and the config
+lines pushed, and simulates their latency: a vtysh process per command
+(--vtysh-latency, the vty_bench.py measurement by default) or a command
+through the persistent vtysh socket of a daemon (--vty-latency).
+Run it with the python of bgpcfgd: the peer templates use dict.has_key().
+
+Scenarios:
+    base        DEVICE_METADATA and Loopback0
+    neighbors   NEIGHBORS BGP neighbors with their interfaces
+    allow-list  ALLOW_LISTS allow-list entries set and deleted, ROUNDS times
+    flaps       the interfaces of one neighbor out of ten removed and
+                restored, ROUNDS times
+
+Usage:
+    bgpcfgd_bench.py [-n NEIGHBORS] [-a ALLOW_LISTS] [-r ROUNDS]
+                     [--vtysh-latency MS] [--vty-latency MS]
+"""
+
+from __future__ import print_function
+
+import argparse
+import collections
+import functools
+import os
+import sys
+import syslog
+import time
+import types
+
+import yaml
+
+BENCH_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+REPO_DIR = os.path.join(BENCH_DIR, '..', '..', '..')
+TEMPLATE_PATH = os.path.join(REPO_DIR, 'dockers', 'docker-fpm-frr', 'frr')
+CONSTANTS_PATH = os.path.join(REPO_DIR, 'files', 'image_config', 'constants', 'constants.yml')
+
+RUNNING_CONFIG = """!
+router bgp 65100
+ bgp router-id 10.1.0.32
+!
+line vty
+!
+"""
+
+TABLE_NAMES = {
+    'CFG_DEVICE_METADATA_TABLE_NAME': 'DEVICE_METADATA',
+    'CFG_DEVICE_NEIGHBOR_METADATA_TABLE_NAME': 'DEVICE_NEIGHBOR_METADATA',
+    'CFG_INTF_TABLE_NAME': 'INTERFACE',
+    'CFG_LOOPBACK_INTERFACE_TABLE_NAME': 'LOOPBACK_INTERFACE',
+    'CFG_VLAN_INTF_TABLE_NAME': 'VLAN_INTERFACE',
+    'CFG_LAG_INTF_TABLE_NAME': 'PORTCHANNEL_INTERFACE',
+    'CFG_BGP_NEIGHBOR_TABLE_NAME': 'BGP_NEIGHBOR',
+    'STATE_INTERFACE_TABLE_NAME': 'INTERFACE_TABLE',
+}
+DB_IDS = {'CONFIG_DB': 4, 'STATE_DB': 6}
+
+
+class FakeDB(object):
+    """ In-memory stand-in for redis: the writes are queued to the subscribers of the table """
+    def __init__(self):
+        self.subscribers = collections.defaultdict(list)  # (db name, table) -> subscribers
+        self.writes = 0
+
+    def set(self, db_name, table, key, fvs):
+        self.write(db_name, table, key, 'SET', tuple(fvs.items()) or (('NULL', 'NULL'),))  # as ConfigDBConnector does
+
+    def delete(self, db_name, table, key):
+        self.write(db_name, table, key, 'DEL', ())
+
+    def write(self, db_name, table, key, op, fvs):
+        self.writes += 1
+        for subscriber in self.subscribers[(db_name, table)]:
+            subscriber.messages.append((key, op, fvs))
+
+
+class DBConnector(object):
+    def __init__(self, db_name, _):
+        self.db_name = db_name
+
+    def getDbId(self):
+        return DB_IDS[self.db_name]
+
+
+class SubscriberStateTable(object):
+    db = None  # FakeDB object
+
+    def __init__(self, conn, table_name):
+        self.conn = conn
+        self.table_name = table_name
+        self.messages = collections.deque()
+        self.db.subscribers[(conn.db_name, table_name)].append(self)
+
+    def getDbConnector(self):
+        return self.conn
+
+    def getTableName(self):
+        return self.table_name
+
+    def pop(self):
+        if not self.messages:
+            return "", "", ()
+        return self.messages.popleft()
+
+
+class Select(object):
+    OBJECT, ERROR, TIMEOUT = range(3)
+    on_idle = None  # called when no subscriber has messages. Returns False when the benchmark is over
+
+    def __init__(self):
+        self.selectables = []
+
+    def addSelectable(self, selectable):
+        self.selectables.append(selectable)
+
+    def select(self, _):
+        for selectable in self.selectables:
+            if selectable.messages:
+                return self.OBJECT, selectable
+        if self.on_idle():
+            return self.select(0)
+        return self.TIMEOUT, None
+
+
+def install_swsscommon(db):
+    """ Install the in-memory stand-in of the swsscommon module, used by bgpcfgd """
+    SubscriberStateTable.db = db
+    module = types.ModuleType('swsscommon')
+    swsscommon = types.ModuleType('swsscommon.swsscommon')
+    swsscommon.SET_COMMAND = 'SET'
+    swsscommon.DEL_COMMAND = 'DEL'
+    for name, table in TABLE_NAMES.items():
+        setattr(swsscommon, name, table)
+    swsscommon.SonicDBConfig = types.ModuleType('SonicDBConfig')
+    swsscommon.SonicDBConfig.getDbId = DB_IDS.get
+    swsscommon.DBConnector = DBConnector
+    swsscommon.SubscriberStateTable = SubscriberStateTable
+    swsscommon.Select = Select
+    module.swsscommon = swsscommon
+    sys.modules['swsscommon'] = module
+    sys.modules['swsscommon.swsscommon'] = swsscommon
+
+
+class FakeFrr(object):
+    """ Record the vtysh invocations of bgpcfgd and simulate their latency """
+    def __init__(self, vtysh_latency, vty_latency):
+        self.vtysh_latency = vtysh_latency
+        self.vty_latency = vty_latency
+        self.counters = collections.Counter()
+
+    def run_command(self, command, shell=False, hide_errors=False):
+        """ utils.run_command() for the vtysh commands """
+        time.sleep(self.vtysh_latency)
+        if command[:2] == ['vtysh', '-f']:
+            self.counters['vtysh -f'] += 1
+            with open(command[2]) as fp:
+                lines = [line.strip() for line in fp]
+            self.counters['config lines'] += sum(1 for line in lines if line and not line.startswith('!'))
+            self.counters['neighbors'] += sum(1 for line in lines if line.startswith('neighbor ') and ' remote-as ' in line)
+            return 0, "", ""
+        self.counters['vtysh -c'] += 1
+        if command[:3] == ['vtysh', '-c', 'show running-config']:
+            return 0, RUNNING_CONFIG, ""
+        return 0, "", ""
+
+    def run_vtysh_command(self, command, daemon="bgpd", hide_errors=False):
+        """ utils.run_vtysh_command() """
+        time.sleep(self.vty_latency)
+        self.counters['vty'] += 1
+        if command == "show bgp vrf all summary json":
+            return 0, "{}", ""
+        return 0, "", ""
+
+
+def neighbor_addresses(n):
+    """ :return: local and neighbor ipv4 addresses of the n-th point-to-point link """
+    local = 2 * n
+    def address(value):
+        return '10.%d.%d.%d' % (value >> 16 & 255, value >> 8 & 255, value & 255)
+    return address(local), address(local + 1)
+
+
+def base_scenario(db):
+    db.set('CONFIG_DB', 'DEVICE_METADATA', 'localhost', {
+        'bgp_asn': '65100', 'hostname': 'bench', 'type': 'ToRRouter',
+        'docker_routing_config_mode': 'separated', 'sub_role': 'FrontEnd',
+    })
+    db.set('CONFIG_DB', 'LOOPBACK_INTERFACE', 'Loopback0', {})
+    db.set('CONFIG_DB', 'LOOPBACK_INTERFACE', 'Loopback0|10.1.0.32/32', {})
+    db.set('STATE_DB', 'INTERFACE_TABLE', 'Loopback0|10.1.0.32/32', {'state': 'ok'})
+
+
+def set_interface(db, n):
+    local, _ = neighbor_addresses(n)
+    key = 'Ethernet%d|%s/31' % (4 * n, local)
+    db.set('CONFIG_DB', 'INTERFACE', key, {})
+    db.set('STATE_DB', 'INTERFACE_TABLE', key, {'state': 'ok'})
+
+
+def del_interface(db, n):
+    local, _ = neighbor_addresses(n)
+    key = 'Ethernet%d|%s/31' % (4 * n, local)
+    db.delete('STATE_DB', 'INTERFACE_TABLE', key)
+    db.delete('CONFIG_DB', 'INTERFACE', key)
+
+
+def neighbors_scenario(db, neighbors):
+    for n in range(neighbors):
+        local, neighbor = neighbor_addresses(n)
+        db.set('CONFIG_DB', 'INTERFACE', 'Ethernet%d' % (4 * n), {})
+        set_interface(db, n)
+        db.set('CONFIG_DB', 'BGP_NEIGHBOR', neighbor, {
+            'asn': str(64600 + n % 1000), 'name': 'ARISTA%02dT0' % (n % 100), 'local_addr': local,
+            'holdtime': '180', 'keepalive': '60', 'admin_status': 'up', 'nhopself': '0', 'rrclient': '0',
+        })
+
+
+def allow_list_scenario(db, allow_lists, op):
+    for n in range(allow_lists):
+        key = 'DEPLOYMENT_ID|0|%d:%d' % (1010 + n, 2020)
+        if op == 'SET':
+            db.set('CONFIG_DB', 'BGP_ALLOWED_PREFIXES', key, {
+                'prefixes_v4': ','.join('10.%d.%d.0/24' % (200 + n // 256 % 50, n % 256 + i) for i in range(4)),
+                'prefixes_v6': 'fc01:%x::/64' % n,
+            })
+        else:
+            db.delete('CONFIG_DB', 'BGP_ALLOWED_PREFIXES', key)
+
+
+def flaps_scenario(db, neighbors, op):
+    for n in range(0, neighbors, 10):
+        if op == 'SET':
+            set_interface(db, n)
+        else:
+            del_interface(db, n)
+
+
+class Bench(object):
+    """ Feed the scenarios to bgpcfgd one by one and measure them """
+    def __init__(self, db, frr, phases):
+        self.db = db
+        self.frr = frr
+        self.phases = collections.deque(phases)
+        self.runner = None
+        self.results = collections.OrderedDict()  # scenario -> Counter
+        self.current = None
+
+    def on_idle(self):
+        """
+        Finish the current phase and start the next one
+        :return: False, when there are no phases left
+        """
+        now = time.time()
+        if self.current is not None:
+            name, start, writes, received, frr_counters = self.current
+            result = self.results.setdefault(name, collections.Counter())
+            result['time'] += now - start
+            result['writes'] += self.db.writes - writes
+            result['events'] += self.runner.counters['received'] - received
+            result.update(self.frr.counters - frr_counters)
+        if not self.phases:
+            import bgpcfgd.runner
+            bgpcfgd.runner.g_run = False
+            return False
+        name, phase = self.phases.popleft()
+        self.current = name, time.time(), self.db.writes, self.runner.counters['received'], collections.Counter(self.frr.counters)
+        phase(self.db)
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bgpcfgd with an in-memory redis and a fake FRR")
+    parser.add_argument("-n", "--neighbors", help="number of BGP neighbors", type=int, default=1000)
+    parser.add_argument("-a", "--allow-lists", help="number of allow-list entries", type=int, default=20)
+    parser.add_argument("-r", "--rounds", help="rounds of allow-list churn and interface flaps", type=int, default=3)
+    parser.add_argument("--vtysh-latency", help="milliseconds per vtysh process", type=float, default=2.0)
+    parser.add_argument("--vty-latency", help="milliseconds per command on a vtysh socket", type=float, default=0.1)
+    args = parser.parse_args()
+
+    db = FakeDB()
+    install_swsscommon(db)
+    syslog.syslog = lambda *_: None  # bgpcfgd logs every peer. Keep the syslog of the host clean
+
+    import bgpcfgd.config
+    import bgpcfgd.main
+    import bgpcfgd.managers_allow_list
+    import bgpcfgd.managers_bgp
+    import bgpcfgd.utils
+
+    frr = FakeFrr(args.vtysh_latency / 1000.0, args.vty_latency / 1000.0)
+    for module in [bgpcfgd.utils, bgpcfgd.config, bgpcfgd.managers_allow_list]:
+        module.run_command = frr.run_command
+    for module in [bgpcfgd.utils, bgpcfgd.managers_bgp]:
+        module.run_vtysh_command = frr.run_vtysh_command
+
+    phases = [('base', base_scenario), ('neighbors', functools.partial(neighbors_scenario, neighbors=args.neighbors))]
+    for _ in range(args.rounds):
+        phases.append(('allow-list', functools.partial(allow_list_scenario, allow_lists=args.allow_lists, op='SET')))
+        phases.append(('allow-list', functools.partial(allow_list_scenario, allow_lists=args.allow_lists, op='DEL')))
+    for _ in range(args.rounds):
+        phases.append(('flaps', functools.partial(flaps_scenario, neighbors=args.neighbors, op='DEL')))
+        phases.append(('flaps', functools.partial(flaps_scenario, neighbors=args.neighbors, op='SET')))
+    bench = Bench(db, frr, phases)
+    Select.on_idle = staticmethod(bench.on_idle)
+
+    class BenchRunner(bgpcfgd.main.Runner):
+        def __init__(self, *args):
+            super(BenchRunner, self).__init__(*args)
+            bench.runner = self
+
+    with open(CONSTANTS_PATH) as fp:
+        constants = yaml.safe_load(fp)["constants"]
+    bgpcfgd.main.wait_for_daemons = lambda daemons, seconds: None
+    bgpcfgd.main.read_constants = lambda: constants
+    bgpcfgd.main.TemplateFabric = functools.partial(bgpcfgd.main.TemplateFabric, TEMPLATE_PATH)
+    bgpcfgd.main.Runner = BenchRunner
+
+    start = time.time()
+    bgpcfgd.main.do_work()
+    total = time.time() - start
+
+    print("%-12s %8s %8s %9s %10s %8s %8s %6s %12s %9s" % ("scenario", "writes", "events", "events/s", "converge", "vtysh-f",
+                                                           "vtysh-c", "vty", "config lines", "neighbors"))
+    for name, result in bench.results.items():
+        print("%-12s %8d %8d %9.0f %8.3f s %8d %8d %6d %12d %9d" % (
+            name, result['writes'], result['events'], result['events'] / result['time'] if result['time'] else 0,
+            result['time'], result['vtysh -f'], result['vtysh -c'], result['vty'], result['config lines'], result['neighbors']))
+    print("total: %.3f s" % total)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+"""vty_bench.py
+
+Compare a vtysh process per command (utils.run_command) with the persistent
+connection to the vtysh socket of the daemon (utils.run_vtysh_command) on the
+commands bgpcfgd used to run while loading the peers of each BGP peer manager:
+'show bgp vrfs json' and 'show bgp vrf <vrf> neighbors json' per vrf.
+The single 'show bgp vrf all summary json' command, which BGPPeerInventory
+runs once for all the peer managers, is measured too.
+
+The peer config push is measured too: instance.conf.j2 is rendered for PEERS
+peers, and the 'router bgp' commands are pushed with a 'vtysh -f' process per
+peer (ConfigMgr.write_file(), as bgpcfgd does outside of a transaction), with
+one 'vtysh -f' process for all of them (a transaction), and line by line
+through the persistent connection to the vtysh socket.
+
+The daemon is a fake one, which serves the vtysh protocol on a unix socket.
+The vtysh process is a shell script printing a prepared response, so its cost
+is a lower bound of the cost of the real vtysh, which also connects to all the
+FRR daemons on start.
+
+Usage:
+    vty_bench.py [-v VRFS] [-n NEIGHBORS] [-p PEERS] [-i ITERATIONS]
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+from bgpcfgd import utils
+from bgpcfgd.config import ConfigMgr
+from bgpcfgd.template import TemplateFabric
+from bgpcfgd.vty import VtyClient
+
+TEMPLATE_PATH = os.path.join(BENCH_DIR, '..', '..', '..', 'dockers', 'docker-fpm-frr', 'frr')
+BGP_ASN = '65100'
+
+
+class TemplateDict(dict):
+    """ dict with has_key(), used by the peer templates, under python 3 too """
+    def has_key(self, key):
+        return key in self
+
+
+def make_responses(vrfs, neighbors):
+    """ :return: dict of command to the daemon output """
+    names = ['default'] + ['Vrf%d' % i for i in range(1, vrfs)]
+    responses = {'show bgp vrfs json': json.dumps({'vrfs': dict((name, {}) for name in names)})}
+    summary = {}
+    for name in names:
+        addresses = ['10.%d.%d.%d' % (i // 65536, i // 256 % 256, i % 256) for i in range(neighbors)]
+        peers = dict((address, {'remoteAs': 65200, 'bgpState': 'Established', 'hostname': 'ARISTA01T1',
+                                'nbrDesc': 'ARISTA01T1', 'localAs': 65100, 'bgpVersion': 4, 'connectionsEstablished': 1})
+                     for address in addresses)
+        responses['show bgp vrf %s neighbors json' % name] = json.dumps(peers)
+        summary[name] = {'ipv4Unicast': {'vrfName': name, 'peers': dict((address, {'remoteAs': 65200, 'state': 'Established'})
+                                                                         for address in addresses)}}
+    responses['show bgp vrf all summary json'] = json.dumps(summary)
+    return responses
+
+
+def serve(sock, responses):
+    """ Serve the vtysh protocol on a listening unix socket """
+    while True:
+        conn, _ = sock.accept()
+        buf = b''
+        while True:
+            data = conn.recv(65536)
+            if not data:
+                break
+            buf += data
+            while b'\0' in buf:
+                command, buf = buf.split(b'\0', 1)
+                out = responses.get(command.decode(), '')
+                conn.sendall(out.encode() + b'\0\0\0\0')
+
+
+def make_vtysh(work_dir, responses):
+    """ Create a fake vtysh script printing the prepared responses. :return: directory to add to PATH """
+    bin_dir = os.path.join(work_dir, 'bin')
+    os.mkdir(bin_dir)
+    script = ['#!/bin/sh', 'case "$1" in', '  -f) cat "$2" > /dev/null ;;', '  -c) case "$2" in']
+    for n, (command, out) in enumerate(sorted(responses.items())):
+        out_file = os.path.join(work_dir, 'out%d' % n)
+        with open(out_file, 'w') as fp:
+            fp.write(out)
+        script.append('    "%s") cat %s ;;' % (command, out_file))
+    script += ['  esac ;;', 'esac']
+    vtysh = os.path.join(bin_dir, 'vtysh')
+    with open(vtysh, 'w') as fp:
+        fp.write('\n'.join(script) + '\n')
+    os.chmod(vtysh, 0o755)
+    return bin_dir
+
+
+def load_peers(run):
+    """ The commands of BGPPeerMgrBase.load_peers(). :return: number of peers """
+    ret_code, out, _ = run('show bgp vrfs json')
+    assert ret_code == 0
+    peers = 0
+    for vrf in json.loads(out)['vrfs']:
+        ret_code, out, _ = run('show bgp vrf %s neighbors json' % vrf)
+        assert ret_code == 0
+        peers += len(json.loads(out))
+    return peers
+
+
+def load_summary(run):
+    """ The command of BGPPeerInventory.load_peers(). :return: number of peers """
+    ret_code, out, _ = run('show bgp vrf all summary json')
+    assert ret_code == 0
+    return sum(len(afs['ipv4Unicast']['peers']) for afs in json.loads(out).values())
+
+
+def render_peers(peers):
+    """ Render instance.conf.j2 as BGPPeerMgrBase.add_peer() does. :return: list of the commands to push per peer """
+    template = TemplateFabric(TEMPLATE_PATH).from_file('bgpd/templates/general/instance.conf.j2')
+    metadata = {'localhost': TemplateDict({'bgp_asn': BGP_ASN, 'type': 'LeafRouter', 'sub_role': 'FrontEnd'})}
+    cmds = []
+    for i in range(peers):
+        address = '10.%d.%d.%d' % (i // 32768, i // 128 % 256, i % 128 * 2 + 1)
+        session = TemplateDict({'asn': '65200', 'name': 'ARISTA%02dT1' % i, 'local_addr': '10.0.0.0',
+                                'admin_status': 'up', 'holdtime': '180', 'keepalive': '60'})
+        rendered = template.render(CONFIG_DB__DEVICE_METADATA=metadata, constants={}, bgp_asn=BGP_ASN, vrf='default',
+                                   neighbor_addr=address, bgp_session=session, loopback0_ipv4='10.1.0.32/32')
+        cmds.append(('router bgp %s\n' % BGP_ASN) + rendered)  # as BGPPeerMgrBase.apply_op()
+    return cmds
+
+
+def config_lines(cmd):
+    """ :return: the lines of the command vtysh sends to the daemon, without the comments """
+    return [line for line in cmd.split("\n") if line.strip() and not line.lstrip().startswith('!')]
+
+
+def push_vtysh(cmds):
+    """ A 'vtysh -f' process per peer """
+    for cmd in cmds:
+        assert ConfigMgr.write_file(cmd)[0] == 0
+
+
+def push_vtysh_batch(cmds):
+    """ One 'vtysh -f' process for all the peers, as ConfigMgr.flush() does """
+    assert ConfigMgr.write_file("\n".join(cmds))[0] == 0
+
+
+def push_vty(cmds):
+    """ The config lines of every peer through the persistent connection, as vtysh sends them to the daemon """
+    for cmd in cmds:
+        for line in ['configure terminal'] + config_lines(cmd) + ['end']:
+            assert utils.run_vtysh_command(line)[0] == 0
+
+
+def best_time(function, iterations):
+    elapsed = []
+    for _ in range(iterations):
+        start = time.time()
+        function()
+        elapsed.append(time.time() - start)
+    return min(elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vtysh processes against a persistent vtysh socket connection")
+    parser.add_argument("-v", "--vrfs", type=int, default=16)
+    parser.add_argument("-n", "--neighbors", help="number of neighbors per vrf", type=int, default=64)
+    parser.add_argument("-p", "--peers", help="number of peers to push", type=int, default=256)
+    parser.add_argument("-i", "--iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    responses = make_responses(args.vrfs, args.neighbors)
+    work_dir = tempfile.mkdtemp()
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(os.path.join(work_dir, 'bgpd.vty'))
+        sock.listen(1)
+        thread = threading.Thread(target=serve, args=(sock, responses))
+        thread.daemon = True
+        thread.start()
+        os.environ['PATH'] = make_vtysh(work_dir, responses) + os.pathsep + os.environ['PATH']
+        utils.vty_clients['bgpd'] = VtyClient('bgpd', vty_dir=work_dir)
+
+        spawn = lambda command: utils.run_command(['vtysh', '-c', command])
+        peers = load_peers(spawn)
+        assert load_peers(utils.run_vtysh_command) == peers
+        commands = 1 + args.vrfs
+        assert load_summary(utils.run_vtysh_command) == peers
+        per_process = best_time(lambda: load_peers(spawn), args.iterations)
+        persistent = best_time(lambda: load_peers(utils.run_vtysh_command), args.iterations)
+        summary = best_time(lambda: load_summary(utils.run_vtysh_command), args.iterations)
+        cmds = render_peers(args.peers)
+        lines = sum(len(config_lines(cmd)) for cmd in cmds)
+        push_per_peer = best_time(lambda: push_vtysh(cmds), args.iterations)
+        push_batch = best_time(lambda: push_vtysh_batch(cmds), args.iterations)
+        push_persistent = best_time(lambda: push_vty(cmds), args.iterations)
+
+        print("vrfs: %d, peers: %d, commands per load_peers: %d" % (args.vrfs, peers, commands))
+        print("vtysh process per command:  %.4f s (%.2f ms per command)" % (per_process, per_process * 1000 / commands))
+        print("persistent vty connection:  %.4f s (%.2f ms per command)" % (persistent, persistent * 1000 / commands))
+        print("one summary command:        %.4f s (%d bytes instead of %d)" % (
+            summary, len(responses['show bgp vrf all summary json']),
+            sum(len(out) for command, out in responses.items() if command.endswith('neighbors json'))))
+        print("peers pushed: %d, config lines: %d" % (args.peers, lines))
+        print("vtysh -f process per peer:  %.4f s (%.0f peers/s)" % (push_per_peer, args.peers / push_per_peer))
+        print("one vtysh -f process:       %.4f s (%.0f peers/s)" % (push_batch, args.peers / push_batch))
+        print("persistent vty connection:  %.4f s (%.0f peers/s)" % (push_persistent, args.peers / push_persistent))
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
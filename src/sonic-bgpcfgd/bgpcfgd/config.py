@@ -1,26 +1,67 @@
 import os
+import re
 import tempfile
+from contextlib import contextmanager
 
 from .vars import g_debug
-from .log import log_crit, log_err
+from .log import log_crit, log_err, log_debug
 from .utils import run_command
 
 
 class ConfigMgr(object):
     """ The class represents frr configuration """
+    VTYSH_ERROR_LINE = re.compile(r"^line (\d+):", re.MULTILINE)
+
     def __init__(self):
         self.current_config = None
         self.current_config_raw = None
+        self.running_config = None  # RunningConfig. None if it must be read from FRR again
+        self.pending = None  # list of (cmd, on_failure) while a transaction is open
+        self.failure_handlers = []  # stack of callbacks for the commands pushed in a transaction
+
+    def start_transaction(self):
+        """
+        Start accumulating the pushed commands. They are applied to FRR with one vtysh call
+        by flush() or end_transaction()
+        """
+        if self.pending is None:
+            self.pending = []
+
+    def end_transaction(self):
+        """
+        Apply the accumulated commands and stop accumulating
+        :return: True if all the accumulated commands were applied successfully, False otherwise
+        """
+        rc = self.flush()
+        self.pending = None
+        return rc
+
+    @contextmanager
+    def on_failure(self, callback):
+        """
+        Attribute the commands pushed inside of the 'with' block to the callback.
+        The callback is called without arguments if the commands were accumulated
+        by a transaction and fail when the transaction is applied
+        :param callback: function to call on failure
+        """
+        self.failure_handlers.append(callback)
+        try:
+            yield
+        finally:
+            self.failure_handlers.pop()
 
     def reset(self):
         """ Reset stored config """
         self.current_config = None
         self.current_config_raw = None
+        self.running_config = None
 
     def update(self):
         """ Read current config from FRR """
+        self.flush()  # the config must include the accumulated commands
         self.current_config = None
         self.current_config_raw = None
+        self.running_config = None
         ret_code, out, err = run_command(["vtysh", "-c", "show running-config"])
         if ret_code != 0:
             # FIXME: should we throw exception here?
@@ -34,17 +75,107 @@ class ConfigMgr(object):
         text += ["     "]  # Add empty line to have something to work on, if there is no text
         self.current_config_raw = text
         self.current_config = self.to_canonical(out)  # FIXME: use test as an input
+        self.running_config = RunningConfig(text)
+
+    def get_running_config(self):
+        """
+        Return the parsed running config. It is read from FRR only if the pushed changes couldn't be applied to it
+        :return: RunningConfig object. None if the running config can't be read
+        """
+        self.flush()
+        if self.running_config is None:
+            self.update()
+        return self.running_config
+
+    def on_push_success(self, cmd):
+        """
+        Update the stored config with the pushed changes
+        :param cmd: configuration change which was applied to FRR
+        """
+        self.current_config = None  # invalidate config
+        self.current_config_raw = None
+        if self.running_config is not None and not self.running_config.apply(cmd.split("\n")):
+            self.running_config = None
 
     def push_list(self, cmdlist):
         return self.push("\n".join(cmdlist))
 
     def push(self, cmd):
         """
-        Push new changes to FRR
+        Push new changes to FRR. Inside of a transaction the change is only accumulated
         :param cmd: configuration change for FRR. Type: String
-        :return: True if change was applied successfully, False otherwise
+        :return: True if change was applied (or accumulated) successfully, False otherwise
+        """
+        if self.pending is None:
+            return self.write(cmd)
+        on_failure = self.failure_handlers[-1] if self.failure_handlers else None
+        self.pending.append((cmd, on_failure))
+        return True
+
+    def flush(self):
         """
-        return self.write(cmd)
+        Apply the commands accumulated by the transaction with one vtysh call.
+        If vtysh reports errors, the failed commands are found by the line numbers of the
+        errors, or by applying the commands of each failure callback separately
+        when vtysh doesn't report the line numbers. The failure callbacks of the failed
+        commands are called
+        :return: True if all the accumulated commands were applied successfully, False otherwise
+        """
+        if not self.pending:
+            return True
+        pending, self.pending = self.pending, []
+        log_debug("ConfigMgr::flush(): apply %d accumulated commands" % len(pending))
+        ret_code, out, err = self.write_file("\n".join(cmd for cmd, _ in pending))
+        if ret_code == 0:
+            for cmd, _ in pending:
+                self.on_push_success(cmd)
+            return True
+        failed = self.find_failed(pending, out, err)
+        if failed is None:
+            failed = self.replay(pending)
+        # the commands before and after the failed ones were applied
+        self.current_config = None
+        self.current_config_raw = None
+        self.running_config = None
+        for cmd, on_failure in failed:
+            log_err("ConfigMgr::flush(): can't push configuration '%s'" % str(cmd))
+            if on_failure is not None:
+                on_failure()
+        return False
+
+    def find_failed(self, pending, out, err):
+        """
+        Find accumulated commands, which vtysh reported as failed
+        :param pending: list of (cmd, on_failure) written as one file
+        :param out: vtysh stdout
+        :param err: vtysh stderr
+        :return: list of failed (cmd, on_failure) pairs. None if vtysh output doesn't have line numbers
+        """
+        error_lines = set(int(n) for n in self.VTYSH_ERROR_LINE.findall("%s\n%s" % (out, err)))
+        if not error_lines:
+            return None
+        failed = []
+        first_line = 1
+        for cmd, on_failure in pending:
+            last_line = first_line + cmd.count("\n")
+            if any(first_line <= n <= last_line for n in error_lines):
+                failed.append((cmd, on_failure))
+            first_line = last_line + 1
+        return failed
+
+    def replay(self, pending):
+        """
+        Apply accumulated commands grouped by their failure callbacks, one vtysh call per group
+        :param pending: list of (cmd, on_failure)
+        :return: list of failed (cmd, on_failure) pairs
+        """
+        groups = []
+        for cmd, on_failure in pending:
+            if on_failure is not None and groups and groups[-1][1] is on_failure:
+                groups[-1] = (groups[-1][0] + "\n" + cmd, on_failure)
+            else:
+                groups.append((cmd, on_failure))
+        return [(cmd, on_failure) for cmd, on_failure in groups if not self.write(cmd)]
 
     def write(self, cmd):
         """
@@ -52,6 +183,21 @@ class ConfigMgr(object):
         :param cmd: new configuration to write into FRR. Type: String
         :return: True if change was applied successfully, False otherwise
         """
+        ret_code, out, err = self.write_file(cmd)
+        if ret_code != 0:
+            err_tuple = str(cmd), ret_code, out, err
+            log_err("ConfigMgr::push(): can't push configuration '%s', rc='%d', stdout='%s', stderr='%s'" % err_tuple)
+        if ret_code == 0:
+            self.on_push_success(cmd)
+        return ret_code == 0
+
+    @staticmethod
+    def write_file(cmd):
+        """
+        Apply configuration to FRR through a temporary file
+        :param cmd: configuration to apply. Type: String
+        :return: Tuple: vtysh exit code, stdout, stderr
+        """
         fd, tmp_filename = tempfile.mkstemp(dir='/tmp')
         os.close(fd)
         with open(tmp_filename, 'w') as fp:
@@ -60,13 +206,7 @@ class ConfigMgr(object):
         ret_code, out, err = run_command(command)
         if not g_debug:
             os.remove(tmp_filename)
-        if ret_code != 0:
-            err_tuple = str(cmd), ret_code, out, err
-            log_err("ConfigMgr::push(): can't push configuration '%s', rc='%d', stdout='%s', stderr='%s'" % err_tuple)
-        if ret_code == 0:
-            self.current_config = None  # invalidate config
-            self.current_config_raw = None
-        return ret_code == 0
+        return ret_code, out, err
 
     def get_text(self):
         return self.current_config_raw
@@ -118,4 +258,172 @@ class ConfigMgr(object):
             spaces = len(lines) - 1
             out += " " * spaces + lines[-1] + "\n"
 
-        return out
\ No newline at end of file
+        return out
+
+
+class RunningConfig(object):
+    """ FRR running config, indexed by the entities which bgpcfgd reads:
+        prefix-lists, community-lists, route-map entries and peer-groups.
+        It can be updated with the pushed changes, so it doesn't have to be read from FRR after every push
+    """
+    RE_PREFIX_LIST = re.compile(r'^(ip|ipv6) prefix-list (\S+) seq (\d+) (.+)$')
+    RE_NO_PREFIX_LIST = re.compile(r'^no (ip|ipv6) prefix-list (\S+)$')
+    RE_COMMUNITY_LIST = re.compile(r'^bgp community-list standard (\S+) permit (.+)$')
+    RE_NO_COMMUNITY_LIST = re.compile(r'^no bgp community-list standard (\S+)$')
+    RE_ROUTE_MAP = re.compile(r'^route-map (\S+) permit (\d+)$')
+    RE_NO_ROUTE_MAP = re.compile(r'^no route-map (\S+) permit (\d+)$')
+    RE_PEER_GROUP = re.compile(r'^\s*neighbor (\S+) peer-group$')
+    RE_PEER_GROUP_RM_IN = re.compile(r'^\s*neighbor (\S+) route-map (\S+) in$')
+    RE_CALL = re.compile(r'^call (\S+)$')
+
+    def __init__(self, lines):
+        """
+        Parse the running config
+        :param lines: lines of the running config
+        """
+        self.prefix_lists = {}      # (family, name) -> { seq: rule }
+        self.community_lists = {}   # name -> list of the permitted communities
+        self.route_maps = {}        # name -> { seq: list of the stripped lines of the 'permit' entry }
+        self.peer_groups = []       # names of the peer-groups
+        self.peer_group_rm_in = {}  # peer-group name -> list of the 'in' route-maps of the peer-group
+        self.parse(lines, False)
+
+    def apply(self, lines):
+        """
+        Apply pushed changes
+        :param lines: lines of the pushed configuration
+        :return: False if the changes could modify the indexed entities in a way which is not tracked.
+                 The running config must be read again in this case
+        """
+        return self.parse(lines, True)
+
+    def parse(self, lines, strict):
+        """
+        Parse lines of the configuration into the indexes
+        :param lines: lines to parse
+        :param strict: when True, fail on lines which could modify the indexed entities in an unknown way
+        :return: False if a line wasn't understood in the strict mode, True otherwise
+        """
+        route_map_entry = None  # lines of the route-map entry, which is parsed now
+        for line in lines:
+            s_line = line.strip()
+            if not s_line or s_line.startswith('!'):
+                continue
+            if line[0].isspace():
+                if route_map_entry is not None:
+                    if strict and s_line.startswith('no '):
+                        return False
+                    route_map_entry.append(s_line)
+                elif not self.parse_neighbor(line, strict):
+                    return False
+                continue
+            route_map_entry = None
+            m = self.RE_ROUTE_MAP.match(line)
+            if m:
+                route_map_entry = self.route_maps.setdefault(m.group(1), {}).setdefault(int(m.group(2)), [])
+            elif not self.parse_top_level(line) and strict and not line.startswith('router bgp '):
+                return False
+        return True
+
+    def parse_top_level(self, line):
+        """
+        Parse a top level line, which is not a route-map entry
+        :param line: line to parse
+        :return: True if the line was understood
+        """
+        m = self.RE_PREFIX_LIST.match(line)
+        if m:
+            self.prefix_lists.setdefault((m.group(1), m.group(2)), {})[int(m.group(3))] = m.group(4)
+            return True
+        m = self.RE_COMMUNITY_LIST.match(line)
+        if m:
+            communities = self.community_lists.setdefault(m.group(1), [])
+            if m.group(2) not in communities:
+                communities.append(m.group(2))
+            return True
+        m = self.RE_NO_PREFIX_LIST.match(line)
+        if m:
+            self.prefix_lists.pop((m.group(1), m.group(2)), None)
+            return True
+        m = self.RE_NO_COMMUNITY_LIST.match(line)
+        if m:
+            self.community_lists.pop(m.group(1), None)
+            return True
+        m = self.RE_NO_ROUTE_MAP.match(line)
+        if m:
+            self.route_maps.get(m.group(1), {}).pop(int(m.group(2)), None)
+            return True
+        return False
+
+    def parse_neighbor(self, line, strict):
+        """
+        Parse an indented line, which is not a part of a route-map entry
+        :param line: line to parse
+        :param strict: when True, fail on lines which could modify the indexed entities in an unknown way
+        :return: False if the line wasn't understood in the strict mode, True otherwise
+        """
+        m = self.RE_PEER_GROUP.match(line)
+        if m:
+            if m.group(1) not in self.peer_groups:
+                self.peer_groups.append(m.group(1))
+            return True
+        m = self.RE_PEER_GROUP_RM_IN.match(line)
+        if m:
+            route_maps = self.peer_group_rm_in.setdefault(m.group(1), [])
+            if m.group(2) not in route_maps:
+                if strict and route_maps:
+                    return False  # the route-map could replace an existing one
+                route_maps.append(m.group(2))
+            return True
+        return not (strict and line.strip().startswith('no '))
+
+    def get_prefix_list(self, family, name):
+        """
+        Return rules of the prefix-list
+        :param family: 'ip' or 'ipv6'
+        :param name: name of the prefix-list
+        :return: list of the rules ordered by their sequence numbers. Empty list if the prefix-list doesn't exist
+        """
+        rules = self.prefix_lists.get((family, name), {})
+        return [rules[seq] for seq in sorted(rules)]
+
+    def get_community_list(self, name):
+        """
+        Return communities, permitted by the standard community-list
+        :param name: name of the community-list
+        :return: list of the communities. Empty list if the community-list doesn't exist
+        """
+        return self.community_lists.get(name, [])
+
+    def get_route_map(self, name):
+        """
+        Return 'permit' entries of the route-map
+        :param name: name of the route-map
+        :return: list of tuples: sequence number, list of the stripped lines of the entry. Ordered by sequence numbers
+        """
+        entries = self.route_maps.get(name, {})
+        return [(seq, entries[seq]) for seq in sorted(entries)]
+
+    def get_route_map_call(self, name):
+        """
+        Return the route-map called by the route-map
+        :param name: name of the route-map
+        :return: name of the called route-map, defined in the last 'permit' entry with a call. None if there is no call
+        """
+        call = None
+        for _, entry in self.get_route_map(name):
+            for line in entry:
+                m = self.RE_CALL.match(line)
+                if m:
+                    call = m.group(1)
+                    break
+        return call
+
+    def get_peer_group_rm_in(self, name):
+        """
+        Return the first 'in' route-map of the peer-group
+        :param name: name of the peer-group
+        :return: name of the route-map. None if the peer-group doesn't have one
+        """
+        route_maps = self.peer_group_rm_in.get(name)
+        return route_maps[0] if route_maps else None
@@ -1,4 +1,4 @@
-from collections import defaultdict
+from collections import defaultdict, deque
 
 from .log import log_err
 
@@ -9,6 +9,10 @@ class Directory(object):
     def __init__(self):
         self.data = defaultdict(dict)  # storage. A key is a slot name, a value is a dictionary with data
         self.notify = defaultdict(lambda: defaultdict(list))  # registered callbacks: slot -> path -> handlers[]
+        self.paths = defaultdict(lambda: defaultdict(set))  # registered paths: slot -> first key of the path -> paths
+        self.watchers = defaultdict(list)  # registered key watchers: slot -> handlers[]
+        self.pending = None  # notifications (handler, args) to run at the end of the batch. None if there is no batch
+        self.pending_set = set()
 
     @staticmethod
     def get_slot_name(db, table):
@@ -62,7 +66,8 @@ class Directory(object):
 
     def put(self, db, table, key, value):
         """
-        Put information into the storage. Notify handlers which are dependant to the information
+        Put information into the storage. Notify handlers which are subscribed to the paths, which have appeared
+        in the storage because of the change. Notify handlers which watch the keys of the slot.
         :param db: db name
         :param table: table name
         :param key: key to change
@@ -70,12 +75,44 @@ class Directory(object):
         :return:
         """
         slot = self.get_slot_name(db, table)
+        paths = self.paths.get(slot, {})
+        affected = paths.get("", set()) | paths.get(key, set())
+        # an empty slot could be created by get_slot(), but only the first key makes the slot path appear
+        missing = [path for path in affected if not (self.path_traverse(slot, path)[0] and self.data[slot])]
         self.data[slot][key] = value
-        if slot in self.notify:
-            for path in self.notify[slot].keys():
-                if self.path_exist(db, table, path):
-                    for handler in self.notify[slot][path]:
-                        handler()
+        for path in missing:
+            if self.path_traverse(slot, path)[0]:
+                for handler in self.notify[slot][path]:
+                    self.schedule(handler, ())
+        for handler in self.watchers.get(slot, []):
+            self.schedule(handler, (db, table, key))
+
+    def schedule(self, handler, args):
+        """
+        Run the handler. If a batch is started, run it once at the end of the batch
+        :param handler: handler to run
+        :param args: arguments of the handler
+        """
+        if self.pending is None:
+            handler(*args)
+        elif (handler, args) not in self.pending_set:
+            self.pending_set.add((handler, args))
+            self.pending.append((handler, args))
+
+    def start_batch(self):
+        """ Start collecting notifications. Every handler will be notified once at the end of the batch """
+        if self.pending is None:
+            self.pending = deque()
+
+    def end_batch(self):
+        """ Run the notifications collected in the batch. Notifications issued by the handlers are run too """
+        if self.pending is None:
+            return
+        while self.pending:
+            handler, args = self.pending.popleft()
+            self.pending_set.discard((handler, args))
+            handler(*args)
+        self.pending = None
 
     def get(self, db, table, key):
         """
@@ -149,11 +186,23 @@ class Directory(object):
 
     def subscribe(self, deps, handler):
         """
-        Subscribe the handler to be run as soon as all dependencies are presented
-        :param deps:
-        :param handler:
+        Subscribe the handler to be run as soon as any of the dependencies appears in the storage
+        :param deps: list of dependencies: (db, table, path)
+        :param handler: handler without arguments
         :return:
         """
         for db, table, path in deps:
             slot = self.get_slot_name(db, table)
-            self.notify[slot][path].append(handler)
\ No newline at end of file
+            self.notify[slot][path].append(handler)
+            self.paths[slot][path.split("/")[0]].add(path)
+
+    def watch(self, db, table, handler):
+        """
+        Subscribe the handler to be run on every put into the table
+        :param db: db name
+        :param table: table name
+        :param handler: handler with arguments: db, table, key
+        """
+        slot = self.get_slot_name(db, table)
+        if handler not in self.watchers[slot]:
+            self.watchers[slot].append(handler)
\ No newline at end of file
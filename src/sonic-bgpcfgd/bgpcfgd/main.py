@@ -10,7 +10,7 @@ from .config import ConfigMgr
 from .directory import Directory
 from .log import log_notice, log_crit
 from .managers_allow_list import BGPAllowListMgr
-from .managers_bgp import BGPPeerMgrBase
+from .managers_bgp import BGPPeerInventory, BGPPeerMgrBase
 from .managers_db import BGPDataBaseMgr
 from .managers_intf import InterfaceMgr
 from .managers_setsrc import ZebraSetSrc
@@ -29,6 +29,7 @@ def do_work():
         'cfg_mgr':   ConfigMgr(),
         'tf':        TemplateFabric(),
         'constants': read_constants(),
+        'peers':     BGPPeerInventory(),
     }
     managers = [
         # Config DB managers
@@ -48,7 +49,7 @@ def do_work():
         # AllowList Managers
         BGPAllowListMgr(common_objs, "CONFIG_DB", "BGP_ALLOWED_PREFIXES"),
     ]
-    runner = Runner()
+    runner = Runner(common_objs['cfg_mgr'], common_objs['directory'])
     for mgr in managers:
         runner.add_manager(mgr)
     runner.run()
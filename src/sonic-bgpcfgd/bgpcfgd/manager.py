@@ -1,3 +1,5 @@
+from collections import defaultdict, OrderedDict
+
 from swsscommon import swsscommon
 
 from .log import log_debug, log_err
@@ -20,6 +22,9 @@ class Manager(object):
         self.db_name = database
         self.table_name = table_name
         self.set_queue = []
+        self.wait_queues = defaultdict(OrderedDict)  # (db, table, key) -> entries waiting for the key: key -> data
+        self.waiting = {}  # entry key -> (db, table, key) which the entry waits for
+        self.wait_dep = None  # (db, table, key) reported by the running set_handler() with wait_for()
         self.directory.subscribe(deps, self.on_deps_change)  # subscribe this class method on directory changes
 
     def get_database(self):
@@ -38,29 +43,127 @@ class Manager(object):
         :param data: associated data of the event. Empty for 'DEL' operation.
         """
         if op == swsscommon.SET_COMMAND:
+            self.stop_waiting(key)  # the new data replaces the data which is waiting
             if self.directory.available_deps(self.deps):  # all required dependencies are set in the Directory?
-                res = self.set_handler(key, data)
+                res = self.run_set_handler(key, data)
                 if not res:  # set handler returned False, which means it is not ready to process is. Save it for later.
                     log_debug("'SET' handler returned NOT_READY for the Manager: %s" % self.__class__)
-                    self.set_queue.append((key, data))
+                    self.defer(key, data)
             else:
                 log_debug("Not all dependencies are met for the Manager: %s" % self.__class__)
                 self.set_queue.append((key, data))
         elif op == swsscommon.DEL_COMMAND:
-            self.del_handler(key)
+            self.stop_waiting(key)
+            with self.cfg_mgr.on_failure(lambda: self.on_push_failure(key, op, None)):
+                self.del_handler(key)
         else:
             log_err("Invalid operation '%s' for key '%s'" % (op, key))
 
     def on_deps_change(self):
-        """ This method is being executed on every dependency change """
+        """ This method is being executed when a dependency appears in the Directory """
         if not self.directory.available_deps(self.deps):
             return
-        new_queue = []
-        for key, data in self.set_queue:
-            res = self.set_handler(key, data)
+        queue, self.set_queue = self.set_queue, []
+        for key, data in queue:
+            res = self.run_set_handler(key, data)
             if not res:
-                new_queue.append((key, data))
-        self.set_queue = new_queue
+                self.defer(key, data)
+
+    def on_key_change(self, db, table, key):
+        """
+        This method is being executed when a key is put into a table, which a deferred entry waits for.
+        Only the entries waiting for the key are processed again
+        :param db: db name
+        :param table: table name
+        :param key: the key
+        """
+        if not self.directory.available_deps(self.deps):
+            return
+        entries = []
+        for dep in (db, table, key), (db, table, None):
+            queue = self.wait_queues.pop(dep, None)
+            if queue:
+                entries.extend(queue.items())
+        for entry_key, data in entries:
+            del self.waiting[entry_key]
+            res = self.run_set_handler(entry_key, data)
+            if not res:
+                self.defer(entry_key, data)
+        if self.set_queue:  # entries which FRR has rejected are retried on every change
+            self.on_deps_change()
+
+    def wait_for(self, db, table, key=None):
+        """
+        This method is called by set_handler(), which returns False because the data it needs isn't in the Directory.
+        The entry will be processed again when the key is put into the table
+        :param db: db name
+        :param table: table name
+        :param key: the key to wait. Any key of the table when None
+        """
+        self.wait_dep = db, table, key
+        self.directory.watch(db, table, self.on_key_change)
+
+    def defer(self, key, data):
+        """
+        Save an entry, which set_handler() couldn't process, for later.
+        The entry waits for the key reported by set_handler() with wait_for(), or for any dependency change
+        :param key: key of the table entry
+        :param data: associated data of the event
+        """
+        if self.wait_dep is None:
+            self.set_queue.append((key, data))
+        else:
+            self.wait_queues[self.wait_dep][key] = data
+            self.waiting[key] = self.wait_dep
+            self.wait_dep = None
+
+    def stop_waiting(self, key):
+        """
+        Forget the deferred data for the key, when the data is replaced or removed
+        :param key: key of the table entry
+        """
+        if key in self.waiting:
+            dep = self.waiting.pop(key)
+            del self.wait_queues[dep][key]
+            if not self.wait_queues[dep]:
+                del self.wait_queues[dep]
+
+    def run_set_handler(self, key, data):
+        """
+        Run 'SET' handler. The FRR commands pushed by the handler are attributed to the key,
+        so the key could be retried if the commands fail in a transaction of ConfigMgr
+        :param key: key of the table entry
+        :param data: associated data of the event
+        :return: the result of the set_handler()
+        """
+        self.wait_dep = None
+        with self.cfg_mgr.on_failure(self.set_failure_callback(key, data)):
+            return self.set_handler(key, data)
+
+    def set_failure_callback(self, key, data):
+        """
+        Return the callback run when the commands of the 'SET' handler fail in a transaction.
+        It is created before the handler runs, so it could capture the state the handler changes
+        :param key: key of the table entry
+        :param data: associated data of the event
+        :return: function without arguments
+        """
+        return lambda: self.on_push_failure(key, swsscommon.SET_COMMAND, data)
+
+    def on_push_failure(self, key, op, data):
+        """
+        This method is executed when FRR rejects the commands of a handler, which were accumulated in a transaction.
+        A failed 'SET' entry is saved to be processed again on the next dependency change
+        :param key: key of the table entry
+        :param op: operation of the failed handler. Could be either 'SET' or 'DEL'
+        :param data: associated data of the event. None for 'DEL' operation.
+        """
+        if op == swsscommon.SET_COMMAND:
+            log_err("Can't apply 'SET' for key '%s' of the Manager: %s. Save it for later." % (key, self.__class__))
+            if (key, data) not in self.set_queue:
+                self.set_queue.append((key, data))
+        else:
+            log_err("Can't apply 'DEL' for key '%s' of the Manager: %s" % (key, self.__class__))
 
     def set_handler(self, key, data):
         """ Placeholder for 'SET' command """
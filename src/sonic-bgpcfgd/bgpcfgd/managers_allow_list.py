@@ -139,7 +139,6 @@ class BGPAllowListMgr(Manager):
         msg += " prefix_v4 '%s'. prefix_v6: '%s'"
         log_info(msg % info)
         names = self.__generate_names(deployment_id, community_value)
-        self.cfg_mgr.update()
         cmds = []
         cmds += self.__update_prefix_list(self.V4, names['pl_v4'], prefixes_v4)
         cmds += self.__update_prefix_list(self.V6, names['pl_v6'], prefixes_v6)
@@ -168,7 +167,6 @@ class BGPAllowListMgr(Manager):
         log_info(msg % info)
 
         names = self.__generate_names(deployment_id, community_value)
-        self.cfg_mgr.update()
         cmds = []
         cmds += self.__remove_allow_route_map_entry(self.V4, names['pl_v4'], names['community'], names['rm_v4'])
         cmds += self.__remove_allow_route_map_entry(self.V6, names['pl_v6'], names['community'], names['rm_v6'])
@@ -260,23 +258,19 @@ class BGPAllowListMgr(Manager):
         """
         assert af == self.V4 or af == self.V6
         family = self.__af_to_family(af)
-        match_string = '%s prefix-list %s seq ' % (family, pl_name)
-        conf = self.cfg_mgr.get_text()
-        if not any(line.strip().startswith(match_string) for line in conf):
+        rules = self.cfg_mgr.get_running_config().get_prefix_list(family, pl_name)
+        if not rules:
             return False, False  # if the prefix list is not exists, it is not correct
         constant_set = set(constant_list)
         allow_set = set(allow_list)
-        for line in conf:
-            if line.startswith(match_string):
-                found = line[len(match_string):].strip().split(' ')
-                rule = " ".join(found[1:])
-                if rule in constant_set:
-                    constant_set.discard(rule)
-                elif rule in allow_set:
-                    if constant_set:
-                        return True, False  # Not everything from constant set is presented
-                    else:
-                        allow_set.discard(rule)
+        for rule in rules:
+            if rule in constant_set:
+                constant_set.discard(rule)
+            elif rule in allow_set:
+                if constant_set:
+                    return True, False  # Not everything from constant set is presented
+                else:
+                    allow_set.discard(rule)
         return True, len(allow_set) == 0  # allow_set should be presented all
 
     def __update_community(self, community_name, community_value):
@@ -328,13 +322,10 @@ class BGPAllowListMgr(Manager):
                           Second element: community value if the first element is True no value otherwise
         """
         log_debug("BGPAllowListMgr::__is_community_presented. community='%s'" % community_name)
-        match_string = 'bgp community-list standard %s permit ' % community_name
-        conf = self.cfg_mgr.get_text()
-        found = [line.strip() for line in conf if line.strip().startswith(match_string)]
+        found = self.cfg_mgr.get_running_config().get_community_list(community_name)
         if not found:
             return False, None
-        community_value = found[0].replace(match_string, '')
-        return True, community_value
+        return True, found[0]
 
     def __update_allow_route_map_entry(self, af, allow_address_pl_name, community_name, route_map_name):
         """
@@ -408,44 +399,29 @@ class BGPAllowListMgr(Manager):
         """
         assert af == self.V4 or af == self.V6
         log_debug("BGPAllowListMgr::__parse_allow_route_map_entries. af='%s', rm='%s'" % (af, route_map_name))
-        match_string = 'route-map %s permit ' % route_map_name
         entries = {}
-        inside_route_map = False
-        route_map_seq_number = None
-        pl_allow_list_name = None
-        community_name = self.EMPTY_COMMUNITY
         if af == self.V4:
             match_pl_allow_list = 'match ip address prefix-list '
         else:  # self.V6
             match_pl_allow_list = 'match ipv6 address prefix-list '
         match_community = 'match community '
-        conf = self.cfg_mgr.get_text()
-        for line in conf + [""]:
-            if inside_route_map:
-                if line.strip().startswith(match_pl_allow_list):
-                    pl_allow_list_name = line.strip()[len(match_pl_allow_list):]
-                    continue
-                elif line.strip().startswith(match_community):
-                    community_name = line.strip()[len(match_community):]
-                    continue
+        for route_map_seq_number, lines in self.cfg_mgr.get_running_config().get_route_map(route_map_name):
+            pl_allow_list_name = None
+            community_name = self.EMPTY_COMMUNITY
+            for line in lines:
+                if line.startswith(match_pl_allow_list):
+                    pl_allow_list_name = line[len(match_pl_allow_list):]
+                elif line.startswith(match_community):
+                    community_name = line[len(match_community):]
                 else:
-                    if pl_allow_list_name is not None:
-                        entries[route_map_seq_number] = {
-                            'pl_allow_list': pl_allow_list_name,
-                            'community': community_name,
-                        }
-                    else:
-                        if route_map_seq_number != 65535:
-                            log_warn("BGPAllowListMgr::Found incomplete route-map '%s' entry. seq_no=%d" % (route_map_name, route_map_seq_number))
-                    inside_route_map = False
-                    pl_allow_list_name = None
-                    community_name = self.EMPTY_COMMUNITY
-                    route_map_seq_number = None
-            if line.startswith(match_string):
-                found = line[len(match_string):]
-                assert found.isdigit()
-                route_map_seq_number = int(found)
-                inside_route_map = True
+                    break
+            if pl_allow_list_name is not None:
+                entries[route_map_seq_number] = {
+                    'pl_allow_list': pl_allow_list_name,
+                    'community': community_name,
+                }
+            elif route_map_seq_number != 65535:
+                log_warn("BGPAllowListMgr::Found incomplete route-map '%s' entry. seq_no=%d" % (route_map_name, route_map_seq_number))
         return entries
 
     @staticmethod
@@ -479,14 +455,7 @@ class BGPAllowListMgr(Manager):
         Extract names of all peer-groups defined in the config
         :return: list of peer-group names
         """
-        # Find all peer-groups entries
-        re_peer_group = re.compile(r'^\s*neighbor (\S+) peer-group$')
-        peer_groups = []
-        for line in self.cfg_mgr.get_text():
-            result = re_peer_group.match(line)
-            if result:
-                peer_groups.append(result.group(1))
-        return peer_groups
+        return list(self.cfg_mgr.get_running_config().peer_groups)
 
     def __get_peer_group_to_route_map(self, peer_groups):
         """
@@ -495,14 +464,12 @@ class BGPAllowListMgr(Manager):
         :return: dictionary where key is a peer-group, value is a route-map name which is defined as route-map in
                  for the peer_group.
         """
+        conf = self.cfg_mgr.get_running_config()
         pg_2_rm = {}
         for pg in peer_groups:
-            re_peer_group_rm = re.compile(r'^\s*neighbor %s route-map (\S+) in$' % pg)
-            for line in self.cfg_mgr.get_text():
-                result = re_peer_group_rm.match(line)
-                if result:
-                    pg_2_rm[pg] = result.group(1)
-                    break
+            rm = conf.get_peer_group_rm_in(pg)
+            if rm is not None:
+                pg_2_rm[pg] = rm
         return pg_2_rm
 
     def __get_route_map_calls(self, rms):
@@ -511,24 +478,12 @@ class BGPAllowListMgr(Manager):
         :rms: a set with route-map names
         :return: a dictionary: key - name of a route-map, value - name of a route-map call defined for the route-map
         """
+        conf = self.cfg_mgr.get_running_config()
         rm_2_call = {}
-        re_rm = re.compile(r'^route-map (\S+) permit \d+$')
-        re_call = re.compile(r'^\s*call (\S+)$')
-        inside_name = None
-        for line in self.cfg_mgr.get_text():
-            if inside_name:
-                inside_result = re_call.match(line)
-                if inside_result:
-                    rm_2_call[inside_name] = inside_result.group(1)
-                    inside_name = None
-                    continue
-            result = re_rm.match(line)
-            if not result:
-                continue
-            inside_name = None
-            if result.group(1) not in rms:
-                continue
-            inside_name = result.group(1)
+        for rm in rms:
+            call = conf.get_route_map_call(rm)
+            if call is not None:
+                rm_2_call[rm] = call
         return rm_2_call
 
     def __get_peer_group_to_restart(self, deployment_id, pg_2_rm, rm_2_call):
@@ -553,7 +508,6 @@ class BGPAllowListMgr(Manager):
         :param deployment_id: deployment_id number
         :return: a list of peer-groups which a used by devices with requested deployment_id number
         """
-        self.cfg_mgr.update()
         peer_groups = self.__extract_peer_group_names()
         pg_2_rm = self.__get_peer_group_to_route_map(peer_groups)
         rm_2_call = self.__get_route_map_calls(set(pg_2_rm.values()))
@@ -7,7 +7,7 @@ import netaddr
 from .log import log_warn, log_err, log_info, log_debug, log_crit
 from .manager import Manager
 from .template import TemplateFabric
-from .utils import run_command
+from .utils import run_vtysh_command
 
 
 class BGPPeerGroupMgr(object):
@@ -23,6 +23,33 @@ class BGPPeerGroupMgr(object):
         tf = common_objs['tf']
         self.policy_template = tf.from_file(base_template + "policies.conf.j2")
         self.peergroup_template = tf.from_file(base_template + "peer-group.conf.j2")
+        self.template_variables = {
+            self.policy_template.name: tf.get_variables(self.policy_template),
+            self.peergroup_template.name: tf.get_variables(self.peergroup_template),
+        }
+        self.rendered = {}  # template name -> (values of the template variables, rendered text) of the last render
+        self.applied = {}   # (template name, vrf) -> the last commands which were pushed to FRR successfully
+
+    def render(self, template, kwargs):
+        """
+        Render the template. The text is rendered again only when the values of the variables used by the template
+        differ from the ones of the last render
+        :param template: the template to render
+        :param kwargs: dictionary with parameters for rendering
+        :return: rendered text
+        """
+        names = self.template_variables[template.name]
+        values = kwargs if names is None else dict((name, kwargs.get(name)) for name in names)
+        values = json.dumps(values, sort_keys=True, default=str)
+        last = self.rendered.get(template.name)
+        if last is None or last[0] != values:
+            last = values, template.render(**kwargs)
+            self.rendered[template.name] = last
+        return last[1]
+
+    def forget_applied(self):
+        """ Push the commands again on the next update. Called when FRR has rejected some of the commands """
+        self.applied.clear()
 
     def update(self, name, **kwargs):
         """
@@ -41,12 +68,13 @@ class BGPPeerGroupMgr(object):
         :param kwargs: dictionary with parameters for rendering
         """
         try:
-            policy = self.policy_template.render(**kwargs)
+            policy = self.render(self.policy_template, kwargs)
         except jinja2.TemplateError as e:
             log_err("Can't render policy template name: '%s': %s" % (name, str(e)))
             return False
 
-        return self.update_entity(policy, "Routing policy for peer '%s'" % name)
+        # the routing policy is global, so the last policy pushed for any vrf is the one in FRR
+        return self.update_entity((self.policy_template.name, None), policy, "Routing policy for peer '%s'" % name)
 
     def update_pg(self, name, **kwargs):
         """
@@ -55,7 +83,7 @@ class BGPPeerGroupMgr(object):
         :param kwargs: dictionary with parameters for rendering
         """
         try:
-            pg = self.peergroup_template.render(**kwargs)
+            pg = self.render(self.peergroup_template, kwargs)
         except jinja2.TemplateError as e:
             log_err("Can't render peer-group template: '%s': %s" % (name, str(e)))
             return False
@@ -65,23 +93,67 @@ class BGPPeerGroupMgr(object):
         else:
             cmd = ('router bgp %s vrf %s\n' % (kwargs['bgp_asn'], kwargs['vrf'])) + pg
 
-        return self.update_entity(cmd, "Peer-group for peer '%s'" % name)
+        return self.update_entity((self.peergroup_template.name, kwargs['vrf']), cmd, "Peer-group for peer '%s'" % name)
 
-    def update_entity(self, cmd, txt):
+    def update_entity(self, key, cmd, txt):
         """
-        Send commands to FRR
+        Send commands to FRR, unless they are the last ones pushed for the key
+        :param key: (template name, vrf) which the commands were rendered for
         :param cmd: commands to send in a raw form
         :param txt: text for the syslog output
         :return:
         """
+        if self.applied.get(key) == cmd:
+            log_debug("%s is already applied" % txt)
+            return True
         ret_code = self.cfg_mgr.push(cmd)
         if ret_code:
+            self.applied[key] = cmd
             log_info("%s was updated" % txt)
         else:
             log_err("Can't update %s" % txt)
         return ret_code
 
 
+class BGPPeerInventory(object):
+    """ This class represents peers which are already installed in FRR.
+        They are read from FRR once and shared by all the peer managers """
+    def __init__(self):
+        """ Construct the object """
+        self.peers = None
+
+    def get_peers(self):
+        """
+        Return peers, which were installed in FRR at the start of bgpcfgd
+        :return: a new set of (vrf, neighbor) pairs
+        """
+        if self.peers is None:
+            self.peers = self.load_peers()
+        return set(self.peers)
+
+    @staticmethod
+    def load_peers():
+        """
+        Load peers of all the vrfs from FRR with one summary command.
+        A peer, which isn't activated in any address family, is not in the summary.
+        Such a peer is configured again by the peer manager, which is harmless.
+        :return: set of peers, which are already installed in FRR
+        """
+        ret_code, out, err = run_vtysh_command("show bgp vrf all summary json")
+        if ret_code != 0:
+            log_crit("Can't read bgp summary: %s" % err)
+            raise Exception("Can't read bgp summary: %s" % err)
+        peers = set()
+        for vrf, address_families in json.loads(out).items():
+            if not isinstance(address_families, dict):
+                continue
+            for summary in address_families.values():
+                if isinstance(summary, dict):
+                    for nbr in summary.get('peers', {}):
+                        peers.add((vrf, nbr))
+        return peers
+
+
 class BGPPeerMgrBase(Manager):
     """ Manager of BGP peers """
     def __init__(self, common_objs, db_name, table_name, peer_type, check_neig_meta):
@@ -135,7 +207,7 @@ class BGPPeerMgrBase(Manager):
             table_name,
         )
 
-        self.peers = self.load_peers()
+        self.peers = common_objs['peers'].get_peers()
         self.peer_group_mgr = BGPPeerGroupMgr(self.common_objs, base_template)
         return
 
@@ -166,6 +238,7 @@ class BGPPeerMgrBase(Manager):
         lo0_ipv4 = self.get_lo0_ipv4()
         if lo0_ipv4 is None:
             log_warn("Loopback0 ipv4 address is not presented yet")
+            self.wait_for("CONFIG_DB", swsscommon.CFG_LOOPBACK_INTERFACE_TABLE_NAME)
             return False
         #
         if "local_addr" not in data:
@@ -178,6 +251,7 @@ class BGPPeerMgrBase(Manager):
             if not interface:
                 print_data = nbr, data["local_addr"]
                 log_debug("Peer '%s' with local address '%s' wait for the corresponding interface to be set" % print_data)
+                self.wait_for_local_interface(data["local_addr"])
                 return False
             vnet = self.get_vnet(interface)
             if vnet:
@@ -198,6 +272,7 @@ class BGPPeerMgrBase(Manager):
             neigmeta = self.directory.get_slot("CONFIG_DB", swsscommon.CFG_DEVICE_NEIGHBOR_METADATA_TABLE_NAME)
             if 'name' in data and data["name"] not in neigmeta:
                 log_info("DEVICE_NEIGHBOR_METADATA is not ready for neighbor '%s' - '%s'" % (nbr, data['name']))
+                self.wait_for("CONFIG_DB", swsscommon.CFG_DEVICE_NEIGHBOR_METADATA_TABLE_NAME, data['name'])
                 return False
             kwargs['CONFIG_DB__DEVICE_NEIGHBOR_METADATA'] = neigmeta
 
@@ -221,6 +296,39 @@ class BGPPeerMgrBase(Manager):
 
         return True
 
+    def set_failure_callback(self, key, data):
+        """
+        Return the callback run when the commands of the 'SET' handler fail in a transaction.
+        A peer, which the handler adds, is removed from the list of peers, so it is added again on retry.
+        A peer, which was installed in FRR before, stays in the list: only its update has failed
+        :param key: key of the neighbor
+        :param data: associated data of the event
+        :return: function without arguments
+        """
+        on_failure = super(BGPPeerMgrBase, self).set_failure_callback(key, data)
+        peer_key = self.split_key(key)
+        if peer_key in self.peers:
+            return on_failure
+
+        def on_add_failure():
+            self.peers.discard(peer_key)
+            on_failure()
+        return on_add_failure
+
+    def on_push_failure(self, key, op, data):
+        """
+        Restore the list of peers, which were optimistically updated by the 'DEL' handler,
+        when FRR rejects the commands accumulated in a transaction
+        :param key: key of the neighbor
+        :param op: operation of the failed handler. Could be either 'SET' or 'DEL'
+        :param data: associated data of the event. None for 'DEL' operation.
+        """
+        if op == swsscommon.SET_COMMAND:
+            self.peer_group_mgr.forget_applied()  # the failed commands could be the policy or the peer-group
+        else:
+            self.peers.add(self.split_key(key))
+        super(BGPPeerMgrBase, self).on_push_failure(key, op, data)
+
     def update_peer(self, vrf, nbr, data):
         """
         Update a peer. This is used when the peer is already in the FRR
@@ -337,6 +445,17 @@ class BGPPeerMgrBase(Manager):
         else:
             return None
 
+    def wait_for_local_interface(self, local_addr):
+        """
+        Wait for the data, which get_local_interface() needs for the local address
+        :param: local_addr: Local address of the interface
+        """
+        local_addresses = self.directory.get_slot("LOCAL", "local_addresses")
+        if local_addr in local_addresses and local_addresses[local_addr].has_key("interface"):
+            self.wait_for("LOCAL", "interfaces", local_addresses[local_addr]["interface"])
+        else:
+            self.wait_for("LOCAL", "local_addresses", local_addr)
+
     @staticmethod
     def get_vnet(interface):
         """
@@ -360,32 +479,4 @@ class BGPPeerMgrBase(Manager):
         if '|' not in key:
             return 'default', key
         else:
-            return tuple(key.split('|', 1))
-
-    @staticmethod
-    def load_peers():
-        """
-        Load peers from FRR.
-        :return: set of peers, which are already installed in FRR
-        """
-        command = ["vtysh", "-c", "show bgp vrfs json"]
-        ret_code, out, err = run_command(command)
-        if ret_code == 0:
-            js_vrf = json.loads(out)
-            vrfs = js_vrf['vrfs'].keys()
-        else:
-            log_crit("Can't read bgp vrfs: %s" % err)
-            raise Exception("Can't read bgp vrfs: %s" % err)
-        peers = set()
-        for vrf in vrfs:
-            command = ["vtysh", "-c", 'show bgp vrf %s neighbors json' % str(vrf)]
-            ret_code, out, err = run_command(command)
-            if ret_code == 0:
-                js_bgp = json.loads(out)
-                for nbr in js_bgp.keys():
-                    peers.add((vrf, nbr))
-            else:
-                log_crit("Can't read vrf '%s' neighbors: %s" % (vrf, str(err)))
-                raise Exception("Can't read vrf '%s' neighbors: %s" % (vrf, str(err)))
-
-        return peers
\ No newline at end of file
+            return tuple(key.split('|', 1))
\ No newline at end of file
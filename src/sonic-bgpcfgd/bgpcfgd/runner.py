@@ -1,7 +1,7 @@
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from swsscommon import swsscommon
 
-from .log import log_debug
+from .log import log_debug, log_err
 
 
 g_run = True
@@ -20,8 +20,17 @@ class Runner(object):
     """
     SELECT_TIMEOUT = 1000
 
-    def __init__(self):
-        """ Constructor """
+    def __init__(self, cfg_mgr=None, directory=None):
+        """
+        Constructor
+        :param cfg_mgr: ConfigMgr object. When it is set, FRR commands pushed by the handlers
+                        in one select cycle are applied with one vtysh call
+        :param directory: Directory object. When it is set, the Directory notifications issued by the handlers
+                          in one select cycle are run once at the end of the cycle
+        """
+        self.cfg_mgr = cfg_mgr
+        self.directory = directory
+        self.counters = {'received': 0, 'coalesced': 0, 'applied': 0}
         self.db_connectors = {}
         self.selector = swsscommon.Select()
         self.callbacks = defaultdict(lambda: defaultdict(list))  # db -> table -> handlers[]
@@ -56,10 +65,70 @@ class Runner(object):
             elif state == self.selector.ERROR:
                 raise Exception("Received error from select")
 
-            for subscriber in self.subscribers:
-                key, op, fvs = subscriber.pop()
-                if not key:
-                    continue
-                log_debug("Received message : '%s'" % str((key, op, fvs)))
-                for callback in self.callbacks[subscriber.getDbConnector().getDbId()][subscriber.getTableName()]:
-                    callback(key, op, dict(fvs))
\ No newline at end of file
+            if self.cfg_mgr is not None:
+                self.cfg_mgr.start_transaction()
+            if self.directory is not None:
+                self.directory.start_batch()
+            try:
+                self.process_subscribers()
+                if self.directory is not None:
+                    self.directory.end_batch()
+            finally:
+                if self.cfg_mgr is not None:
+                    self.cfg_mgr.end_transaction()
+
+    def process_subscribers(self):
+        """ Drain all the messages received by the subscribers and run the handlers for the coalesced messages """
+        for subscriber in self.subscribers:
+            events = self.coalesce(self.drain(subscriber))
+            if not events:
+                continue
+            callbacks = self.callbacks[subscriber.getDbConnector().getDbId()][subscriber.getTableName()]
+            for key, op, data in events:
+                for callback in callbacks:
+                    callback(key, op, data)
+            self.counters['applied'] += len(events)
+        log_debug("Runner counters: %s" % str(self.counters))
+
+    def drain(self, subscriber):
+        """
+        Pop all the pending messages of the subscriber
+        :param subscriber: the subscriber
+        :return: list of the messages: (key, op, fvs)
+        """
+        messages = []
+        while True:
+            key, op, fvs = subscriber.pop()
+            if not key:
+                break
+            log_debug("Received message : '%s'" % str((key, op, fvs)))
+            messages.append((key, op, fvs))
+        self.counters['received'] += len(messages)
+        return messages
+
+    def coalesce(self, messages):
+        """
+        Coalesce the messages for the same key. Only the last state of a key is kept:
+        the last 'SET', or 'DEL'. 'DEL' is kept before the last 'SET' if the key was deleted before it,
+        so the handlers could recreate the entry from scratch
+        :param messages: list of the messages: (key, op, fvs)
+        :return: list of the coalesced events: (key, op, data) in the order of the first message for each key
+        """
+        states = OrderedDict()  # key -> [deleted, data of the last 'SET' or None]
+        for key, op, fvs in messages:
+            state = states.setdefault(key, [False, None])
+            if op == swsscommon.SET_COMMAND:
+                state[1] = dict(fvs)
+            elif op == swsscommon.DEL_COMMAND:
+                state[0] = True
+                state[1] = None
+            else:
+                log_err("Invalid operation '%s' for key '%s'" % (op, key))
+        events = []
+        for key, (deleted, data) in states.items():
+            if deleted:
+                events.append((key, swsscommon.DEL_COMMAND, {}))
+            if data is not None:
+                events.append((key, swsscommon.SET_COMMAND, data))
+        self.counters['coalesced'] += len(messages) - len(events)
+        return events
\ No newline at end of file
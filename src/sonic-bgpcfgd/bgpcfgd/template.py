@@ -2,6 +2,7 @@ from collections import OrderedDict
 from functools import partial
 
 import jinja2
+import jinja2.meta
 import netaddr
 
 from .log import log_err
@@ -35,6 +36,18 @@ class TemplateFabric(object):
         """
         return self.env.from_string(tmpl)
 
+    def get_variables(self, template):
+        """
+        Find names of the variables, which are used by a template
+        :param template: Jinja2 template object, read from a file
+        :return: set of the variable names. None if the template uses other templates, so the names are not known
+        """
+        source = self.env.loader.get_source(self.env, template.name)[0]
+        ast = self.env.parse(source)
+        if list(jinja2.meta.find_referenced_templates(ast)):
+            return None
+        return jinja2.meta.find_undeclared_variables(ast)
+
     @staticmethod
     def is_ipv4(value):
         """ Return True if the value is an ipv4 address """
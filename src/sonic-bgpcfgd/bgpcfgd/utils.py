@@ -5,6 +5,10 @@ import time
 import yaml
 
 from .log import log_debug, log_err, log_info, log_warn, log_crit
+from .vty import VtyClient
+
+
+vty_clients = {}  # daemon name -> VtyClient. Connections to the FRR daemons, shared by all the users
 
 
 def run_command(command, shell=False, hide_errors=False):
@@ -26,6 +30,36 @@ def run_command(command, shell=False, hide_errors=False):
     return p.returncode, stdout, stderr
 
 
+def get_vty_client(daemon):
+    """
+    Return the persistent connection to the FRR daemon
+    :param daemon: name of the FRR daemon
+    :return: VtyClient object
+    """
+    if daemon not in vty_clients:
+        vty_clients[daemon] = VtyClient(daemon)
+    return vty_clients[daemon]
+
+
+def run_vtysh_command(command, daemon="bgpd", hide_errors=False):
+    """
+    Run a vtysh command, which is served by one FRR daemon, through the persistent connection to the daemon.
+    Run vtysh, if the daemon can't be reached through its vtysh socket.
+    The daemon reports errors in the command output, so the output is returned as stderr too, when the command fails
+    :param command: vtysh command to execute. Type: String
+    :param daemon: name of the FRR daemon which serves the command
+    :param hide_errors: don't report errors to syslog when True. Type: Boolean
+    :return: Tuple: integer exit code from the command, stdout as a string, stderr as a string
+    """
+    log_debug("execute vtysh command '%s' on '%s'." % (command, daemon))
+    ret_code, out = get_vty_client(daemon).execute(command)
+    if ret_code is None:
+        return run_command(["vtysh", "-c", command], hide_errors=hide_errors)
+    if ret_code != 0 and not hide_errors:
+        log_err("vtysh command '%s' returned %d on '%s'. Output: '%s'" % (command, ret_code, daemon, out))
+    return ret_code, out, out if ret_code != 0 else ""
+
+
 def wait_for_daemons(daemons, seconds):
     """
     Wait until FRR daemons are ready for requests
@@ -35,12 +69,12 @@ def wait_for_daemons(daemons, seconds):
     stop_time = datetime.datetime.now() + datetime.timedelta(seconds=seconds)
     log_info("Start waiting for FRR daemons: %s" % str(datetime.datetime.now()))
     while datetime.datetime.now() < stop_time:
-        ret_code, out, err = run_command(["vtysh", "-c", "show daemons"], hide_errors=True)
-        if ret_code == 0 and all(daemon in out for daemon in daemons):
-            log_info("All required daemons have connected to vtysh: %s" % str(datetime.datetime.now()))
+        not_ready = [daemon for daemon in daemons if not get_vty_client(daemon).connect()]
+        if not not_ready:
+            log_info("All required daemons have accepted vtysh connections: %s" % str(datetime.datetime.now()))
             return
         else:
-            log_warn("Can't read daemon status from FRR: %s" % str(err))
+            log_warn("FRR daemons are not ready yet: %s" % ", ".join(not_ready))
         time.sleep(0.1)  # sleep 100 ms
     raise RuntimeError("FRR daemons hasn't been started in %d seconds" % seconds)
 
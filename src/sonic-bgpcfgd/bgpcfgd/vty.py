@@ -0,0 +1,92 @@
+import os
+import socket
+
+from .log import log_debug, log_warn
+
+
+VTY_DIR = "/var/run/frr"  # directory with the vtysh sockets of the FRR daemons
+VTY_TIMEOUT = 30.0        # seconds to wait for a response of a daemon
+
+
+class VtyClient(object):
+    """ Persistent connection to the vtysh socket of a FRR daemon.
+        The daemon reads commands terminated by the zero byte and replies with the command output,
+        followed by three zero bytes and the return code of the command. It is the protocol vtysh uses.
+    """
+    def __init__(self, daemon, vty_dir=VTY_DIR, timeout=VTY_TIMEOUT):
+        """
+        Initialize the object
+        :param daemon: name of the FRR daemon. Example: 'bgpd'
+        :param vty_dir: directory with the vtysh sockets of the FRR daemons
+        :param timeout: number of seconds to wait for a response of the daemon
+        """
+        self.daemon = daemon
+        self.path = os.path.join(vty_dir, daemon + ".vty")
+        self.timeout = timeout
+        self.sock = None
+
+    def connect(self):
+        """
+        Connect to the daemon if the client is not connected yet
+        :return: True if the client is connected, False otherwise
+        """
+        if self.sock is not None:
+            return True
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except socket.error as e:
+            sock.close()
+            log_debug("VtyClient: can't connect to '%s': %s" % (self.path, str(e)))
+            return False
+        self.sock = sock
+        try:
+            self.__request("enable")  # vtysh does the same for every daemon it's connected to
+        except (socket.error, EOFError) as e:
+            log_warn("VtyClient: '%s' doesn't respond: %s" % (self.daemon, str(e)))
+            self.close()
+            return False
+        return True
+
+    def close(self):
+        """ Close the connection """
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def execute(self, command):
+        """
+        Execute a command on the daemon. Reconnect once, if the daemon has closed the connection
+        :param command: command to execute. Type: String
+        :return: Tuple: integer return code of the command, output as a string.
+                 The return code is None if the daemon is not reachable
+        """
+        for _ in range(2):
+            if not self.connect():
+                return None, ""
+            try:
+                return self.__request(command)
+            except socket.timeout:
+                log_warn("VtyClient: '%s' hasn't responded to '%s' in %d seconds" % (self.daemon, command, self.timeout))
+                self.close()  # a late response would be taken for the response of the next command
+                return None, ""
+            except (socket.error, EOFError) as e:
+                log_debug("VtyClient: connection to '%s' was lost: %s" % (self.daemon, str(e)))
+                self.close()
+        return None, ""
+
+    def __request(self, command):
+        """
+        Send a command to the daemon and read its response
+        :param command: command to send
+        :return: Tuple: integer return code of the command, output as a string
+        """
+        self.sock.sendall(command.encode() + b"\0")
+        response = bytearray()
+        while len(response) < 4 or response[-4:-1] != b"\0\0\0":
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise EOFError("connection closed by the daemon")
+            response += chunk
+        return response[-1], response[:-4].decode('utf-8', 'replace')
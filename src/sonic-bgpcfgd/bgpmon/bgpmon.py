@@ -4,167 +4,222 @@
 Description: bgpmon.py -- populating bgp related information in stateDB.
     script is started by supervisord in bgp docker when the docker is started.
 
-    Initial creation of this daemon is to assist SNMP agent in obtaining the 
+    Initial creation of this daemon is to assist SNMP agent in obtaining the
     BGP related information for its MIB support. The MIB that this daemon is
     assiting is for the CiscoBgp4MIB (Neighbor state only). If there are other
-    BGP related items that needs to be updated in a periodic manner in the 
+    BGP related items that needs to be updated in a periodic manner in the
     future, then more can be added into this process.
 
     The script check if there are any bgp activities by monitoring the bgp
-    frr.log file timestamp.  If activity is detected, then it will request bgp
-    neighbor state via vtysh cli interface. This bgp activity monitoring is 
-    done periodically (every 15 second). When triggered, it looks specifically
-    for the neighbor state in the json output of show ip bgp neighbors json
-    and update the state DB for each neighbor accordingly.
+    frr.log file. If activity is detected, then it will request bgp neighbor
+    state through the vtysh socket of bgpd. It looks specifically for the
+    neighbor state in the json output of show bgp summary json and update
+    the state DB for each neighbor accordingly.
+
+    The poll interval is adaptive: it starts at the minimal interval and
+    doubles every time a poll finds no change, up to the maximal interval.
+    Any change of a neighbor state brings it back to the minimal interval.
+    Besides that, the log file is checked every second for the neighbor
+    state changes bgpd logs (%ADJCHANGE), so NEIGH_STATE_TABLE is updated
+    within a second of a session change.
+
     In order to not disturb and hold on to the State DB access too long and
-    removal of the stale neighbors (neighbors that was there previously on 
+    removal of the stale neighbors (neighbors that was there previously on
     previous get request but no longer there in the current get request), a
-    "previous" neighbor dictionary will be kept and used to determine if there
-    is a need to perform update or the peer is stale to be removed from the
-    state DB
+    "previous" neighbor dictionary will be kept. The difference between the
+    previous and the new neighbor dictionaries is written to the state DB
+    with one redis pipeline per poll.
 """
-import commands
+import argparse
 import json
 import os
 import syslog
 import swsssdk
 import time
 
-PIPE_BATCH_MAX_COUNT = 50
+from bgpcfgd.utils import run_vtysh_command
+
+
+FRR_LOG_FILE = "/var/log/frr/frr.log"
+MIN_POLL_INTERVAL = 1       # seconds between two polls, after a change of a neighbor state
+MAX_POLL_INTERVAL = 15      # seconds between two polls, when the neighbor states don't change
+EVENT_CHECK_INTERVAL = 1    # seconds between two checks of the log file for the neighbor state changes
+ADJCHANGE_TAG = b"%ADJCHANGE"
+LOG_READ_MAX_SIZE = 1 << 20  # don't read more than 1 MB of new log in one check
+
+
+class AdaptiveInterval(object):
+    """ Poll interval, which grows while the polls find nothing new """
+    def __init__(self, min_interval=MIN_POLL_INTERVAL, max_interval=MAX_POLL_INTERVAL):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.current = self.min_interval
+
+    def update(self, changed):
+        """
+        Update the interval after a poll
+        :param changed: True, if the poll has found a change
+        :return: the interval until the next poll
+        """
+        if changed:
+            self.current = self.min_interval
+        else:
+            self.current = min(self.current * 2, self.max_interval)
+        return self.current
+
+
+class FrrLogWatcher(object):
+    """ Watch the bgp log file for the activities and the neighbor state changes """
+    def __init__(self, path=FRR_LOG_FILE, events=True):
+        """
+        Initialize the object
+        :param path: path to the log file
+        :param events: read the new lines of the log file, looking for the neighbor state changes, when True
+        """
+        self.path = path
+        self.events = events
+        self.cached_stat = None
+        self.position = None
+
+    def check(self):
+        """
+        Check the log file for the changes since the previous check
+        :return: a tuple: True, if there is any activity; True, if a neighbor has changed its state
+        In case the log file got wiped out, the activity is always reported
+        """
+        try:
+            stat = os.stat(self.path)
+        except (IOError, OSError):
+            self.cached_stat = None
+            self.position = None
+            return True, False
+        key = (stat.st_ino, stat.st_size, stat.st_mtime)
+        if key == self.cached_stat:
+            return False, False
+        self.cached_stat = key
+        if not self.events:
+            return True, False
+        return True, self.read_events(stat)
+
+    def read_events(self, stat):
+        """
+        Read the log lines added since the previous check
+        :param stat: stat of the log file
+        :return: True, if a neighbor state change has been logged
+        """
+        if self.position is None:  # the first check. Old events are not interesting
+            self.position = (stat.st_ino, stat.st_size)
+            return False
+        inode, position = self.position
+        if inode != stat.st_ino or stat.st_size < position:  # the log file has been rotated
+            position = 0
+        position = max(position, stat.st_size - LOG_READ_MAX_SIZE)
+        try:
+            with open(self.path, "rb") as fp:
+                fp.seek(position)
+                data = fp.read(stat.st_size - position)
+        except (IOError, OSError):
+            self.position = None
+            return False
+        self.position = (stat.st_ino, position + len(data))
+        return ADJCHANGE_TAG in data
+
 
 class BgpStateGet():
     def __init__(self):
-        # list peer_l stores the Neighbor peer Ip address
-        # dic peer_state stores the Neighbor peer state entries
-        # list new_peer_l stores the new snapshot of Neighbor peer ip address
-        # dic new_peer_state stores the new snapshot of Neighbor peer states
-        self.peer_l = []
+        # dic peer_state stores the Neighbor peer state entries, which are in the state DB
         self.peer_state = {}
-        self.new_peer_l = []
-        self.new_peer_state = {}
-        self.cached_timestamp = 0
         self.db = swsssdk.SonicV2Connector()
         self.db.connect(self.db.STATE_DB, False)
         client = self.db.get_redis_client(self.db.STATE_DB)
         self.pipe = client.pipeline()
         self.db.delete_all_by_pattern(self.db.STATE_DB, "NEIGH_STATE_TABLE|*" )
 
-    # A quick way to check if there are anything happening within BGP is to
-    # check its log file has any activities. This is by checking its modified
-    # timestamp against the cached timestamp that we keep and if there is a
-    # difference, there is activity detected. In case the log file got wiped
-    # out, it will default back to constant pulling every 15 seconds
-    def bgp_activity_detected(self):
-        try:
-            timestamp = os.stat("/var/log/frr/frr.log").st_mtime
-            if timestamp != self.cached_timestamp:
-                self.cached_timestamp = timestamp
-                return True
-            else:
-                return False
-        except (IOError, OSError):
-            return True
-
-    def update_new_peer_states(self, peer_dict):
-        peer_l = peer_dict["peers"].keys()
-        self.new_peer_l.extend(peer_l)
-        for i in range (0, len(peer_l)):
-            self.new_peer_state[peer_l[i]] = peer_dict["peers"][peer_l[i]]["state"]
-
-    # Get a new snapshot of BGP neighbors and store them in the "new" location
+    # Get a new snapshot of BGP neighbors
     def get_all_neigh_states(self):
-        cmd = "vtysh -c 'show bgp summary json'"
-        rc, output = commands.getstatusoutput(cmd)
-        if rc:
+        """
+        Read the neighbor states from bgpd
+        :return: dictionary peer ip address -> state, or None if bgpd can't be reached
+        """
+        cmd = "show bgp summary json"
+        rc, output, _ = run_vtysh_command(cmd)
+        if rc != 0:
             syslog.syslog(syslog.LOG_ERR, "*ERROR* Failed with rc:{} when execute: {}".format(rc, cmd))
-            return
-
-        peer_info = json.loads(output)
-        # cmd ran successfully, safe to Clean the "new" lists/dic for new sanpshot
-        del self.new_peer_l[:]
-        self.new_peer_state.clear()
-        for key, value in peer_info.items():
-            if key == "ipv4Unicast" or key == "ipv6Unicast":
-                self.update_new_peer_states(value)
-
-    # This method will take the caller's dictionary which contains the peer state operation
-    # That need to be updated in StateDB using Redis pipeline.
-    # The data{} will be cleared at the end of this method before returning to caller.
-    def flush_pipe(self, data):
-        """Dump each entry in data{} into State DB via redis pipeline.
-        Args:
-            data: Neighbor state in dictionary format
-            {
-                'NEIGH_STATE_TABLE|ip_address_a': {'state':state},
-                'NEIGH_STATE_TABLE|ip_address_b': {'state':state},
-                'NEIGH_STATE_TABLE|ip_address_c': {'state':state},
-                'NEIGH_STATE_TABLE|ip_address_x': None,
-                'NEIGH_STATE_TABLE|ip_address_z': None
-                ...
-            }
+            return None
+        try:
+            peer_info = json.loads(output)
+        except ValueError:
+            syslog.syslog(syslog.LOG_ERR, "*ERROR* Can't parse the output of: {}".format(cmd))
+            return None
+        new_peer_state = {}
+        for key in ("ipv4Unicast", "ipv6Unicast"):
+            for peer, value in peer_info.get(key, {}).get("peers", {}).items():
+                new_peer_state[peer] = value["state"]
+        return new_peer_state
+
+    def update_neigh_states(self, new_peer_state):
+        """
+        Write the difference between the current and the new neighbor states to the state DB, with one pipeline
+        :param new_peer_state: dictionary peer ip address -> state
+        :return: number of the updated and removed neighbors
         """
-        for key, value in data.items():
-            if value is None:
-                # delete case
-                self.pipe.delete(key)
-            else:
-                # Add or Modify case
-                self.pipe.hmset(key, value)
-        self.pipe.execute()
-        data.clear()
-
-    def update_neigh_states(self):
-        data = {}
-        for i in range (0, len(self.new_peer_l)):
-            peer = self.new_peer_l[i]
-            key = "NEIGH_STATE_TABLE|%s" % peer
-            if peer in self.peer_l:
-                # only update the entry if state changed
-                if self.peer_state[peer] != self.new_peer_state[peer]:
-                    # state changed. Update state DB for this entry
-                    state = self.new_peer_state[peer]
-                    data[key] = {'state':state}
-                    self.peer_state[peer] = state
-                # remove this neighbor from old list since it is accounted for
-                self.peer_l.remove(peer)
-            else:
-                # New neighbor found case. Add to dictionary and state DB
-                state = self.new_peer_state[peer]
-                data[key] = {'state':state}
-                self.peer_state[peer] = state
-            if len(data) > PIPE_BATCH_MAX_COUNT:
-                self.flush_pipe(data)
-        # Check for stale state entries to be cleaned up
-        while len(self.peer_l) > 0:
-            # remove this from the stateDB and the current nighbor state entry
-            peer = self.peer_l.pop(0)
-            del_key = "NEIGH_STATE_TABLE|%s" % peer
-            data[del_key] = None
-            del self.peer_state[peer]
-            if len(data) > PIPE_BATCH_MAX_COUNT:
-                self.flush_pipe(data)
-        # If anything in the pipeline not yet flushed, flush them now
-        if len(data) > 0:
-            self.flush_pipe(data)
-        # Save the new List
-        self.peer_l = self.new_peer_l[:]
+        changes = 0
+        for peer, state in new_peer_state.items():
+            if self.peer_state.get(peer) != state:
+                self.pipe.hmset("NEIGH_STATE_TABLE|%s" % peer, {'state': state})
+                changes += 1
+        for peer in set(self.peer_state) - set(new_peer_state):
+            self.pipe.delete("NEIGH_STATE_TABLE|%s" % peer)
+            changes += 1
+        if changes > 0:
+            self.pipe.execute()
+        self.peer_state = new_peer_state
+        return changes
+
+    def poll(self):
+        """
+        Update the state DB with the current neighbor states
+        :return: True, if any neighbor has changed
+        """
+        new_peer_state = self.get_all_neigh_states()
+        if new_peer_state is None:
+            return False
+        return self.update_neigh_states(new_peer_state) > 0
 
-def main():
 
-    print "bgpmon service started"
+def main():
+    parser = argparse.ArgumentParser(description="Populate NEIGH_STATE_TABLE of the state DB with the BGP neighbor states")
+    parser.add_argument("--min-interval", type=float, default=MIN_POLL_INTERVAL,
+                        help="seconds between two polls after a neighbor state change")
+    parser.add_argument("--max-interval", type=float, default=MAX_POLL_INTERVAL,
+                        help="seconds between two polls when the neighbor states don't change")
+    parser.add_argument("--log-file", default=FRR_LOG_FILE, help="bgpd log file, watched for activities")
+    parser.add_argument("--no-events", action="store_true",
+                        help="don't look for the neighbor state changes in the log file between the polls")
+    args = parser.parse_args()
+
+    print("bgpmon service started")
 
     try:
         bgp_state_get = BgpStateGet()
     except Exception as e:
-        syslog.syslog(syslog.LOG_ERR, "{}: error exit 1, reason {}".format(THIS_MODULE, str(e)))
+        syslog.syslog(syslog.LOG_ERR, "bgpmon: error exit 1, reason {}".format(str(e)))
         exit(1)
 
-    # periodically obtain the new neighbor infomraton and update if necessary
+    interval = AdaptiveInterval(args.min_interval, args.max_interval)
+    watcher = FrrLogWatcher(args.log_file, events=not args.no_events)
+    check_interval = EVENT_CHECK_INTERVAL if watcher.events else interval.min_interval
+    activity = True
+    next_poll = time.time()
+    # obtain the new neighbor infomraton when bgp is active, or right after a neighbor state change
     while True:
-        time.sleep(15)
-        if bgp_state_get.bgp_activity_detected():
-            bgp_state_get.get_all_neigh_states()
-            bgp_state_get.update_neigh_states()
+        is_active, neighbor_changed = watcher.check()
+        activity = activity or is_active
+        now = time.time()
+        if neighbor_changed or (activity and now >= next_poll):
+            activity = False
+            next_poll = now + interval.update(bgp_state_get.poll())
+        time.sleep(check_interval)
 
 if __name__ == '__main__':
     main()
@@ -1,3 +1,4 @@
+from bgpcfgd.config import RunningConfig
 from bgpcfgd.directory import Directory
 from bgpcfgd.template import TemplateFabric
 import bgpcfgd
@@ -35,7 +36,7 @@ def set_del_test(op, args, currect_config, expected_config):
     cfg_mgr = MagicMock()
     cfg_mgr.update.return_value = None
     cfg_mgr.push_list = push_list
-    cfg_mgr.get_text.return_value = currect_config
+    cfg_mgr.get_running_config.return_value = RunningConfig(currect_config)
     common_objs = {
         'directory': Directory(),
         'cfg_mgr':   cfg_mgr,
@@ -192,7 +193,7 @@ def test_set_handler_no_community_data_is_already_presented():
     from bgpcfgd.managers_allow_list import BGPAllowListMgr
     cfg_mgr = MagicMock()
     cfg_mgr.update.return_value = None
-    cfg_mgr.get_text.return_value = [
+    cfg_mgr.get_running_config.return_value = RunningConfig([
         'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_empty_V4 seq 10 deny 0.0.0.0/0 le 17',
         'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_empty_V4 seq 20 permit 20.20.30.0/24 le 32',
         'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_empty_V4 seq 30 permit 40.50.0.0/16 le 32',
@@ -205,7 +206,7 @@ def test_set_handler_no_community_data_is_already_presented():
         'route-map ALLOW_LIST_DEPLOYMENT_ID_5_V6 permit 30000',
         ' match ipv6 address prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_empty_V6',
         ""
-    ]
+    ])
     common_objs = {
             'directory': Directory(),
             'cfg_mgr': cfg_mgr,
@@ -342,7 +343,7 @@ def test___find_peer_group_by_deployment_id():
     from bgpcfgd.managers_allow_list import BGPAllowListMgr
     cfg_mgr = MagicMock()
     cfg_mgr.update.return_value = None
-    cfg_mgr.get_text.return_value = [
+    cfg_mgr.get_running_config.return_value = RunningConfig([
         'router bgp 64601',
         ' neighbor BGPSLBPassive peer-group',
         ' neighbor BGPSLBPassive remote-as 65432',
@@ -420,7 +421,7 @@ def test___find_peer_group_by_deployment_id():
         'route-map TO_BGP_PEER_V4 permit 100',
         'route-map TO_BGP_PEER_V6 permit 100',
         'route-map TO_BGP_SPEAKER deny 1',
-    ]
+    ])
     common_objs = {
         'directory': Directory(),
         'cfg_mgr':   cfg_mgr,
@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+
+from mock import MagicMock, patch
+
+
+swsssdk_module_mock = MagicMock()
+
+
+@patch.dict("sys.modules", swsssdk=swsssdk_module_mock)
+def test_update_neigh_states():
+    import bgpmon.bgpmon
+    summary = {
+        "ipv4Unicast": {"peers": {"10.0.0.1": {"state": "Established"}, "10.0.0.3": {"state": "Active"}}},
+        "ipv6Unicast": {"peers": {"fc00::2": {"state": "Established"}}},
+    }
+    bgpmon.bgpmon.run_vtysh_command = lambda command: (0, json.dumps(summary), "")
+    bgp_state_get = bgpmon.bgpmon.BgpStateGet()
+    pipe = MagicMock()
+    bgp_state_get.pipe = pipe
+    assert bgp_state_get.poll()
+    assert pipe.hmset.call_count == 3
+    assert pipe.execute.call_count == 1
+    pipe.reset_mock()
+    assert not bgp_state_get.poll()  # nothing has changed
+    assert not pipe.execute.called
+    summary["ipv4Unicast"]["peers"]["10.0.0.3"]["state"] = "Established"
+    del summary["ipv6Unicast"]["peers"]["fc00::2"]
+    assert bgp_state_get.poll()
+    pipe.hmset.assert_called_once_with("NEIGH_STATE_TABLE|10.0.0.3", {'state': 'Established'})
+    pipe.delete.assert_called_once_with("NEIGH_STATE_TABLE|fc00::2")
+    assert pipe.execute.call_count == 1
+    assert bgp_state_get.peer_state == {"10.0.0.1": "Established", "10.0.0.3": "Established"}
+
+
+@patch.dict("sys.modules", swsssdk=swsssdk_module_mock)
+def test_adaptive_interval():
+    from bgpmon.bgpmon import AdaptiveInterval
+    interval = AdaptiveInterval(1, 15)
+    assert [interval.update(False) for _ in range(5)] == [2, 4, 8, 15, 15]
+    assert interval.update(True) == 1
+
+
+@patch.dict("sys.modules", swsssdk=swsssdk_module_mock)
+def test_log_watcher():
+    from bgpmon.bgpmon import FrrLogWatcher
+    fd, path = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        watcher = FrrLogWatcher(path)
+        def append(line):
+            with open(path, "a") as fp:
+                fp.write(line)
+        append("old line: %ADJCHANGE: neighbor 10.0.0.1 in vrf default Up\n")
+        assert watcher.check() == (True, False)   # the events before the start are ignored
+        assert watcher.check() == (False, False)
+        append("bgpd: something else\n")
+        assert watcher.check() == (True, False)
+        append("bgpd: %ADJCHANGE: neighbor 10.0.0.1(ARISTA01T1) in vrf default Down BGP Notification send\n")
+        assert watcher.check() == (True, True)
+        with open(path, "w") as fp:  # rotated
+            fp.write("%ADJCHANGE: neighbor 10.0.0.1(ARISTA01T1) in vrf default Up\n")
+        assert watcher.check() == (True, True)
+        os.remove(path)
+        assert watcher.check() == (True, False)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,239 @@
+from mock import MagicMock, patch
+
+from bgpcfgd.config import ConfigMgr, RunningConfig
+from bgpcfgd.directory import Directory
+import bgpcfgd.config
+
+
+swsscommon_module_mock = MagicMock()
+swsscommon_module_mock.swsscommon.SET_COMMAND = "SET"
+swsscommon_module_mock.swsscommon.DEL_COMMAND = "DEL"
+
+
+class FakeVtysh(object):
+    """ Record the files applied with 'vtysh -f' and reject the lines containing 'bad' """
+    def __init__(self, report_lines=True):
+        self.report_lines = report_lines
+        self.calls = []
+
+    def __call__(self, command):
+        assert command[:2] == ["vtysh", "-f"]
+        with open(command[2]) as fp:
+            lines = fp.read().rstrip("\n").split("\n")
+        self.calls.append(lines)
+        errors = ["line %d: %% Unknown command[4]: %s" % (n, line) for n, line in enumerate(lines, 1) if 'bad' in line]
+        if not errors:
+            return 0, "", ""
+        return 1, "", "\n".join(errors) if self.report_lines else "error"
+
+
+def test_push_without_transaction():
+    vtysh = FakeVtysh()
+    bgpcfgd.config.run_command = vtysh
+    cfg_mgr = ConfigMgr()
+    assert cfg_mgr.push("router bgp 65100\n neighbor 10.0.0.1 remote-as 65200")
+    assert not cfg_mgr.push("bad command")
+    assert vtysh.calls == [["router bgp 65100", " neighbor 10.0.0.1 remote-as 65200"], ["bad command"]]
+
+
+def test_transaction_one_vtysh_call():
+    vtysh = FakeVtysh()
+    bgpcfgd.config.run_command = vtysh
+    cfg_mgr = ConfigMgr()
+    cfg_mgr.start_transaction()
+    assert cfg_mgr.push("router bgp 65100\n neighbor 10.0.0.1 remote-as 65200")
+    assert cfg_mgr.push_list(["route-map A permit 10", " set local-preference 100"])
+    assert vtysh.calls == []
+    assert cfg_mgr.end_transaction()
+    assert vtysh.calls == [["router bgp 65100", " neighbor 10.0.0.1 remote-as 65200", "route-map A permit 10", " set local-preference 100"]]
+    assert cfg_mgr.end_transaction()
+    assert len(vtysh.calls) == 1
+
+
+def check_failure_attribution(vtysh):
+    bgpcfgd.config.run_command = vtysh
+    cfg_mgr = ConfigMgr()
+    failed = []
+    cfg_mgr.start_transaction()
+    with cfg_mgr.on_failure(lambda: failed.append("peer1")):
+        cfg_mgr.push("router bgp 65100\n neighbor 10.0.0.1 remote-as 65200")
+        cfg_mgr.push("router bgp 65100\n neighbor 10.0.0.1 peer-group PEER_V4")
+    with cfg_mgr.on_failure(lambda: failed.append("peer2")):
+        cfg_mgr.push("router bgp 65100\n neighbor 10.0.0.2 bad")
+    with cfg_mgr.on_failure(lambda: failed.append("peer3")):
+        with cfg_mgr.on_failure(lambda: failed.append("nested")):
+            cfg_mgr.push("route-map B bad 10")
+        cfg_mgr.push("route-map C permit 10")
+    assert not cfg_mgr.end_transaction()
+    assert failed == ["peer2", "nested"]
+    return cfg_mgr
+
+
+def test_transaction_failure_by_line_numbers():
+    vtysh = FakeVtysh()
+    check_failure_attribution(vtysh)
+    assert len(vtysh.calls) == 1
+
+
+def test_transaction_failure_by_replay():
+    vtysh = FakeVtysh(report_lines=False)
+    check_failure_attribution(vtysh)
+    assert vtysh.calls[1:] == [
+        ["router bgp 65100", " neighbor 10.0.0.1 remote-as 65200", "router bgp 65100", " neighbor 10.0.0.1 peer-group PEER_V4"],
+        ["router bgp 65100", " neighbor 10.0.0.2 bad"],
+        ["route-map B bad 10"],
+        ["route-map C permit 10"],
+    ]
+
+
+def test_update_flushes_transaction():
+    vtysh = FakeVtysh()
+    def run_command(command):
+        if command[1] == "-c":
+            return 0, "route-map A permit 10\n", ""
+        return vtysh(command)
+    bgpcfgd.config.run_command = run_command
+    cfg_mgr = ConfigMgr()
+    cfg_mgr.start_transaction()
+    cfg_mgr.push("route-map A permit 10")
+    cfg_mgr.update()
+    assert vtysh.calls == [["route-map A permit 10"]]
+    assert cfg_mgr.get_text() == ["route-map A permit 10", "", "     "]
+
+
+@patch.dict("sys.modules", swsscommon=swsscommon_module_mock)
+def test_manager_retries_failed_set():
+    from bgpcfgd.manager import Manager
+
+    class TestMgr(Manager):
+        def set_handler(self, key, data):
+            return self.cfg_mgr.push("%s %s" % (key, data["cmd"]))
+
+    vtysh = FakeVtysh()
+    bgpcfgd.config.run_command = vtysh
+    cfg_mgr = ConfigMgr()
+    common_objs = {
+        'directory': Directory(),
+        'cfg_mgr': cfg_mgr,
+        'constants': {},
+    }
+    mgr = TestMgr(common_objs, [], "CONFIG_DB", "TEST_TABLE")
+    cfg_mgr.start_transaction()
+    mgr.handler("good", "SET", {"cmd": "permit"})
+    mgr.handler("wrong", "SET", {"cmd": "bad"})
+    cfg_mgr.end_transaction()
+    assert len(vtysh.calls) == 1
+    assert mgr.set_queue == [("wrong", {"cmd": "bad"})]
+
+
+@patch.dict("sys.modules", swsscommon=swsscommon_module_mock)
+def test_peer_manager_forgets_only_added_peers():
+    from bgpcfgd.managers_bgp import BGPPeerMgrBase
+
+    class TestPeerMgr(BGPPeerMgrBase):
+        def __init__(self, common_objs):
+            super(BGPPeerMgrBase, self).__init__(common_objs, [], "CONFIG_DB", "BGP_NEIGHBOR")
+            self.peers = {("default", "10.0.0.1")}
+            self.peer_group_mgr = MagicMock()
+
+        def add_peer(self, vrf, nbr, data):
+            self.peers.add((vrf, nbr))
+            return self.cfg_mgr.push("neighbor %s %s" % (nbr, data["cmd"]))
+
+        def update_peer(self, vrf, nbr, data):
+            return self.cfg_mgr.push("neighbor %s shutdown %s" % (nbr, data["cmd"]))
+
+    vtysh = FakeVtysh()
+    bgpcfgd.config.run_command = vtysh
+    cfg_mgr = ConfigMgr()
+    mgr = TestPeerMgr({'directory': Directory(), 'cfg_mgr': cfg_mgr, 'constants': {}})
+    cfg_mgr.start_transaction()
+    mgr.handler("10.0.0.1", "SET", {"cmd": "bad"})  # update of an installed peer
+    mgr.handler("10.0.0.2", "SET", {"cmd": "bad"})  # new peer
+    mgr.handler("10.0.0.3", "SET", {"cmd": "permit"})
+    cfg_mgr.end_transaction()
+    assert mgr.peers == {("default", "10.0.0.1"), ("default", "10.0.0.3")}
+    assert [key for key, _ in mgr.set_queue] == ["10.0.0.1", "10.0.0.2"]
+
+
+running_config = [
+    'ip prefix-list PL_A seq 10 deny 0.0.0.0/0 le 17',
+    'ip prefix-list PL_A seq 20 permit 10.20.30.0/24 le 32',
+    'ipv6 prefix-list PL_A seq 10 deny 0::/0 le 59',
+    'bgp community-list standard COMMUNITY_A permit 1010:2020',
+    'route-map RM_A permit 10',
+    ' match ip address prefix-list PL_A',
+    ' match community COMMUNITY_A',
+    'route-map FROM_PEER permit 100',
+    ' call RM_A',
+    'route-map FROM_PEER deny 200',
+    ' call RM_B',
+    'router bgp 65100',
+    ' neighbor PEER_V4 peer-group',
+    ' neighbor PEER_V6 peer-group',
+    ' neighbor 10.0.0.1 peer-group PEER_V4',
+    ' address-family ipv4',
+    '  neighbor PEER_V4 route-map FROM_PEER in',
+    ' exit-address-family',
+    '     ',
+]
+
+
+def test_running_config_indexes():
+    conf = RunningConfig(running_config)
+    assert conf.get_prefix_list('ip', 'PL_A') == ['deny 0.0.0.0/0 le 17', 'permit 10.20.30.0/24 le 32']
+    assert conf.get_prefix_list('ipv6', 'PL_A') == ['deny 0::/0 le 59']
+    assert conf.get_prefix_list('ip', 'PL_B') == []
+    assert conf.get_community_list('COMMUNITY_A') == ['1010:2020']
+    assert conf.get_route_map('RM_A') == [(10, ['match ip address prefix-list PL_A', 'match community COMMUNITY_A'])]
+    assert conf.get_route_map_call('FROM_PEER') == 'RM_A'
+    assert conf.peer_groups == ['PEER_V4', 'PEER_V6']
+    assert conf.get_peer_group_rm_in('PEER_V4') == 'FROM_PEER'
+    assert conf.get_peer_group_rm_in('PEER_V6') is None
+
+
+def test_running_config_apply():
+    conf = RunningConfig(running_config)
+    assert conf.apply([
+        'no ip prefix-list PL_A',
+        'ip prefix-list PL_A seq 20 permit 10.20.40.0/24 le 32',
+        'ip prefix-list PL_A seq 10 deny 0.0.0.0/0 le 17',
+        'no bgp community-list standard COMMUNITY_A',
+        'no route-map RM_A permit 10',
+        'route-map RM_A permit 30000',
+        ' match ip address prefix-list PL_A',
+        'router bgp 65100',
+        ' neighbor PEER_V6 route-map FROM_PEER in',
+    ])
+    assert conf.get_prefix_list('ip', 'PL_A') == ['deny 0.0.0.0/0 le 17', 'permit 10.20.40.0/24 le 32']
+    assert conf.get_community_list('COMMUNITY_A') == []
+    assert conf.get_route_map('RM_A') == [(30000, ['match ip address prefix-list PL_A'])]
+    assert conf.get_peer_group_rm_in('PEER_V6') == 'FROM_PEER'
+    # changes which can't be tracked
+    assert not RunningConfig(running_config).apply(['no route-map RM_A'])
+    assert not RunningConfig(running_config).apply(['route-map RM_A permit 10', ' no match community COMMUNITY_A'])
+    assert not RunningConfig(running_config).apply(['router bgp 65100', ' no neighbor PEER_V4 peer-group'])
+    assert not RunningConfig(running_config).apply(['router bgp 65100', ' neighbor PEER_V4 route-map RM_A in'])
+
+
+def test_running_config_updated_by_pushes():
+    vtysh = FakeVtysh()
+    show_commands = []
+    def run_command(command):
+        if command[1] == "-c":
+            show_commands.append(command)
+            return 0, "\n".join(running_config), ""
+        return vtysh(command)
+    bgpcfgd.config.run_command = run_command
+    cfg_mgr = ConfigMgr()
+    assert cfg_mgr.get_running_config().get_prefix_list('ip', 'PL_B') == []
+    cfg_mgr.start_transaction()
+    cfg_mgr.push("ip prefix-list PL_B seq 10 permit 10.0.0.0/8")
+    assert cfg_mgr.get_running_config().get_prefix_list('ip', 'PL_B') == ['permit 10.0.0.0/8']
+    assert len(show_commands) == 1
+    cfg_mgr.push("bad command")
+    assert cfg_mgr.get_running_config().get_prefix_list('ip', 'PL_B') == []
+    assert len(show_commands) == 2
+    cfg_mgr.push("ip protocol bgp route-map RM_SET_SRC")
+    cfg_mgr.get_running_config()
+    assert len(show_commands) == 3
@@ -0,0 +1,87 @@
+from mock import MagicMock, patch
+
+from bgpcfgd.directory import Directory
+
+
+swsscommon_module_mock = MagicMock()
+swsscommon_module_mock.swsscommon.SET_COMMAND = "SET"
+swsscommon_module_mock.swsscommon.DEL_COMMAND = "DEL"
+
+
+def test_notify_on_appeared_paths():
+    directory = Directory()
+    calls = []
+    directory.subscribe([("CONFIG_DB", "DEVICE_METADATA", "localhost/bgp_asn")], lambda: calls.append("asn"))
+    directory.subscribe([("LOCAL", "interfaces", "")], lambda: calls.append("interfaces"))
+    directory.put("CONFIG_DB", "DEVICE_METADATA", "localhost", {"hostname": "switch"})
+    directory.put("CONFIG_DB", "DEVICE_METADATA", "other", {"bgp_asn": "65100"})
+    assert calls == []
+    directory.put("CONFIG_DB", "DEVICE_METADATA", "localhost", {"bgp_asn": "65100"})
+    directory.put("CONFIG_DB", "DEVICE_METADATA", "localhost", {"bgp_asn": "65200"})
+    assert calls == ["asn"]
+    directory.get_slot("LOCAL", "interfaces")  # creates an empty slot
+    directory.put("LOCAL", "interfaces", "Ethernet0", {})
+    directory.put("LOCAL", "interfaces", "Ethernet4", {})
+    assert calls == ["asn", "interfaces"]
+    directory.remove("CONFIG_DB", "DEVICE_METADATA", "localhost")
+    directory.put("CONFIG_DB", "DEVICE_METADATA", "localhost", {"bgp_asn": "65100"})
+    assert calls == ["asn", "interfaces", "asn"]
+
+
+def test_batch():
+    directory = Directory()
+    calls = []
+    def on_key(db, table, key):
+        calls.append(key)
+        if key == "10.0.0.0":
+            directory.put("LOCAL", "interfaces", "Ethernet0", {})
+    directory.subscribe([("LOCAL", "local_addresses", "")], lambda: calls.append("appeared"))
+    directory.watch("LOCAL", "local_addresses", on_key)
+    directory.watch("LOCAL", "interfaces", on_key)
+    directory.start_batch()
+    directory.put("LOCAL", "local_addresses", "10.0.0.0", {})
+    directory.put("LOCAL", "local_addresses", "10.0.0.2", {})
+    directory.put("LOCAL", "local_addresses", "10.0.0.0", {})
+    assert calls == []
+    directory.end_batch()
+    assert calls == ["appeared", "10.0.0.0", "10.0.0.2", "Ethernet0"]
+    directory.put("LOCAL", "local_addresses", "10.0.0.4", {})
+    assert calls[-1] == "10.0.0.4"
+
+
+@patch.dict("sys.modules", swsscommon=swsscommon_module_mock)
+def test_manager_wait_queues():
+    from bgpcfgd.manager import Manager
+
+    class TestMgr(Manager):
+        def __init__(self, common_objs):
+            super(TestMgr, self).__init__(common_objs, [("CONFIG_DB", "DEVICE_METADATA", "localhost")], "CONFIG_DB", "BGP_NEIGHBOR")
+            self.applied = []
+            self.calls = 0
+
+        def set_handler(self, key, data):
+            self.calls += 1
+            if data["local_addr"] not in self.directory.get_slot("LOCAL", "local_addresses"):
+                self.wait_for("LOCAL", "local_addresses", data["local_addr"])
+                return False
+            self.applied.append(key)
+            return True
+
+    directory = Directory()
+    mgr = TestMgr({'directory': directory, 'cfg_mgr': MagicMock(), 'constants': {}})
+    mgr.handler("10.0.0.1", "SET", {"local_addr": "10.0.0.0"})  # waits for the dependencies
+    directory.put("CONFIG_DB", "DEVICE_METADATA", "localhost", {})
+    assert mgr.set_queue == [] and mgr.calls == 1
+    for i in range(3, 100, 2):
+        mgr.handler("10.0.0.%d" % i, "SET", {"local_addr": "10.0.0.%d" % (i - 1)})
+    mgr.handler("10.0.0.5", "DEL", {})
+    mgr.handler("10.0.0.7", "SET", {"local_addr": "10.0.0.8"})
+    assert len(mgr.waiting) == 49 and mgr.calls == 51
+    for i in range(0, 8, 2):
+        directory.put("LOCAL", "local_addresses", "10.0.0.%d" % i, {})
+    # only the entries waiting for the put keys were processed again. 10.0.0.5 was removed, 10.0.0.7 was replaced
+    assert mgr.applied == ["10.0.0.1", "10.0.0.3"]
+    assert mgr.calls == 53
+    directory.put("LOCAL", "local_addresses", "10.0.0.8", {})
+    assert mgr.applied == ["10.0.0.1", "10.0.0.3", "10.0.0.9", "10.0.0.7"]
+    assert len(mgr.waiting) == 45 and sum(len(q) for q in mgr.wait_queues.values()) == 45
@@ -0,0 +1,69 @@
+import os
+
+from mock import MagicMock, patch
+
+from bgpcfgd.template import TemplateFabric
+
+
+TEMPLATE_PATH = os.path.abspath('../../dockers/docker-fpm-frr/frr')
+
+swsscommon_module_mock = MagicMock()
+
+
+def kwargs_for(nbr, sub_role='', loopback0_ipv4='10.1.0.32/32'):
+    return {
+        'CONFIG_DB__DEVICE_METADATA': {'localhost': {'type': 'LeafRouter', 'sub_role': sub_role}},
+        'constants': {'bgp': {}},
+        'bgp_asn': '65100',
+        'vrf': 'default',
+        'neighbor_addr': nbr,
+        'bgp_session': {'name': 'PEER_%s' % nbr},
+        'loopback0_ipv4': loopback0_ipv4,
+    }
+
+
+@patch.dict("sys.modules", swsscommon=swsscommon_module_mock)
+def test_render_and_push_once():
+    from bgpcfgd.managers_bgp import BGPPeerGroupMgr
+    tf = TemplateFabric(TEMPLATE_PATH)
+    cfg_mgr = MagicMock()
+    cfg_mgr.push.return_value = True
+    mgr = BGPPeerGroupMgr({'cfg_mgr': cfg_mgr, 'constants': {}, 'tf': tf}, "bgpd/templates/general/")
+    assert mgr.template_variables[mgr.policy_template.name] == {'constants', 'CONFIG_DB__DEVICE_METADATA', 'loopback0_ipv4'}
+    for i in range(100):
+        assert mgr.update("10.0.0.%d" % i, **kwargs_for("10.0.0.%d" % i))
+    assert cfg_mgr.push.call_count == 2
+    assert len(mgr.rendered) == 2
+    policy = cfg_mgr.push.call_args_list[0][0][0]
+    assert policy == mgr.policy_template.render(**kwargs_for("10.0.0.0"))
+
+    # the policy depends on sub_role
+    assert mgr.update("10.0.0.1", **kwargs_for("10.0.0.1", sub_role='BackEnd'))
+    assert cfg_mgr.push.call_count == 4
+
+    # the first commands are pushed again, they were replaced in FRR
+    assert mgr.update("10.0.0.1", **kwargs_for("10.0.0.1"))
+    assert cfg_mgr.push.call_count == 6
+    assert mgr.update("10.0.0.2", **kwargs_for("10.0.0.2"))
+    assert cfg_mgr.push.call_count == 6
+
+    # the commands are pushed again after a failure
+    mgr.forget_applied()
+    assert mgr.update("10.0.0.1", **kwargs_for("10.0.0.1"))
+    assert cfg_mgr.push.call_count == 8
+    # only the last render of each template is kept
+    assert len(mgr.rendered) == 2
+
+
+@patch.dict("sys.modules", swsscommon=swsscommon_module_mock)
+def test_failed_push_is_not_remembered():
+    from bgpcfgd.managers_bgp import BGPPeerGroupMgr
+    tf = TemplateFabric(TEMPLATE_PATH)
+    cfg_mgr = MagicMock()
+    cfg_mgr.push.return_value = False
+    mgr = BGPPeerGroupMgr({'cfg_mgr': cfg_mgr, 'constants': {}, 'tf': tf}, "bgpd/templates/monitors/")
+    assert not mgr.update("10.0.0.1", **kwargs_for("10.0.0.1"))
+    cfg_mgr.push.return_value = True
+    assert mgr.update("10.0.0.1", **kwargs_for("10.0.0.1"))
+    assert mgr.update("10.0.0.2", **kwargs_for("10.0.0.2"))
+    assert cfg_mgr.push.call_count == 4
@@ -0,0 +1,32 @@
+import json
+
+from mock import MagicMock, patch
+
+
+swsscommon_module_mock = MagicMock()
+
+
+@patch.dict("sys.modules", swsscommon=swsscommon_module_mock)
+def test_peer_inventory():
+    import bgpcfgd.managers_bgp
+    from bgpcfgd.managers_bgp import BGPPeerInventory
+    commands = []
+    def run_vtysh_command(command):
+        commands.append(command)
+        return 0, json.dumps({
+            "default": {
+                "ipv4Unicast": {"peers": {"10.0.0.1": {}, "10.0.0.3": {}}},
+                "ipv6Unicast": {"peers": {"fc00::2": {}, "10.0.0.3": {}}},
+            },
+            "Vrf1": {
+                "ipv4Unicast": {"peers": {"10.1.0.1": {}}},
+                "l2VpnEvpn": {},
+            },
+        }), ""
+    bgpcfgd.managers_bgp.run_vtysh_command = run_vtysh_command
+    inventory = BGPPeerInventory()
+    peers = inventory.get_peers()
+    assert peers == {("default", "10.0.0.1"), ("default", "10.0.0.3"), ("default", "fc00::2"), ("Vrf1", "10.1.0.1")}
+    peers.add(("default", "10.0.0.5"))  # every manager gets its own copy
+    assert len(inventory.get_peers()) == 4
+    assert commands == ["show bgp vrf all summary json"]
@@ -0,0 +1,64 @@
+from mock import MagicMock, patch
+
+
+swsscommon_module_mock = MagicMock()
+swsscommon_module_mock.swsscommon.SET_COMMAND = "SET"
+swsscommon_module_mock.swsscommon.DEL_COMMAND = "DEL"
+
+
+class FakeSubscriber(object):
+    def __init__(self, table_name, messages):
+        self.table_name = table_name
+        self.messages = list(messages)
+
+    def pop(self):
+        if not self.messages:
+            return "", "", ()
+        return self.messages.pop(0)
+
+    def getDbConnector(self):
+        connector = MagicMock()
+        connector.getDbId.return_value = 4
+        return connector
+
+    def getTableName(self):
+        return self.table_name
+
+
+@patch.dict("sys.modules", swsscommon=swsscommon_module_mock)
+def test_coalesce():
+    from bgpcfgd.runner import Runner
+    runner = Runner()
+    events = runner.coalesce([
+        ("10.0.0.1", "SET", (("asn", "65100"),)),
+        ("10.0.0.2", "SET", (("asn", "65200"),)),
+        ("10.0.0.1", "SET", (("asn", "65101"),)),
+        ("10.0.0.3", "SET", (("asn", "65300"),)),
+        ("10.0.0.3", "DEL", ()),
+        ("10.0.0.2", "DEL", ()),
+        ("10.0.0.2", "SET", (("asn", "65201"),)),
+        ("10.0.0.4", "DEL", ()),
+        ("10.0.0.4", "DEL", ()),
+    ])
+    assert events == [
+        ("10.0.0.1", "SET", {"asn": "65101"}),
+        ("10.0.0.2", "DEL", {}),
+        ("10.0.0.2", "SET", {"asn": "65201"}),
+        ("10.0.0.3", "DEL", {}),
+        ("10.0.0.4", "DEL", {}),
+    ]
+    assert runner.counters['coalesced'] == 4
+
+
+@patch.dict("sys.modules", swsscommon=swsscommon_module_mock)
+def test_process_subscribers():
+    from bgpcfgd.runner import Runner
+    runner = Runner()
+    calls = []
+    runner.callbacks[4]["BGP_NEIGHBOR"].append(lambda key, op, data: calls.append((key, op, data)))
+    runner.subscribers.add(FakeSubscriber("BGP_NEIGHBOR", [
+        ("10.0.0.%d" % (i % 10), "SET", (("admin_status", "up" if i < 90 else "down"),)) for i in range(100)
+    ]))
+    runner.process_subscribers()
+    assert calls == [("10.0.0.%d" % i, "SET", {"admin_status": "down"}) for i in range(10)]
+    assert runner.counters == {'received': 100, 'coalesced': 90, 'applied': 10}
@@ -0,0 +1,99 @@
+import os
+import shutil
+import socket
+import tempfile
+import threading
+
+import bgpcfgd.utils
+from bgpcfgd.vty import VtyClient
+
+
+class FakeDaemon(object):
+    """ Serve the vtysh protocol on a unix socket. Close the connection after 'close' command """
+    def __init__(self, vty_dir, daemon, responses):
+        self.responses = responses
+        self.commands = []
+        self.connections = 0
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(os.path.join(vty_dir, daemon + ".vty"))
+        self.sock.listen(5)
+        thread = threading.Thread(target=self.serve)
+        thread.daemon = True
+        thread.start()
+
+    def serve(self):
+        while True:
+            conn, _ = self.sock.accept()
+            self.connections += 1
+            buf = b""
+            while True:
+                data = conn.recv(4096)
+                if not data:
+                    break
+                buf += data
+                while b"\0" in buf:
+                    command, buf = buf.split(b"\0", 1)
+                    command = command.decode()
+                    self.commands.append(command)
+                    if command == "close":
+                        conn.close()
+                        break
+                    ret_code, out = self.responses.get(command, (2, "% Unknown command\n"))
+                    # send the output and the trailer separately, as the daemons do
+                    conn.sendall(out.encode())
+                    conn.sendall(b"\0\0\0" + bytearray([ret_code]))
+                else:
+                    continue
+                break
+
+
+def setup_module():
+    global vty_dir
+    vty_dir = tempfile.mkdtemp()
+
+
+def teardown_module():
+    shutil.rmtree(vty_dir)
+
+
+def test_execute():
+    daemon = FakeDaemon(vty_dir, "bgpd", {
+        "enable": (0, ""),
+        "show bgp vrfs json": (0, '{"vrfs": {"default": {}}}\n' * 10000),
+    })
+    client = VtyClient("bgpd", vty_dir=vty_dir)
+    assert client.execute("show bgp vrfs json") == (0, '{"vrfs": {"default": {}}}\n' * 10000)
+    assert client.execute("show bgp wrong") == (2, "% Unknown command\n")
+    assert client.execute("show bgp vrfs json")[0] == 0
+    assert daemon.connections == 1
+    assert daemon.commands == ["enable", "show bgp vrfs json", "show bgp wrong", "show bgp vrfs json"]
+
+
+def test_reconnect():
+    daemon = FakeDaemon(vty_dir, "zebra", {"enable": (0, ""), "show version": (0, "FRRouting\n")})
+    client = VtyClient("zebra", vty_dir=vty_dir)
+    assert client.execute("show version") == (0, "FRRouting\n")
+    client.sock.sendall(b"close\0")
+    assert client.execute("show version") == (0, "FRRouting\n")
+    assert daemon.connections == 2
+
+
+def test_unreachable():
+    client = VtyClient("staticd", vty_dir=vty_dir)
+    assert not client.connect()
+    assert client.execute("show version") == (None, "")
+
+
+def test_run_vtysh_command_fallback():
+    bgpcfgd.utils.vty_clients["ospfd"] = VtyClient("ospfd", vty_dir=vty_dir)
+    commands = []
+    def run_command(command, hide_errors=False):
+        commands.append(command)
+        return 0, "output", ""
+    saved_run_command = bgpcfgd.utils.run_command
+    bgpcfgd.utils.run_command = run_command
+    try:
+        assert bgpcfgd.utils.run_vtysh_command("show ip ospf", daemon="ospfd") == (0, "output", "")
+    finally:
+        bgpcfgd.utils.run_command = saved_run_command
+    assert commands == [["vtysh", "-c", "show ip ospf"]]
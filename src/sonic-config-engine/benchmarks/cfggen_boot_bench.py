@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""cfggen_boot_bench.py
+
+Compare the total wall time of a docker start sequence of sonic-cfggen calls
+with and without a sonic-cfggen server (see cfggen_server.py).
+
+The sequence file has one sonic-cfggen command line per line, without the
+program name; empty lines and lines starting with '#' are ignored. The default
+sequence mimics the calls made by the restapi, lldp and swss start scripts,
+with the minigraph test data standing in for CONFIG_DB so the benchmark can run
+without redis. Use a sequence with '-d' calls on a switch to measure the real
+boot path.
+
+Usage:
+    cfggen_boot_bench.py [-s SEQUENCE_FILE] [-i ITERATIONS]
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.realpath(__file__))
+ENGINE_DIR = os.path.join(BENCH_DIR, '..')
+TESTS_DIR = os.path.join(ENGINE_DIR, 'tests')
+DOCKERS_DIR = os.path.join(ENGINE_DIR, '..', '..', 'dockers')
+
+MINIGRAPH = '-m {0}/t0-sample-graph.xml -p {0}/t0-sample-port-config.ini'.format(TESTS_DIR)
+
+DEFAULT_SEQUENCE = [
+    MINIGRAPH + ' -v "1 if RESTAPI and RESTAPI[\'config\']"',
+    MINIGRAPH + ' -v "RESTAPI[\'config\'][\'client_auth\'] if RESTAPI"',
+    MINIGRAPH + ' -v "RESTAPI[\'certs\'] if RESTAPI"',
+    MINIGRAPH + ' -v "RESTAPI[\'config\'][\'allow_insecure\'] if RESTAPI"',
+    MINIGRAPH + ' -v "RESTAPI[\'certs\'][\'server_crt\'] if RESTAPI"',
+    MINIGRAPH + ' -v "RESTAPI[\'certs\'][\'server_key\'] if RESTAPI"',
+    MINIGRAPH + ' -v "RESTAPI[\'certs\'][\'ca_crt\'] if RESTAPI"',
+    MINIGRAPH + ' -v "RESTAPI[\'config\'][\'log_level\'] if RESTAPI"',
+    MINIGRAPH + ' -v "DEVICE_METADATA[\'localhost\'][\'hwsku\']"',
+    MINIGRAPH + ' -t {0}/docker-lldp/lldpd.conf.j2'.format(DOCKERS_DIR),
+    MINIGRAPH + ' -t {0}/docker-orchagent/ports.json.j2'.format(DOCKERS_DIR),
+    MINIGRAPH + ' -t {0}/docker-dhcp-relay/docker-dhcp-relay.supervisord.conf.j2'.format(DOCKERS_DIR),
+    MINIGRAPH + ' --var-json PORT',
+]
+
+
+def load_sequence(filename):
+    if filename is None:
+        return [shlex.split(line) for line in DEFAULT_SEQUENCE]
+    sequence = []
+    with open(filename) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                sequence.append(shlex.split(line))
+    return sequence
+
+
+def run_sequence(cfggen, sequence, socket_path):
+    env = dict(os.environ)
+    env['SONIC_CFGGEN_SOCKET'] = socket_path
+    outputs = []
+    with open(os.devnull, 'w') as devnull:
+        start = time.time()
+        for argv in sequence:
+            outputs.append(subprocess.check_output(cfggen + argv, env=env, stderr=devnull))
+        return time.time() - start, outputs
+
+
+def wait_for_socket(socket_path, timeout=30):
+    deadline = time.time() + timeout
+    while not os.path.exists(socket_path):
+        if time.time() > deadline:
+            raise RuntimeError("cfggen server didn't come up on %s" % socket_path)
+        time.sleep(0.05)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark a sonic-cfggen start sequence with and without the cfggen server")
+    parser.add_argument("-s", "--sequence", help="file with one sonic-cfggen command line per line")
+    parser.add_argument("-i", "--iterations", help="number of times to run the sequence", type=int, default=3)
+    parser.add_argument("-c", "--cfggen", help="sonic-cfggen script", default=os.path.join(ENGINE_DIR, 'sonic-cfggen'))
+    args = parser.parse_args()
+
+    cfggen = [sys.executable, args.cfggen]
+    sequence = load_sequence(args.sequence)
+    socket_path = os.path.join(tempfile.mkdtemp(), 'sonic-cfggen.sock')
+
+    local_times = []
+    for _ in range(args.iterations):
+        elapsed, local_outputs = run_sequence(cfggen, sequence, '')
+        local_times.append(elapsed)
+
+    # The server start-up is part of the boot sequence, so it is included in the measurement
+    served_times = []
+    for _ in range(args.iterations):
+        start = time.time()
+        server = subprocess.Popen(cfggen + ['--server', socket_path])
+        try:
+            wait_for_socket(socket_path)
+            _, served_outputs = run_sequence(cfggen, sequence, socket_path)
+            served_times.append(time.time() - start)
+        finally:
+            server.terminate()
+            server.wait()
+
+    if served_outputs != local_outputs:
+        print("WARNING: outputs differ with and without the server", file=sys.stderr)
+
+    local = min(local_times)
+    served = min(served_times)
+    print("calls per sequence:         %d" % len(sequence))
+    print("without server:             %.3f s (%.1f ms/call)" % (local, local * 1000 / len(sequence)))
+    print("with server (incl. start):  %.3f s (%.1f ms/call)" % (served, served * 1000 / len(sequence)))
+    print("speedup:                    %.2fx" % (local / served))
+
+
+if __name__ == "__main__":
+    main()
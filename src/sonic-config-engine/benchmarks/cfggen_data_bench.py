@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""cfggen_data_bench.py
+
+Measure how sonic-cfggen handles a large configuration: converting the keys
+of the loaded json (FormatConverter.to_deserialized), merging it into the
+data (deep_update), converting the keys back (FormatConverter.to_serialized)
+and printing the result (--print-data).
+
+The synthetic config has ACL_RULE, VLAN_MEMBER and INTERFACE tables with the
+requested total number of keys. The stages are timed in process, on the
+functions of the sonic-cfggen script, and end to end with
+'sonic-cfggen -j config.json -j overlay.json --print-data'.
+
+Usage:
+    cfggen_data_bench.py [-k KEYS] [-i ITERATIONS] [-c SONIC_CFGGEN]
+"""
+
+from __future__ import print_function
+
+import argparse
+import copy
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.realpath(__file__))
+ENGINE_DIR = os.path.join(BENCH_DIR, '..')
+sys.path.insert(0, ENGINE_DIR)
+
+
+def load_cfggen(path):
+    """ :return: the sonic-cfggen script loaded as a module """
+    try:
+        from importlib.machinery import SourceFileLoader
+        return SourceFileLoader('sonic_cfggen', path).load_module()
+    except ImportError:
+        import imp
+        return imp.load_source('sonic_cfggen', path)
+
+
+def make_config(keys):
+    """ :return: serialized config DB data with about the given number of keys """
+    acl_rules = keys * 2 // 5
+    vlan_members = keys * 3 // 10
+    interfaces = keys - acl_rules - vlan_members
+    config = {'ACL_RULE': {}, 'VLAN_MEMBER': {}, 'INTERFACE': {}}
+    for i in range(acl_rules):
+        config['ACL_RULE']['DATAACL_%d|RULE_%d' % (i // 1000, i % 1000)] = {
+            'PRIORITY': str(9999 - i % 1000),
+            'PACKET_ACTION': 'FORWARD',
+            'SRC_IP': '10.%d.%d.0/24' % (i // 256 % 256, i % 256),
+            'IP_PROTOCOL': '6',
+        }
+    for i in range(vlan_members):
+        config['VLAN_MEMBER']['Vlan%d|Ethernet%d' % (i // 64 + 2, i % 64 * 4)] = {'tagging_mode': 'tagged'}
+    for i in range(interfaces):
+        port = 'Ethernet%d' % (i // 2 * 4)
+        if i % 2:
+            config['INTERFACE']['%s|10.%d.%d.%d/31' % (port, i // 65536 % 256, i // 256 % 256, i % 256)] = {}
+        else:
+            config['INTERFACE'][port] = {}
+    return config
+
+
+def make_overlay(config):
+    """ :return: a config updating one entry out of ten of config and adding a new table """
+    overlay = {'DEVICE_METADATA': {'localhost': {'hostname': 'bench'}}}
+    for table, entries in config.items():
+        overlay[table] = dict((key, {'bench': 'true'}) for n, key in enumerate(sorted(entries)) if n % 10 == 0)
+    return overlay
+
+
+def timed(function, *args):
+    start = time.time()
+    function(*args)
+    return time.time() - start
+
+
+def bench_stages(cfggen, config, overlay, iterations):
+    stages = {}
+
+    def stage(name, elapsed):
+        stages[name] = min(stages.get(name, elapsed), elapsed)
+
+    with open(os.devnull, 'w') as devnull:
+        for _ in range(iterations):
+            deserialized = copy.deepcopy(config)
+            stage('to_deserialized', timed(cfggen.FormatConverter.to_deserialized, deserialized))
+            deserialized_overlay = cfggen.FormatConverter.to_deserialized(copy.deepcopy(overlay))
+            data = {}
+            stage('deep_update (new tables)', timed(cfggen.deep_update, data, deserialized))
+            stage('deep_update (overlay)', timed(cfggen.deep_update, data, deserialized_overlay))
+            stage('to_serialized', timed(cfggen.FormatConverter.to_serialized, data))
+            stdout = sys.stdout
+            sys.stdout = devnull
+            try:
+                if hasattr(cfggen, '_print_json'):
+                    stage('print json', timed(cfggen._print_json, data))
+                else:
+                    stage('print json', timed(lambda d: print(json.dumps(d, indent=4, cls=cfggen.minigraph_encoder)), data))
+            finally:
+                sys.stdout = stdout
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sonic-cfggen data merging and printing on a large config")
+    parser.add_argument("-k", "--keys", help="number of config keys", type=int, default=100000)
+    parser.add_argument("-i", "--iterations", type=int, default=3)
+    parser.add_argument("-c", "--cfggen", help="sonic-cfggen script", default=os.path.join(ENGINE_DIR, 'sonic-cfggen'))
+    args = parser.parse_args()
+
+    cfggen = load_cfggen(args.cfggen)
+    config = make_config(args.keys)
+    overlay = make_overlay(config)
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        config_file = os.path.join(work_dir, 'config.json')
+        overlay_file = os.path.join(work_dir, 'overlay.json')
+        with open(config_file, 'w') as f:
+            json.dump(config, f)
+        with open(overlay_file, 'w') as f:
+            json.dump(overlay, f)
+
+        stages = bench_stages(cfggen, config, overlay, args.iterations)
+
+        env = dict(os.environ)
+        env['SONIC_CFGGEN_SOCKET'] = ''
+        end_to_end = []
+        for _ in range(args.iterations):
+            start = time.time()
+            with open(os.devnull, 'w') as devnull:
+                subprocess.check_call([sys.executable, args.cfggen, '-j', config_file, '-j', overlay_file, '--print-data'],
+                                      stdout=devnull, env=env)
+            end_to_end.append(time.time() - start)
+
+        print("keys:                       %d" % sum(len(entries) for entries in config.values()))
+        for name in ['to_deserialized', 'deep_update (new tables)', 'deep_update (overlay)', 'to_serialized', 'print json']:
+            print("%-27s %.3f s" % (name + ':', stages[name]))
+        print("sonic-cfggen --print-data:  %.3f s" % min(end_to_end))
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
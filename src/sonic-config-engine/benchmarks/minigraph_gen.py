@@ -0,0 +1,451 @@
+#!/usr/bin/env python
+"""minigraph_gen.py
+
+Generate a synthetic multi-asic T2 chassis line card minigraph, with the port
+config files of the host and of every asic, to benchmark the minigraph parser
+at scale.
+
+The frontend asics own the front panel ports, bundled by pairs in port channels
+to one neighbor each, and are connected to every backend asic through an
+internal port channel. Extra devices (servers, linked to the neighbors, with
+their device and link metadata) make the device and link tables as large as on
+a big deployment.
+
+Usage:
+    minigraph_gen.py [-f FRONTEND_ASICS] [-b BACKEND_ASICS] [-p PORTS] [-d DEVICES] OUTPUT_DIR
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import socket
+import struct
+
+HOSTNAME = 'chassis-lc01'
+HWSKU = 'synthetic-chassis-lc'
+ASIC_HWSKU = 'synthetic-chassis-asic'
+LOCAL_ASN = '65100'
+NEIGHBOR_ASN = '65200'
+
+EXT_BASE = 0x0a000000   # 10.0.0.0, host and frontend asics to neighbors
+INT_BASE = 0x0a010000   # 10.1.0.0, frontend to backend asics
+LO_BASE = 0x08000000    # 8.0.0.0, asic loopbacks
+
+NS_A = 'xmlns:a="http://schemas.datacontract.org/2004/07/Microsoft.Search.Autopilot.Evolution"'
+
+
+def ip(base, offset):
+    return socket.inet_ntoa(struct.pack('!I', base + offset))
+
+
+class Chassis(object):
+    """ Names and addresses of the generated line card """
+
+    def __init__(self, frontend_asics, backend_asics, ports):
+        self.frontend_asics = frontend_asics
+        self.backend_asics = backend_asics
+        self.ports = ports
+        self.asics = ['ASIC%d' % i for i in range(frontend_asics + backend_asics)]
+
+    def front_port(self, asic, port):
+        """ :return: (name, alias, asic port name) of a front panel port """
+        index = asic * self.ports + port
+        return ('Ethernet%d' % (index * 4), 'Ethernet1/%d' % (index + 1), 'Eth%d-ASIC%d' % (port, asic))
+
+    def internal_port(self, asic, port):
+        """ :return: (name, asic port name) of a backplane port, internal port numbers follow the front ones """
+        index = asic * 1000 + port
+        return ('Ethernet-BP%d' % (index * 4), 'Eth%d-ASIC%d' % (self.ports + port, asic))
+
+    def neighbors(self):
+        """ :return: list of (neighbor, frontend asic, [front ports], session index) """
+        neighbors = []
+        for asic in range(self.frontend_asics):
+            for port in range(0, self.ports, 2):
+                index = len(neighbors)
+                neighbors.append(('T3-%04d' % index, asic, [port, port + 1], index))
+        return neighbors
+
+    def fabric_links(self):
+        """ :return: list of (frontend asic, backend asic, [frontend ports], [backend ports], index) """
+        links = []
+        for fe in range(self.frontend_asics):
+            for be in range(self.backend_asics):
+                links.append((fe, self.frontend_asics + be, [2 * be, 2 * be + 1], [2 * fe, 2 * fe + 1], len(links)))
+        return links
+
+
+def bgp_session(start_router, start_peer, end_router, end_peer, holdtime='10', keepalive='3'):
+    return '''      <BGPSession>
+        <MacSec>false</MacSec>
+        <StartRouter>%s</StartRouter>
+        <StartPeer>%s</StartPeer>
+        <EndRouter>%s</EndRouter>
+        <EndPeer>%s</EndPeer>
+        <Multihop>1</Multihop>
+        <HoldTime>%s</HoldTime>
+        <KeepAliveTime>%s</KeepAliveTime>
+      </BGPSession>
+''' % (start_router, start_peer, end_router, end_peer, holdtime, keepalive)
+
+
+def bgp_router(hostname, asn, peers=None):
+    if peers is None:
+        return '''      <a:BGPRouterDeclaration>
+        <a:ASN>%s</a:ASN>
+        <a:Hostname>%s</a:Hostname>
+        <a:RouteMaps/>
+      </a:BGPRouterDeclaration>
+''' % (asn, hostname)
+    peer_list = ''.join('''          <BGPPeer>
+            <Address>%s</Address>
+            <RouteMapIn i:nil="true"/>
+            <RouteMapOut i:nil="true"/>
+            <Vrf i:nil="true"/>
+          </BGPPeer>
+''' % peer for peer in peers)
+    return '''      <a:BGPRouterDeclaration>
+        <a:ASN>%s</a:ASN>
+        <a:Hostname>%s</a:Hostname>
+        <a:Peers>
+%s        </a:Peers>
+        <a:RouteMaps/>
+      </a:BGPRouterDeclaration>
+''' % (asn, hostname, peer_list)
+
+
+def cpg(chassis):
+    sessions = []
+    routers = {HOSTNAME: []}
+    for asic in chassis.asics:
+        routers[asic] = []
+    for (neighbor, asic, _, index) in chassis.neighbors():
+        local, peer = ip(EXT_BASE, 2 * index), ip(EXT_BASE, 2 * index + 1)
+        for router in (HOSTNAME, chassis.asics[asic]):
+            sessions.append(bgp_session(router, local, neighbor, peer))
+            routers[router].append(peer)
+    for (fe, be, _, _, index) in chassis.fabric_links():
+        fe_addr, be_addr = ip(INT_BASE, 2 * index), ip(INT_BASE, 2 * index + 1)
+        sessions.append(bgp_session(chassis.asics[be], be_addr, chassis.asics[fe], fe_addr, '0', '0'))
+        routers[chassis.asics[fe]].append(be_addr)
+        routers[chassis.asics[be]].append(fe_addr)
+
+    declarations = [bgp_router(HOSTNAME, LOCAL_ASN, routers[HOSTNAME])]
+    declarations += [bgp_router(asic, LOCAL_ASN, routers[asic]) for asic in chassis.asics]
+    declarations += [bgp_router(neighbor, NEIGHBOR_ASN) for (neighbor, _, _, _) in chassis.neighbors()]
+    return '''  <CpgDec>
+    <PeeringSessions>
+%s    </PeeringSessions>
+    <Routers %s>
+%s    </Routers>
+  </CpgDec>
+''' % (''.join(sessions), NS_A, ''.join(declarations))
+
+
+def loopback(name, attach, prefix):
+    return '''        <a:LoopbackIPInterface>
+          <Name>%s</Name>
+          <AttachTo>%s</AttachTo>
+          <a:Prefix xmlns:b="Microsoft.Search.Autopilot.Evolution">
+            <b:IPPrefix>%s</b:IPPrefix>
+          </a:Prefix>
+          <a:PrefixStr>%s</a:PrefixStr>
+        </a:LoopbackIPInterface>
+''' % (name, attach, prefix, prefix)
+
+
+def device_data_plane(hostname, loopbacks, port_channels, ip_interfaces, host=False):
+    """ :param port_channels: list of (name, [members]); ip_interfaces: list of (attach to, prefix) """
+    if host:
+        mgmt = '''      <ManagementIPInterfaces %s>
+        <a:ManagementIPInterface>
+          <Name>HostIP</Name>
+          <AttachTo>eth0</AttachTo>
+          <a:Prefix xmlns:b="Microsoft.Search.Autopilot.Evolution">
+            <b:IPPrefix>10.250.0.10/24</b:IPPrefix>
+          </a:Prefix>
+          <a:PrefixStr>10.250.0.10/24</a:PrefixStr>
+        </a:ManagementIPInterface>
+      </ManagementIPInterfaces>
+''' % NS_A
+        acls = '''      <AclInterfaces>
+        <AclInterface>
+          <InAcl>SNMP_ACL</InAcl>
+          <AttachTo>SNMP</AttachTo>
+          <Type>SNMP</Type>
+        </AclInterface>
+        <AclInterface>
+          <AttachTo>ERSPAN</AttachTo>
+          <InAcl>Everflow</InAcl>
+          <Type>Everflow</Type>
+        </AclInterface>
+        <AclInterface>
+          <AttachTo>%s</AttachTo>
+          <InAcl>DataAcl</InAcl>
+          <Type>DataPlane</Type>
+        </AclInterface>
+      </AclInterfaces>
+''' % ';'.join(name for (name, _) in port_channels)
+    else:
+        mgmt = '      <ManagementIPInterfaces %s/>\n' % NS_A
+        acls = ''
+    return '''    <DeviceDataPlaneInfo>
+      <LoopbackIPInterfaces %s>
+%s      </LoopbackIPInterfaces>
+%s      <Hostname>%s</Hostname>
+      <PortChannelInterfaces>
+%s      </PortChannelInterfaces>
+      <VlanInterfaces/>
+      <IPInterfaces>
+%s      </IPInterfaces>
+      <DataAcls/>
+%s    </DeviceDataPlaneInfo>
+''' % (NS_A, ''.join(loopbacks), mgmt, hostname,
+       ''.join('''        <PortChannel>
+          <Name>%s</Name>
+          <AttachTo>%s</AttachTo>
+          <SubInterface/>
+        </PortChannel>
+''' % (name, ';'.join(members)) for (name, members) in port_channels),
+       ''.join('''        <IPInterface>
+          <Name i:nil="true"/>
+          <AttachTo>%s</AttachTo>
+          <Prefix>%s</Prefix>
+        </IPInterface>
+''' % (attach, prefix) for (attach, prefix) in ip_interfaces), acls)
+
+
+def dpg(chassis):
+    host_pcs = []
+    host_ips = []
+    asic_pcs = dict((asic, []) for asic in range(len(chassis.asics)))
+    asic_ips = dict((asic, []) for asic in range(len(chassis.asics)))
+    for (_, asic, ports, index) in chassis.neighbors():
+        pc = 'PortChannel%04d' % (index + 1)
+        host_pcs.append((pc, [chassis.front_port(asic, port)[1] for port in ports]))
+        asic_pcs[asic].append((pc, [chassis.front_port(asic, port)[2] for port in ports]))
+        for ips in (host_ips, asic_ips[asic]):
+            ips.append((pc, ip(EXT_BASE, 2 * index) + '/31'))
+    for (fe, be, fe_ports, be_ports, index) in chassis.fabric_links():
+        fe_pc = 'PortChannel%d' % (4001 + 2 * index)
+        be_pc = 'PortChannel%d' % (4002 + 2 * index)
+        asic_pcs[fe].append((fe_pc, [chassis.internal_port(fe, port)[1] for port in fe_ports]))
+        asic_pcs[be].append((be_pc, [chassis.internal_port(be, port)[1] for port in be_ports]))
+        asic_ips[fe].append((fe_pc, ip(INT_BASE, 2 * index) + '/31'))
+        asic_ips[be].append((be_pc, ip(INT_BASE, 2 * index + 1) + '/31'))
+
+    decs = [device_data_plane(HOSTNAME, [loopback('HostIP', 'Loopback0', '10.1.255.1/32')], host_pcs, host_ips, host=True)]
+    for asic, name in enumerate(chassis.asics):
+        decs.append(device_data_plane(name, [loopback('HostIP', 'Loopback4096', ip(LO_BASE, asic) + '/32')], asic_pcs[asic], asic_ips[asic]))
+    return '  <DpgDec>\n%s  </DpgDec>\n' % ''.join(decs)
+
+
+def link(start_device, start_port, end_device, end_port, internal=False):
+    return '''      <DeviceLinkBase>
+        <ElementType>DeviceInterfaceLink</ElementType>
+        <Bandwidth>100000</Bandwidth>
+        <ChassisInternal>%s</ChassisInternal>
+        <EndDevice>%s</EndDevice>
+        <EndPort>%s</EndPort>
+        <StartDevice>%s</StartDevice>
+        <StartPort>%s</StartPort>
+      </DeviceLinkBase>
+''' % ('true' if internal else 'false', end_device, end_port, start_device, start_port)
+
+
+def device(hostname, d_type, hwsku, mgmt_addr):
+    return '''      <Device i:type="%s">
+        <Hostname>%s</Hostname>
+        <HwSku>%s</HwSku>
+        <ManagementAddress xmlns:a="Microsoft.Search.Autopilot.NetMux">
+          <a:IPPrefix>%s</a:IPPrefix>
+        </ManagementAddress>
+      </Device>
+''' % (d_type, hostname, hwsku, mgmt_addr)
+
+
+def png(chassis, devices):
+    links = []
+    for (neighbor, asic, ports, _) in chassis.neighbors():
+        for i, port in enumerate(ports):
+            (_, alias, asic_port) = chassis.front_port(asic, port)
+            links.append(link(HOSTNAME, alias, neighbor, 'Ethernet%d' % (i + 1)))
+            links.append(link(HOSTNAME, alias, chassis.asics[asic], asic_port, internal=True))
+    for (fe, be, fe_ports, be_ports, _) in chassis.fabric_links():
+        for fe_port, be_port in zip(fe_ports, be_ports):
+            links.append(link(chassis.asics[fe], chassis.internal_port(fe, fe_port)[1],
+                              chassis.asics[be], chassis.internal_port(be, be_port)[1], internal=True))
+
+    device_list = [device(HOSTNAME, 'SpineRouter', HWSKU, '10.250.0.10')]
+    device_list += [device(asic, 'Asic', ASIC_HWSKU, '0.0.0.0/0') for asic in chassis.asics]
+    device_list += [device(neighbor, 'CoreRouter', 'Arista-VM', ip(0x0afa0000, 100 + index))
+                    for (neighbor, _, _, index) in chassis.neighbors()]
+    device_list += [device('Server-%05d' % i, 'Server', 'Generic', ip(0x0b000000, i)) for i in range(devices)]
+    for (server, neighbor, port) in server_links(chassis, devices):
+        links.append(link(server, 'eth0', neighbor, port))
+    return '''  <PngDec>
+    <DeviceInterfaceLinks>
+%s    </DeviceInterfaceLinks>
+    <Devices>
+%s    </Devices>
+  </PngDec>
+''' % (''.join(links), ''.join(device_list))
+
+
+def server_links(chassis, devices):
+    """ :return: list of (server, neighbor, neighbor port) of the extra devices, spread over the neighbors """
+    neighbors = chassis.neighbors()
+    if not neighbors:
+        return []
+    return [('Server-%05d' % i, neighbors[i % len(neighbors)][0], 'Ethernet%d' % (3 + i // len(neighbors)))
+            for i in range(devices)]
+
+
+def device_infos(chassis):
+    interfaces = []
+    for asic in range(chassis.frontend_asics):
+        for port in range(chassis.ports):
+            interfaces.append('''        <a:EthernetInterface>
+          <ElementType>DeviceInterface</ElementType>
+          <InterfaceName>%s</InterfaceName>
+          <Speed>100000</Speed>
+        </a:EthernetInterface>
+''' % chassis.front_port(asic, port)[1])
+    return '''  <DeviceInfos>
+    <DeviceInfo>
+      <EthernetInterfaces %s>
+%s      </EthernetInterfaces>
+      <HwSku>%s</HwSku>
+      <ManagementInterfaces/>
+    </DeviceInfo>
+  </DeviceInfos>
+''' % (NS_A, ''.join(interfaces), HWSKU)
+
+
+def device_metadata(name, properties):
+    return '''      <a:DeviceMetadata>
+        <a:Name>%s</a:Name>
+        <a:Properties>
+%s        </a:Properties>
+      </a:DeviceMetadata>
+''' % (name, ''.join('''          <a:DeviceProperty>
+            <a:Name>%s</a:Name>
+            <a:Reference i:nil="true"/>
+            <a:Value>%s</a:Value>
+          </a:DeviceProperty>
+''' % prop for prop in properties))
+
+
+def metadata(chassis, devices):
+    metas = [device_metadata(HOSTNAME, [
+        ('DeploymentId', '1'),
+        ('NtpResources', '10.0.0.1;10.0.0.2'),
+        ('SyslogResources', '10.0.0.3;10.0.0.4'),
+        ('TacacsServer', '10.0.0.5'),
+        ('ErspanDestinationIpv4', '10.0.0.6')])]
+    for asic, name in enumerate(chassis.asics):
+        sub_role = 'FrontEnd' if asic < chassis.frontend_asics else 'BackEnd'
+        metas.append(device_metadata(name, [('SubRole', sub_role)]))
+    for i in range(devices):
+        metas.append(device_metadata('Server-%05d' % i, [('DeploymentId', '1')]))
+    return '''  <MetadataDeclaration>
+    <Devices %s>
+%s    </Devices>
+    <Properties %s/>
+  </MetadataDeclaration>
+''' % (NS_A, ''.join(metas), NS_A)
+
+
+def link_metadata(chassis, devices):
+    keys = []
+    for (neighbor, asic, ports, _) in chassis.neighbors():
+        for i, port in enumerate(ports):
+            keys.append('%s:Ethernet%d;%s:%s' % (neighbor, i + 1, HOSTNAME, chassis.front_port(asic, port)[1]))
+    keys += ['%s:eth0;%s:%s' % server_link for server_link in server_links(chassis, devices)]
+    return '''  <LinkMetadataDeclaration>
+    <Link %s>
+%s    </Link>
+  </LinkMetadataDeclaration>
+''' % (NS_A, ''.join('''      <a:LinkMetadata>
+        <a:Name i:nil="true"/>
+        <a:Properties>
+          <a:DeviceProperty>
+            <a:Name>FECDisabled</a:Name>
+            <a:Reference i:nil="true"/>
+            <a:Value>True</a:Value>
+          </a:DeviceProperty>
+        </a:Properties>
+        <a:Key>%s</a:Key>
+      </a:LinkMetadata>
+''' % key for key in keys))
+
+
+def port_config(chassis, asic=None):
+    """ :return: the port config of an asic, of all the asics if asic is None """
+    lines = ['# name lanes alias index asic_port_name role']
+    for port_asic in (range(len(chassis.asics)) if asic is None else [asic]):
+        if port_asic < chassis.frontend_asics:
+            for port in range(chassis.ports):
+                (name, alias, asic_port) = chassis.front_port(port_asic, port)
+                index = port_asic * chassis.ports + port
+                lanes = ','.join(str(index * 4 + lane) for lane in range(4))
+                lines.append('%s %s %s %d %s Ext' % (name, lanes, alias, index, asic_port))
+            internal_ports = 2 * chassis.backend_asics
+        else:
+            internal_ports = 2 * chassis.frontend_asics
+        for port in range(internal_ports):
+            (name, asic_port) = chassis.internal_port(port_asic, port)
+            index = port_asic * 1000 + port
+            lanes = ','.join(str(100000 + index * 4 + lane) for lane in range(4))
+            lines.append('%s %s %s %d %s Int' % (name, lanes, name, index, asic_port))
+    return '\n'.join(lines) + '\n'
+
+
+def generate(directory, frontend_asics=6, backend_asics=4, ports=36, devices=0):
+    """
+    Write minigraph.xml, port_config.ini (front panel ports of the host) and
+    port_config-<asic>.ini in the directory
+
+    :return: the minigraph file name, the host port config and the list of the asic port configs
+    """
+    chassis = Chassis(frontend_asics, backend_asics, ports)
+    minigraph = os.path.join(directory, 'minigraph.xml')
+    with open(minigraph, 'w') as f:
+        f.write('<DeviceMiniGraph xmlns="Microsoft.Search.Autopilot.Evolution" xmlns:i="http://www.w3.org/2001/XMLSchema-instance">\n')
+        f.write(cpg(chassis))
+        f.write(dpg(chassis))
+        f.write(png(chassis, devices))
+        f.write(device_infos(chassis))
+        f.write(metadata(chassis, devices))
+        f.write(link_metadata(chassis, devices))
+        f.write('  <Hostname>%s</Hostname>\n  <HwSku>%s</HwSku>\n</DeviceMiniGraph>\n' % (HOSTNAME, HWSKU))
+
+    host_port_config = os.path.join(directory, 'port_config.ini')
+    with open(host_port_config, 'w') as f:
+        f.write(port_config(chassis))
+    asic_port_configs = []
+    for asic in range(len(chassis.asics)):
+        asic_port_configs.append(os.path.join(directory, 'port_config-%d.ini' % asic))
+        with open(asic_port_configs[-1], 'w') as f:
+            f.write(port_config(chassis, asic))
+    return minigraph, host_port_config, asic_port_configs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic multi-asic chassis line card minigraph")
+    parser.add_argument("-f", "--frontend-asics", type=int, default=6)
+    parser.add_argument("-b", "--backend-asics", type=int, default=4)
+    parser.add_argument("-p", "--ports", help="front panel ports per frontend asic", type=int, default=36)
+    parser.add_argument("-d", "--devices", help="number of extra server devices", type=int, default=0)
+    parser.add_argument("directory")
+    args = parser.parse_args()
+    if args.frontend_asics + args.backend_asics > 10:
+        # asic names are matched by substring in the port names, 'asic1' would match 'Eth0-ASIC10'
+        parser.error("at most 10 asics are supported")
+    minigraph, _, _ = generate(args.directory, args.frontend_asics, args.backend_asics, args.ports, args.devices)
+    print(minigraph)
+
+
+if __name__ == "__main__":
+    main()
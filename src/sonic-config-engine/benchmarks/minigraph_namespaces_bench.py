@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""minigraph_namespaces_bench.py
+
+Compare generating the config of every namespace of a multi-asic line card
+with one sonic-cfggen run per namespace, as 'config load_minigraph' does, and
+with a single 'sonic-cfggen --all-namespaces' run.
+
+The synthetic minigraph comes from minigraph_gen.py. The minigraph snapshots
+are removed before every run, so both sides parse the xml.
+
+Usage:
+    minigraph_namespaces_bench.py [-f FRONTEND_ASICS] [-b BACKEND_ASICS] [-i ITERATIONS]
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.realpath(__file__))
+ENGINE_DIR = os.path.join(BENCH_DIR, '..')
+
+import minigraph_gen
+
+
+def remove_snapshots():
+    shutil.rmtree(os.path.join(os.environ['SONIC_CFGGEN_CACHE_DIR'], 'minigraph'), ignore_errors=True)
+
+
+def run(cfggen, argv):
+    env = dict(os.environ)
+    env['SONIC_CFGGEN_SOCKET'] = ''
+    return subprocess.check_output(cfggen + argv, env=env)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sonic-cfggen per namespace runs against --all-namespaces")
+    parser.add_argument("-f", "--frontend-asics", type=int, default=6)
+    parser.add_argument("-b", "--backend-asics", type=int, default=4)
+    parser.add_argument("--ports", help="front panel ports per frontend asic", type=int, default=64)
+    parser.add_argument("-d", "--devices", help="number of extra devices", type=int, default=2000)
+    parser.add_argument("-i", "--iterations", type=int, default=3)
+    parser.add_argument("-c", "--cfggen", help="sonic-cfggen script", default=os.path.join(ENGINE_DIR, 'sonic-cfggen'))
+    args = parser.parse_args()
+
+    cfggen = [sys.executable, args.cfggen]
+    work_dir = tempfile.mkdtemp()
+    # Snapshots of the minigraph under test only
+    os.environ['SONIC_CFGGEN_CACHE_DIR'] = os.path.join(work_dir, 'cache')
+    try:
+        minigraph, host_port_config, asic_port_configs = minigraph_gen.generate(
+            work_dir, args.frontend_asics, args.backend_asics, args.ports, args.devices)
+
+        separate = []
+        single = []
+        for _ in range(args.iterations):
+            remove_snapshots()
+            start = time.time()
+            outputs = {'': json.loads(run(cfggen, ['-m', minigraph, '-p', host_port_config, '--print-data']))}
+            for asic, port_config in enumerate(asic_port_configs):
+                namespace = 'asic%d' % asic
+                outputs[namespace] = json.loads(run(cfggen, ['-m', minigraph, '-n', namespace, '-p', port_config, '--print-data']))
+            separate.append(time.time() - start)
+
+            remove_snapshots()
+            start = time.time()
+            all_outputs = json.loads(run(cfggen, ['-m', minigraph, '-p', host_port_config, '--all-namespaces', '--print-data',
+                                                  '--asic-port-config', os.path.join(work_dir, 'port_config-{}.ini')]))
+            single.append(time.time() - start)
+
+        if all_outputs != outputs:
+            print("WARNING: --all-namespaces output differs from the per namespace runs", file=sys.stderr)
+
+        print("namespaces:                 %d" % len(outputs))
+        print("one run per namespace:      %.3f s" % min(separate))
+        print("single --all-namespaces:    %.3f s" % min(single))
+        print("speedup:                    %.1fx" % (min(separate) / min(single)))
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
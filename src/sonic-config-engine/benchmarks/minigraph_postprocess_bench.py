@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""minigraph_postprocess_bench.py
+
+Measure the parse_xml() work done on an already read minigraph: walking the
+CpgDec, DpgDec, PngDec and metadata sections and building the config DB tables
+out of them, for the host and for every asic.
+
+The xml is read once, and no snapshot is involved, so the figures are those of
+the minigraph parsing functions alone. Without -m a synthetic T2 chassis line
+card minigraph with 10k extra devices is generated, see minigraph_gen.py.
+
+Usage:
+    minigraph_postprocess_bench.py [-m MINIGRAPH [-P HOST_PORT_CONFIG] -p PORT_CONFIG_PATTERN -n NUM_ASICS] [-d DEVICES] [-i ITERATIONS]
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from lxml import etree as ET
+
+BENCH_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+import minigraph
+import minigraph_gen
+
+
+def parse_root(root, filename, port_config, asic):
+    minigraph.port_alias_map.clear()
+    minigraph.port_alias_asic_map.clear()
+    start = time.time()
+    minigraph._parse_xml_root(root, filename, None, port_config, asic, None)
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the minigraph parsing functions on an already read minigraph")
+    parser.add_argument("-m", "--minigraph", help="minigraph file, generated if not given")
+    parser.add_argument("-P", "--host-port-config", help="port config of the host, the host is skipped if not given")
+    parser.add_argument("-p", "--port-config", help="port config of the asics, with '{}' replaced by the asic number")
+    parser.add_argument("-n", "--num-asics", type=int, default=0)
+    parser.add_argument("-d", "--devices", help="number of extra devices", type=int, default=10000)
+    parser.add_argument("-i", "--iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        if args.minigraph:
+            filename = args.minigraph
+            host_port_config = args.host_port_config
+            asic_port_configs = [args.port_config.format(i) for i in range(args.num_asics)]
+        else:
+            filename, host_port_config, asic_port_configs = minigraph_gen.generate(work_dir, devices=args.devices)
+        root = ET.parse(filename).getroot()
+
+        namespaces = [('asic%d' % i, port_config) for i, port_config in enumerate(asic_port_configs)]
+        if host_port_config is not None:
+            namespaces.insert(0, (None, host_port_config))
+
+        # Warnings about the minigraph are printed at every iteration
+        stderr = sys.stderr
+        sys.stderr = open(os.devnull, 'w')
+        try:
+            times = {}
+            for _ in range(args.iterations):
+                for asic, port_config in namespaces:
+                    elapsed = parse_root(root, filename, port_config, asic)
+                    times[asic] = min(times.get(asic, elapsed), elapsed)
+        finally:
+            sys.stderr.close()
+            sys.stderr = stderr
+
+        print("minigraph:    %s (%.1f MB)" % (args.minigraph or 'generated', os.path.getsize(filename) / 1e6))
+        for asic, _ in namespaces:
+            print("%-12s  %.3f s" % (asic or 'host', times[asic]))
+        print("total:        %.3f s" % sum(times.values()))
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
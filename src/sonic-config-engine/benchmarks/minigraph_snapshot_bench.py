@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""minigraph_snapshot_bench.py
+
+Measure what the minigraph snapshots (see minigraph.MinigraphSnapshot) save on
+the parse_xml() calls of a multi-asic boot: one for the host and one per asic,
+plus the sub role lookups.
+
+Without -m a synthetic T2 chassis line card minigraph is generated, see
+minigraph_gen.py.
+
+Usage:
+    minigraph_snapshot_bench.py [-m MINIGRAPH [-P HOST_PORT_CONFIG] -p PORT_CONFIG_PATTERN -n NUM_ASICS] [-i ITERATIONS]
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+import minigraph
+import minigraph_gen
+
+
+def remove_snapshots():
+    shutil.rmtree(os.path.join(os.environ['SONIC_CFGGEN_CACHE_DIR'], 'minigraph'), ignore_errors=True)
+
+
+def parse_all(filename, host_port_config, asic_port_configs):
+    """ Parse the minigraph for every namespace, as separate sonic-cfggen runs would """
+    namespaces = [('asic%d' % i, port_config) for i, port_config in enumerate(asic_port_configs)]
+    if host_port_config is not None:
+        namespaces.insert(0, (None, host_port_config))
+    start = time.time()
+    for asic, port_config in namespaces:
+        minigraph.port_alias_map.clear()
+        minigraph.port_alias_asic_map.clear()
+        if asic is not None:
+            minigraph.parse_asic_sub_role(filename, asic)
+        minigraph.parse_xml(filename, port_config_file=port_config, asic_name=asic)
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark minigraph parsing with and without snapshots")
+    parser.add_argument("-m", "--minigraph", help="minigraph file, generated if not given")
+    parser.add_argument("-P", "--host-port-config", help="port config of the host, the host is skipped if not given")
+    parser.add_argument("-p", "--port-config", help="port config of the asics, with '{}' replaced by the asic number")
+    parser.add_argument("-n", "--num-asics", type=int, default=0)
+    parser.add_argument("-f", "--frontend-asics", type=int, default=6)
+    parser.add_argument("-b", "--backend-asics", type=int, default=4)
+    parser.add_argument("--ports", help="front panel ports per frontend asic", type=int, default=64)
+    parser.add_argument("-d", "--devices", help="number of extra devices", type=int, default=2000)
+    parser.add_argument("-i", "--iterations", type=int, default=3)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    # Snapshots of the minigraph under test only
+    os.environ['SONIC_CFGGEN_CACHE_DIR'] = os.path.join(work_dir, 'cache')
+    try:
+        if args.minigraph:
+            filename = os.path.join(work_dir, os.path.basename(args.minigraph))
+            shutil.copy(args.minigraph, filename)
+            host_port_config = args.host_port_config
+            asic_port_configs = [args.port_config.format(i) for i in range(args.num_asics)]
+        else:
+            filename, host_port_config, asic_port_configs = minigraph_gen.generate(
+                work_dir, args.frontend_asics, args.backend_asics, args.ports, args.devices)
+
+        cold = []
+        warm = []
+        for _ in range(args.iterations):
+            remove_snapshots()
+            cold.append(parse_all(filename, host_port_config, asic_port_configs))
+            warm.append(parse_all(filename, host_port_config, asic_port_configs))
+
+        print("minigraph:               %s (%.1f MB)" % (args.minigraph or 'generated', os.path.getsize(filename) / 1e6))
+        print("namespaces:              %d" % (len(asic_port_configs) + (host_port_config is not None)))
+        print("parse without snapshot:  %.3f s" % min(cold))
+        print("parse with snapshot:     %.3f s" % min(warm))
+        print("speedup:                 %.1fx" % (min(cold) / min(warm)))
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
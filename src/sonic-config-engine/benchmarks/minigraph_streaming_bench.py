@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""minigraph_streaming_bench.py
+
+Compare the time and the peak memory of parse_xml() reading the whole minigraph
+with ElementTree.fromstring() and reading it with iterparse_minigraph(), which
+drops the links and metadata of the other devices as they are read.
+
+Every parse runs in a new process, without snapshot, so that its maximum
+resident set size is its own. Without -m a synthetic T2 chassis line card
+minigraph with many extra devices is generated, see minigraph_gen.py.
+
+Usage:
+    minigraph_streaming_bench.py [-m MINIGRAPH -p PORT_CONFIG] [-n NAMESPACE] [-d DEVICES] [-i ITERATIONS]
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+import minigraph_gen
+
+
+def remove_snapshots():
+    shutil.rmtree(os.path.join(os.environ['SONIC_CFGGEN_CACHE_DIR'], 'minigraph'), ignore_errors=True)
+
+
+def child(args):
+    """ Parse the minigraph once and print the parse time and the peak memory of the process, in json """
+    import minigraph
+    start = time.time()
+    minigraph.parse_xml(args.minigraph, port_config_file=args.port_config, asic_name=args.namespace, streaming=args.streaming)
+    elapsed = time.time() - start
+    # kB on linux
+    print(json.dumps({'time': elapsed, 'maxrss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+
+
+def run_child(filename, port_config, namespace, streaming):
+    remove_snapshots()
+    argv = [sys.executable, os.path.realpath(__file__), '--child', '-m', filename, '-p', port_config]
+    if namespace:
+        argv += ['-n', namespace]
+    if streaming:
+        argv.append('--streaming')
+    return json.loads(subprocess.check_output(argv).decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parse_xml() with and without iterparse_minigraph()")
+    parser.add_argument("-m", "--minigraph", help="minigraph file, generated if not given")
+    parser.add_argument("-p", "--port-config", help="port config file, required with -m")
+    parser.add_argument("-n", "--namespace", help="asic name, the host if not given")
+    parser.add_argument("-d", "--devices", help="number of extra devices", type=int, default=50000)
+    parser.add_argument("-i", "--iterations", type=int, default=3)
+    parser.add_argument("--child", help=argparse.SUPPRESS, action='store_true')
+    parser.add_argument("--streaming", help=argparse.SUPPRESS, action='store_true')
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+    if args.minigraph and not args.port_config:
+        parser.error("-p is required with -m")
+
+    work_dir = tempfile.mkdtemp()
+    # Snapshots of the minigraph under test only
+    os.environ['SONIC_CFGGEN_CACHE_DIR'] = os.path.join(work_dir, 'cache')
+    try:
+        if args.minigraph:
+            filename = os.path.join(work_dir, os.path.basename(args.minigraph))
+            shutil.copy(args.minigraph, filename)
+            port_config = args.port_config
+        else:
+            filename, port_config, asic_port_configs = minigraph_gen.generate(work_dir, devices=args.devices)
+            if args.namespace:
+                port_config = asic_port_configs[int(args.namespace[len('asic'):])]
+
+        results = {}
+        for streaming in (False, True):
+            runs = [run_child(filename, port_config, args.namespace, streaming) for _ in range(args.iterations)]
+            results[streaming] = (min(run['time'] for run in runs), max(run['maxrss'] for run in runs))
+
+        print("minigraph:          %s (%.1f MB)" % (args.minigraph or 'generated', os.path.getsize(filename) / 1e6))
+        print("namespace:          %s" % (args.namespace or 'host'))
+        print("fromstring:         %.3f s, %.1f MB peak" % (results[False][0], results[False][1] / 1024.0))
+        print("iterparse:          %.3f s, %.1f MB peak" % (results[True][0], results[True][1] / 1024.0))
+        print("speedup:            %.1fx" % (results[False][0] / results[True][0]))
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""cfggen_cache.py
+
+On-disk caches used by sonic-cfggen. They live in a directory on the local file
+system, so unlike the redis backed caches they are usable before the database
+container is up and survive its restarts.
+
+The cache directory is given by the SONIC_CFGGEN_CACHE_DIR environment variable
+(default DEFAULT_CACHE_DIR). Each cache uses its own sub directory.
+"""
+
+import json
+import os
+import stat
+import tempfile
+
+DEFAULT_CACHE_DIR = '/var/cache/sonic-cfggen'
+CACHE_DIR_ENV = 'SONIC_CFGGEN_CACHE_DIR'
+
+
+def get_cache_dir():
+    return os.environ.get(CACHE_DIR_ENV, DEFAULT_CACHE_DIR)
+
+
+def _atomic_write(directory, path, content):
+    """ Write the file through a temporary file renamed over it, so readers never see a partial file """
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.rename(tmp_path, path)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _is_trusted(st):
+    """ Whether the file of the stat result is owned by the current user and not writable by others """
+    return st.st_uid == os.geteuid() and not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+class DiskCache(object):
+    """
+    Key/value store keeping one file per key in a directory. When the files take more
+    than max_size bytes, the least recently used ones are removed. Reads refresh the file
+    mtime, which is what the eviction goes by.
+
+    Errors accessing the directory are never fatal: the cache then behaves as if empty.
+    The cached values may be loaded as code, so the directory is only used, and the files
+    are only read, when they are owned by the current user and writable by nobody else.
+    """
+
+    SUFFIX = '.cache'
+    STATS_FILE = 'stats.json'
+
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+        self.stats = {}
+        try:
+            os.makedirs(directory)
+        except OSError:
+            # Already there, or not writable which disables the cache
+            pass
+        try:
+            st = os.stat(directory)
+        except OSError:
+            st = None
+        self.enabled = (st is not None and stat.S_ISDIR(st.st_mode) and _is_trusted(st) and
+                        os.access(directory, os.W_OK))
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def count(self, name, value=1):
+        """ Increase a counter, saved in the cache directory by flush_stats() """
+        self.stats[name] = self.stats.get(name, 0) + value
+
+    def get(self, key):
+        """ :return: the value stored for the key, None if there is none """
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                if not _is_trusted(os.fstat(f.fileno())):
+                    return None
+                value = f.read()
+            os.utime(path, None)
+        except (IOError, OSError):
+            return None
+        return value
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        try:
+            _atomic_write(self.directory, self._path(key), value)
+            self._evict()
+        except (IOError, OSError):
+            pass
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total_size -= size
+            self.count('evictions')
+
+    def read_stats(self):
+        """ :return: the counters saved in the cache directory, with the number and size of the entries """
+        stats = {}
+        try:
+            with open(os.path.join(self.directory, self.STATS_FILE)) as f:
+                stats = json.load(f)
+        except (IOError, OSError, ValueError):
+            pass
+        entries = 0
+        size = 0
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if not name.endswith(self.SUFFIX):
+                    continue
+                try:
+                    size += os.path.getsize(os.path.join(self.directory, name))
+                    entries += 1
+                except OSError:
+                    pass
+        stats['entries'] = entries
+        stats['size'] = size
+        return stats
+
+    def flush_stats(self):
+        """ Add the counters collected since the last flush to the ones saved in the cache directory """
+        if not self.enabled or not self.stats:
+            return
+        stats = self.read_stats()
+        del stats['entries']
+        del stats['size']
+        for name, value in self.stats.items():
+            stats[name] = stats.get(name, 0) + value
+        try:
+            _atomic_write(self.directory, os.path.join(self.directory, self.STATS_FILE), json.dumps(stats).encode('utf-8'))
+        except (IOError, OSError):
+            pass
+        self.stats = {}
+
+
+class RenderCache(DiskCache):
+    """
+    Rendered template output, addressed by a hash of the template sources and of the
+    data they consume, see sonic-cfggen _render_cache_key()
+    """
+
+    SUB_DIR = 'render'
+    MAX_SIZE = 32 * 1024 * 1024
+
+    def __init__(self, cache_dir=None):
+        super(RenderCache, self).__init__(os.path.join(cache_dir or get_cache_dir(), self.SUB_DIR), self.MAX_SIZE)
+
+    def get_output(self, key):
+        output = self.get(key)
+        if output is None:
+            self.count('misses')
+            return None
+        self.count('hits')
+        return output.decode('utf-8')
+
+    def put_output(self, key, output):
+        self.put(key, output.encode('utf-8'))
+
+
+class MinigraphCache(DiskCache):
+    """
+    Minigraph parse results, addressed by a hash of the minigraph path, see
+    minigraph.MinigraphSnapshot
+    """
+
+    SUB_DIR = 'minigraph'
+    MAX_SIZE = 64 * 1024 * 1024
+
+    def __init__(self, cache_dir=None):
+        super(MinigraphCache, self).__init__(os.path.join(cache_dir or get_cache_dir(), self.SUB_DIR), self.MAX_SIZE)
@@ -0,0 +1,215 @@
+"""cfggen_server.py
+
+Long-lived sonic-cfggen server and the thin client used to reach it.
+
+sonic-cfggen is invoked many times during boot from docker start scripts, and
+every invocation pays for the interpreter start-up and for importing jinja2,
+yaml, netaddr and natsort. When a server is listening on the unix socket, the
+sonic-cfggen script forwards its command line to it before doing any of those
+imports and prints the result, so a call costs a socket round-trip instead.
+
+The server runs the regular sonic-cfggen main() for every request, with the
+working directory and the environment of the client, one request at a time.
+Jinja2 environments and parsed input files are kept warm between requests.
+
+Start the server with:
+    sonic-cfggen --server [SOCKET] [--server-idle-timeout SECONDS]
+Clients use the socket given by the SONIC_CFGGEN_SOCKET environment variable
+(default DEFAULT_SOCKET_PATH). Set it to an empty string to disable forwarding.
+"""
+
+from __future__ import print_function
+
+import json
+import os
+import select
+import signal
+import socket
+import sys
+import tempfile
+import traceback
+
+DEFAULT_SOCKET_PATH = '/var/run/sonic-cfggen.sock'
+SOCKET_PATH_ENV = 'SONIC_CFGGEN_SOCKET'
+
+CONNECT_TIMEOUT = 1.0
+# A request not answered in this time fails, so a hung server can't stall the clients forever.
+# The server runs one request at a time, so the time includes waiting for the requests queued before
+REQUEST_TIMEOUT = 300.0
+RECV_BUFFER_SIZE = 65536
+
+
+def get_socket_path():
+    """ Socket the client should talk to, None if forwarding is disabled """
+    return os.environ.get(SOCKET_PATH_ENV, DEFAULT_SOCKET_PATH) or None
+
+
+def _recv_all(sock):
+    chunks = []
+    while True:
+        chunk = sock.recv(RECV_BUFFER_SIZE)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+
+def _write_text(stream, text):
+    if not text:
+        return
+    if sys.version_info < (3, 0):
+        text = text.encode('utf-8')
+    stream.write(text)
+    stream.flush()
+
+
+def forward_to_server(argv, socket_path=None, timeout=REQUEST_TIMEOUT):
+    """
+    Run a sonic-cfggen invocation on a running server
+    :param argv: command line arguments, without the program name
+    :param socket_path: server socket, defaults to get_socket_path()
+    :param timeout: seconds to wait for the response
+    :return: the exit code of the invocation, None when the request can't be sent to a server.
+    Once the request is sent, the server runs it even if the client stops waiting, so it is
+    never run locally then: a lost or late response is reported as a failure of the invocation
+    """
+    if socket_path is None:
+        socket_path = get_socket_path()
+    if not socket_path or not os.path.exists(socket_path):
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT)
+        sock.connect(socket_path)
+        sock.settimeout(timeout)
+        request = {
+            'argv': argv,
+            'cwd': os.getcwd(),
+            'env': dict(os.environ),
+        }
+        sock.sendall(json.dumps(request).encode('utf-8'))
+        sock.shutdown(socket.SHUT_WR)
+    except socket.error:
+        # The server is gone or doesn't accept requests, let the caller run the invocation locally
+        sock.close()
+        return None
+
+    try:
+        response = json.loads(_recv_all(sock).decode('utf-8'))
+    except (socket.error, ValueError) as e:
+        # The server died in the middle of the request or doesn't answer in time
+        _write_text(sys.stderr, u"sonic-cfggen: no response from the server on {}: {}\n".format(socket_path, e))
+        return 1
+    finally:
+        sock.close()
+
+    _write_text(sys.stdout, response.get('stdout'))
+    _write_text(sys.stderr, response.get('stderr'))
+    return response.get('rc', 1)
+
+
+class ServerExit(BaseException):
+    """ Raised by the signal handler to stop the server, also in the middle of a request """
+    pass
+
+
+def _raise_server_exit(signum, frame):
+    raise ServerExit()
+
+
+class CfgGenServer(object):
+    """ Serve sonic-cfggen invocations forwarded by forward_to_server() """
+
+    def __init__(self, socket_path, handler, idle_timeout=0):
+        """
+        :param socket_path: unix socket to listen on
+        :param handler: callable taking the argument list, i.e. sonic-cfggen main()
+        :param idle_timeout: exit after this many seconds without requests, 0 to run forever
+        """
+        self.socket_path = socket_path
+        self.handler = handler
+        self.idle_timeout = idle_timeout
+        self.requests = 0
+
+    def serve_forever(self):
+        signal.signal(signal.SIGTERM, _raise_server_exit)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.bind(self.socket_path)
+            # Requests run with the privileges of the server, only its owner may send them
+            os.chmod(self.socket_path, 0o600)
+            sock.listen(16)
+            while True:
+                timeout = self.idle_timeout if self.idle_timeout > 0 else None
+                readable, _, _ = select.select([sock], [], [], timeout)
+                if not readable:
+                    break
+                conn, _ = sock.accept()
+                try:
+                    self._serve_connection(conn)
+                finally:
+                    conn.close()
+        except ServerExit:
+            pass
+        finally:
+            sock.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def _serve_connection(self, conn):
+        try:
+            request = json.loads(_recv_all(conn).decode('utf-8'))
+        except (socket.error, ValueError):
+            return
+        response = self.run_request(request['argv'], request.get('cwd', '/'), request.get('env', {}))
+        try:
+            conn.sendall(json.dumps(response).encode('utf-8'))
+        except socket.error:
+            pass
+
+    def run_request(self, argv, cwd, env):
+        """
+        Run the handler as if it was invoked from a process with the given working directory
+        and environment, and collect what it printed
+        :return: dict with 'rc', 'stdout' and 'stderr'
+        """
+        self.requests += 1
+        saved_env = dict(os.environ)
+        saved_cwd = os.getcwd()
+        saved_stdout, saved_stderr = sys.stdout, sys.stderr
+        stdout = tempfile.TemporaryFile(mode='w+')
+        stderr = tempfile.TemporaryFile(mode='w+')
+        rc = 0
+        try:
+            os.environ.clear()
+            os.environ.update(env)
+            sys.stdout, sys.stderr = stdout, stderr
+            try:
+                os.chdir(cwd)
+                self.handler(argv)
+            except SystemExit as e:
+                if e.code is None:
+                    rc = 0
+                elif isinstance(e.code, int):
+                    rc = e.code
+                else:
+                    print(e.code, file=sys.stderr)
+                    rc = 1
+            except Exception:
+                traceback.print_exc()
+                rc = 1
+        finally:
+            sys.stdout, sys.stderr = saved_stdout, saved_stderr
+            os.chdir(saved_cwd)
+            os.environ.clear()
+            os.environ.update(saved_env)
+
+        response = {'rc': rc}
+        for name, stream in (('stdout', stdout), ('stderr', stderr)):
+            stream.seek(0)
+            response[name] = stream.read()
+            stream.close()
+        return response
@@ -0,0 +1,116 @@
+"""config_diff.py
+
+Incremental CONFIG_DB writes for 'sonic-cfggen --write-to-db --diff'.
+
+ConfigDBPipeConnector.mod_config() writes every field of every entry it is
+given, even when CONFIG_DB already holds the same values, and each write
+wakes up all the subscribers of the table. get_config_diff() reads the
+current content of the tables being written and keeps only the commands
+that change something; apply_config_diff() pipelines them.
+
+The end state is the same as with mod_config(): fields are merged into the
+existing entries, a None entry deletes the entry and a None table deletes
+the whole table.
+"""
+
+HSET = 'HSET'
+DEL = 'DEL'
+
+
+def _to_str(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def get_raw_tables(configdb, tables):
+    """
+    Read the given CONFIG_DB tables with two pipelined round trips, without
+    converting the keys and the fields.
+
+    :return: dict of table name to dict of serialized key to raw fields
+    """
+    client = configdb.get_redis_client(configdb.db_name)
+    pipe = client.pipeline()
+    for table in tables:
+        pipe.keys(table + configdb.TABLE_NAME_SEPARATOR + '*')
+    keys = [_to_str(key) for table_keys in pipe.execute() for key in table_keys]
+    for key in keys:
+        pipe.hgetall(key)
+    records = pipe.execute()
+
+    data = dict((table, {}) for table in tables)
+    for key, record in zip(keys, records):
+        (table, row) = key.split(configdb.TABLE_NAME_SEPARATOR, 1)
+        data.setdefault(table, {})[row] = dict((_to_str(k), _to_str(v)) for k, v in record.items())
+    return data
+
+
+def get_config_diff(configdb, data, current=None):
+    """
+    Compute the commands turning the CONFIG_DB content into what mod_config(data) would leave.
+
+    :param data: config DB data, as passed to mod_config()
+    :param current: raw content of the tables of data, read with get_raw_tables() if not given
+    :return: (list of (HSET, redis key, changed fields) and (DEL, redis key, None) commands,
+              dict of counters: 'added', 'modified' and 'deleted' entries, 'fields' set
+              and 'unchanged' entries)
+    """
+    tables = [table.upper() for table in data]
+    if current is None:
+        current = get_raw_tables(configdb, tables)
+    separator = configdb.TABLE_NAME_SEPARATOR
+    commands = []
+    counters = {'added': 0, 'modified': 0, 'deleted': 0, 'fields': 0, 'unchanged': 0}
+
+    for table_name, entries in data.items():
+        table = table_name.upper()
+        db_entries = current.get(table, {})
+        if entries is None:
+            for row in sorted(db_entries):
+                commands.append((DEL, table + separator + row, None))
+                counters['deleted'] += 1
+            continue
+        for key, entry in entries.items():
+            row = configdb.serialize_key(key)
+            db_entry = db_entries.get(row)
+            if entry is None:
+                if db_entry is not None:
+                    commands.append((DEL, table + separator + row, None))
+                    counters['deleted'] += 1
+                continue
+            raw = configdb.typed_to_raw(entry)
+            if db_entry is None:
+                changed = raw
+                counters['added'] += 1
+            else:
+                changed = dict((field, value) for field, value in raw.items() if db_entry.get(field) != value)
+                counters['modified' if changed else 'unchanged'] += 1
+            if changed:
+                commands.append((HSET, table + separator + row, changed))
+                counters['fields'] += len(changed)
+    return commands, counters
+
+
+def apply_config_diff(configdb, commands):
+    """ Run the get_config_diff() commands in a single pipeline """
+    if not commands:
+        return
+    client = configdb.get_redis_client(configdb.db_name)
+    pipe = client.pipeline()
+    for (command, key, fields) in commands:
+        if command == HSET:
+            pipe.hmset(key, fields)
+        else:
+            pipe.delete(key)
+    pipe.execute()
+
+
+def format_config_diff(commands, counters):
+    """ :return: the lines describing the commands and their summary, as printed by --dry-run """
+    lines = []
+    for (command, key, fields) in commands:
+        if command == HSET:
+            lines.append('%s %s %s' % (command, key, ' '.join('%s=%s' % (field, fields[field]) for field in sorted(fields))))
+        else:
+            lines.append('%s %s' % (command, key))
+    lines.append('%(added)d added, %(modified)d modified (%(fields)d fields set), %(deleted)d deleted, %(unchanged)d unchanged' % counters)
+    return lines
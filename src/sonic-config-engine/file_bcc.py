@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+
+import jinja2
+
+from cfggen_cache import DiskCache, get_cache_dir
+
+class FileBytecodeCache(jinja2.BytecodeCache):
+    """
+    A bytecode cache for jinja2 template that stores bytecode in files, see cfggen_cache.DiskCache.
+    Unlike RedisBytecodeCache it works before the database is up. Every container has its
+    own cache directory, a directory shared with another container or with the host would let
+    one of them inject code into the others.
+
+    Every entry records how long the template took to compile, so that hits add up the
+    compile time they saved in the 'compile_time_saved' counter.
+    """
+
+    SUB_DIR = 'bytecode'
+    MAX_SIZE = 16 * 1024 * 1024
+
+    def __init__(self, cache_dir=None):
+        self._cache = DiskCache(os.path.join(cache_dir or get_cache_dir(), self.SUB_DIR), self.MAX_SIZE)
+        self._compile_start = {}
+
+    @property
+    def enabled(self):
+        return self._cache.enabled
+
+    def _key(self, bucket):
+        # sonic-cfggen runs with both python 2 and 3
+        return '%s-py%d%d' % (bucket.key, sys.version_info[0], sys.version_info[1])
+
+    def load_bytecode(self, bucket):
+        start = time.time()
+        content = self._cache.get(self._key(bucket))
+        if content is not None:
+            header, _, code = content.partition(b'\n')
+            bucket.bytecode_from_string(code)
+            try:
+                compile_time = float(header)
+            except ValueError:
+                bucket.reset()
+            else:
+                if bucket.code is not None:
+                    self._cache.count('hits')
+                    self._cache.count('compile_time_saved', compile_time - (time.time() - start))
+                    return
+        self._cache.count('misses')
+        self._compile_start[bucket.key] = time.time()
+
+    def dump_bytecode(self, bucket):
+        start = self._compile_start.pop(bucket.key, None)
+        compile_time = time.time() - start if start is not None else 0.0
+        header = ('%.6f\n' % compile_time).encode('ascii')
+        self._cache.put(self._key(bucket), header + bucket.bytecode_to_string())
+
+    def read_stats(self):
+        return self._cache.read_stats()
+
+    def flush_stats(self):
+        self._cache.flush_stats()
@@ -1,6 +1,7 @@
 from __future__ import print_function
 
 import calendar
+import hashlib
 import math
 import os
 import sys
@@ -14,8 +15,9 @@ from collections import defaultdict
 from lxml import etree as ET
 from lxml.etree import QName
 
+from cfggen_cache import MinigraphCache
 from portconfig import get_port_config
-from sonic_py_common.multi_asic import get_asic_id_from_name
+from sonic_py_common.multi_asic import get_asic_id_from_name, ASIC_NAME_PREFIX, DEFAULT_NAMESPACE
 from sonic_py_common.interface import backplane_prefix
 
 """minigraph.py
@@ -321,7 +323,7 @@ def parse_dpg(dpg, hname):
         pc_intfs = []
         pcs = {}
         pc_members = {}
-        intfs_inpc = [] # List to hold all the LAG member interfaces 
+        intfs_inpc = set() # Set to hold all the LAG member interfaces
         for pcintf in pcintfs.findall(str(QName(ns, "PortChannel"))):
             pcintfname = pcintf.find(str(QName(ns, "Name"))).text
             pcintfmbr = pcintf.find(str(QName(ns, "AttachTo"))).text
@@ -329,7 +331,7 @@ def parse_dpg(dpg, hname):
             pc_intfs.append(pcintfname)
             for i, member in enumerate(pcmbr_list):
                 pcmbr_list[i] = port_alias_map.get(member, member)
-                intfs_inpc.append(pcmbr_list[i])
+                intfs_inpc.add(pcmbr_list[i])
                 pc_members[(pcintfname, pcmbr_list[i])] = {'NULL': 'NULL'}
             if pcintf.find(str(QName(ns, "Fallback"))) != None:
                 pcs[pcintfname] = {'members': pcmbr_list, 'fallback': pcintf.find(str(QName(ns, "Fallback"))).text, 'min_links': str(int(math.ceil(len() * 0.75)))}
@@ -415,11 +417,13 @@ def parse_dpg(dpg, hname):
                     # ports. Non-active ports will be removed from this list
                     # later after the rest of the minigraph has been parsed.
                     acl_intfs = pc_intfs[:]
+                    acl_intfs_set = set(acl_intfs)
                     for panel_port in port_alias_map.values():
                         # because of port_alias_asic_map we can have duplicate in port_alias_map
                         # so check if already present do not add
-                        if panel_port not in intfs_inpc and panel_port not in acl_intfs:
+                        if panel_port not in intfs_inpc and panel_port not in acl_intfs_set:
                             acl_intfs.append(panel_port)
+                            acl_intfs_set.add(panel_port)
                     break
             if acl_intfs:
                 acls[aclname] = {'policy_desc': aclname,
@@ -505,6 +509,10 @@ def parse_cpg(cpg, hname):
                         'nhopself': nhopself
                     }
         elif child.tag == str(QName(ns, "Routers")):
+            # Sessions of every neighbor, instead of scanning all of them per router
+            sessions_by_router = {}
+            for bgp_session in bgp_sessions.values():
+                sessions_by_router.setdefault(bgp_session['name'].lower(), []).append(bgp_session)
             for router in child.findall(str(QName(ns1, "BGPRouterDeclaration"))):
                 asn = router.find(str(QName(ns1, "ASN"))).text
                 hostname = router.find(str(QName(ns1, "Hostname"))).text
@@ -526,10 +534,8 @@ def parse_cpg(cpg, hname):
                             if bgpPeer.find(str(QName(ns1, "PeerAsn"))) is not None:
                                 bgp_peers_with_range[name]['peer_asn'] = bgpPeer.find(str(QName(ns1, "PeerAsn"))).text
                 else:
-                    for peer in bgp_sessions:
-                        bgp_session = bgp_sessions[peer]
-                        if hostname.lower() == bgp_session['name'].lower():
-                            bgp_session['asn'] = asn
+                    for bgp_session in sessions_by_router.get(hostname.lower(), []):
+                        bgp_session['asn'] = asn
 
     bgp_monitors = { key: bgp_sessions[key] for key in bgp_sessions if 'asn' in bgp_sessions[key] and bgp_sessions[key]['name'] == 'BGPMonitor' }
     bgp_sessions = { key: bgp_sessions[key] for key in bgp_sessions if 'asn' in bgp_sessions[key] and int(bgp_sessions[key]['asn']) != 0 }
@@ -624,6 +630,20 @@ def parse_asic_meta(meta, hname):
                     sub_role = value
     return sub_role
 
+def parse_asic_sub_roles(meta):
+    """ Same as parse_asic_meta() for all the devices at once, keyed by lowercase device name """
+    sub_roles = {}
+    device_metas = meta.find(str(QName(ns, "Devices")))
+    for device in device_metas.findall(str(QName(ns1, "DeviceMetadata"))):
+        hname = device.find(str(QName(ns1, "Name"))).text.lower()
+        properties = device.find(str(QName(ns1, "Properties")))
+        for device_property in properties.findall(str(QName(ns1, "DeviceProperty"))):
+            name = device_property.find(str(QName(ns1, "Name"))).text
+            value = device_property.find(str(QName(ns1, "Value"))).text
+            if name == "SubRole":
+                sub_roles[hname] = value
+    return sub_roles
+
 def parse_deviceinfo(meta, hwsku):
     port_speeds = {}
     port_descriptions = {}
@@ -684,6 +704,11 @@ def parse_spine_chassis_fe(results, vni, lo_intfs, phyport_intfs, pc_intfs, pc_m
             # Enslave the interface to a Vnet
             phyport_intfs[intf] = {'vnet_name': chassis_vnet}
            
+    # First member of every port channel
+    pc_first_members = {}
+    for (pc_name, pc_member) in pc_members:
+        pc_first_members.setdefault(pc_name, pc_member)
+
     # For each port channel IP interface
     for pc_intf in pc_intfs:
         # A port channel IP interface may have multiple entries. 
@@ -692,12 +717,8 @@ def parse_spine_chassis_fe(results, vni, lo_intfs, phyport_intfs, pc_intfs, pc_m
         if is_ip_prefix_in_key(pc_intf) == True:
             continue 
 
-        intf_name = None 
-        # Get a physical interface that belongs to this port channel         
-        for pc_member in pc_members:
-            if pc_member[0] == pc_intf:
-                intf_name = pc_member[1]
-                break
+        # Get a physical interface that belongs to this port channel
+        intf_name = pc_first_members.get(pc_intf)
 
         if intf_name == None:
             print('Warning: cannot find any interfaces that belong to %s' % (pc_intf), file=sys.stderr)
@@ -726,7 +747,7 @@ def filter_acl_table_bindings(acls, neighbors, port_channels, sub_role):
     if sub_role == BACKEND_ASIC_SUB_ROLE:
         return filter_acls
 
-    front_port_channel_intf = []
+    front_port_channel_intf = set()
    
     # Get the front panel port channel. It will use port_alias_asic_map
     # which will get populated from port_config.ini for Multi-NPU 
@@ -736,7 +757,7 @@ def filter_acl_table_bindings(acls, neighbors, port_channels, sub_role):
                                    and lag_member.startswith(backplane_prefix()) \
                                    for lag_member in port_channels[port_channel_intf]['members'])
         if not backend_port_channel:
-            front_port_channel_intf.append(port_channel_intf)
+            front_port_channel_intf.add(port_channel_intf)
 
     for acl_table, group_params in acls.items():
         group_type = group_params.get('type', None)
@@ -764,7 +785,7 @@ def filter_acl_table_bindings(acls, neighbors, port_channels, sub_role):
         # Filters out inactive front-panel ports from the binding list for mirror
         # ACL tables. We define an "active" port as one that is a member of a
         # front pannel port channel or one that is connected to a neighboring device via front panel port.
-        active_ports = [port for port in front_panel_ports if port in neighbors.keys() or port in front_port_channel_intf]
+        active_ports = [port for port in front_panel_ports if port in neighbors or port in front_port_channel_intf]
         
         if not active_ports:
             print('Warning: mirror table {} in ACL_TABLE does not have any ports bound to it'.format(acl_table), file=sys.stderr)
@@ -779,32 +800,469 @@ def enable_internal_bgp_session(bgp_sessions, filename, asic_name):
     So adding the admin-status 'up' configuration to bgp sessions
     BGP session between FrontEnd and BackEnd Asics are internal bgp sessions
     '''
-    local_sub_role = parse_asic_sub_role(filename, asic_name)
+    sub_roles = get_asic_sub_roles(filename)
+    local_sub_role = sub_roles.get(asic_name.lower())
 
     for peer_ip in bgp_sessions.keys():
         peer_name = bgp_sessions[peer_ip]['name']
-        peer_sub_role = parse_asic_sub_role(filename, peer_name)
+        peer_sub_role = sub_roles.get(peer_name.lower())
         if ((local_sub_role == FRONTEND_ASIC_SUB_ROLE and peer_sub_role == BACKEND_ASIC_SUB_ROLE) or
             (local_sub_role == BACKEND_ASIC_SUB_ROLE and peer_sub_role == FRONTEND_ASIC_SUB_ROLE)):
             bgp_sessions[peer_ip].update({'admin_status': 'up'})
 
+###############################################################################
+#
+# Streaming minigraph parsing
+#
+###############################################################################
+
+def _is_local_link(link, names):
+    """ :return: False if the link is an interface link between two devices not in names """
+    if link.attrib.get(str(QName(ns3, "type")), "DeviceInterfaceLink") != "DeviceInterfaceLink":
+        return True
+    link_type = link.find(str(QName(ns, "ElementType")))
+    if link_type is None or link_type.text not in ("DeviceInterfaceLink", "UnderlayInterfaceLink"):
+        return True
+    for tag in ("StartDevice", "EndDevice"):
+        device = link.find(str(QName(ns, tag)))
+        if device is None or device.text is None or device.text.lower() in names:
+            return True
+    return False
+
+def _is_local_device_metadata(device, names):
+    """ :return: False if the metadata is of a device not in names, and has no SubRole (see get_asic_sub_roles()) """
+    name = device.find(str(QName(ns1, "Name")))
+    if name is None or name.text is None or name.text.lower() in names:
+        return True
+    properties = device.find(str(QName(ns1, "Properties")))
+    if properties is None:
+        return False
+    for device_property in properties.findall(str(QName(ns1, "DeviceProperty"))):
+        if device_property.findtext(str(QName(ns1, "Name"))) == "SubRole":
+            return True
+    return False
+
+def _is_local_link_metadata(linkmeta, names):
+    """ :return: False if none of the link endpoints is a device in names, see parse_linkmeta() """
+    key = linkmeta.findtext(str(QName(ns1, "Key")))
+    if key is None:
+        return True
+    for endpoint in key.split(';'):
+        t = endpoint.split(':')
+        if len(t) == 2 and t[0].lower() in names:
+            return True
+    return False
+
+def iterparse_minigraph(source):
+    """ Parse the minigraph with iterparse, dropping the elements the parse_xml() functions would skip.
+
+    Minigraphs describing a large part of the network, as on spine routers, are mostly
+    made of the links and metadata of other devices. Those elements are removed as they
+    are read, so that they are never all in memory, and parse_png() and parse_meta() no
+    longer walk them.
+
+    The devices of the minigraph itself are the ones of the DpgDec, the host and its asics.
+    Nothing is dropped before the DpgDec is read.
+
+    Keyword arguments:
+    source -- minigraph file name or file object
+
+    Returns the root element and the set of the lowercase names of the devices whose
+    elements were kept, None if none were dropped.
+    """
+    names = None
+    link_qn = str(QName(ns, "DeviceLinkBase"))
+    device_metadata_qn = str(QName(ns1, "DeviceMetadata"))
+    linkmeta_qn = str(QName(ns1, "LinkMetadata"))
+    dpg_qn = str(QName(ns, "DpgDec"))
+    context = ET.iterparse(source, events=('end',), tag=[dpg_qn, link_qn, device_metadata_qn, linkmeta_qn])
+    for _, elem in context:
+        parent = elem.getparent()
+        if elem.tag == dpg_qn:
+            if parent.getparent() is None:
+                names = set()
+                for child in elem:
+                    hostname = child.findtext(str(QName(ns, "Hostname")))
+                    if hostname is not None:
+                        names.add(hostname.lower())
+            continue
+        if names is None:
+            continue
+        if elem.tag == link_qn:
+            local = _is_local_link(elem, names)
+        elif elem.tag == device_metadata_qn:
+            local = _is_local_device_metadata(elem, names)
+        else:
+            local = _is_local_link_metadata(elem, names)
+        if not local:
+            elem.clear()
+            parent.remove(elem)
+    return context.root, names
+
+def _iterparsed_for(root, names, asic_names):
+    """ :return: True if nothing needed by parse_xml() for the host and the asics was dropped by iterparse_minigraph() """
+    if names is None:
+        return True
+    hostname = root.findtext(str(QName(ns, "Hostname")))
+    return all(name is not None and name.lower() in names for name in [hostname] + list(asic_names))
+
+###############################################################################
+#
+# Minigraph snapshots
+#
+###############################################################################
+
+SNAPSHOT_VERSION = 2
+
+class MinigraphSnapshot(object):
+    """
+    Parse results of a minigraph file, saved as JSON in the minigraph cache (see
+    cfggen_cache.MinigraphCache) so that the many parse_xml() calls made at boot do not
+    parse the same xml again and again.
+
+    A snapshot is valid for the minigraph content and the parser code it was taken from:
+    the file mtime and size are checked first, and the content sha256 when they differ
+    (e.g. the file was copied over with the same content). The parser code is part of
+    the snapshot key, see _parser_digest(). Errors reading or writing the snapshot are
+    never fatal, the minigraph is then simply parsed.
+    """
+
+    def __init__(self, filename, name):
+        self.filename = filename
+        self.cache = MinigraphCache()
+        key = json.dumps([os.path.realpath(filename), name, sys.version_info[0], _parser_digest()])
+        self.key = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        self.stamp = None
+        self.sha = None
+
+    def read_xml(self):
+        """ :return: the minigraph content, recording its stamp and sha256 for save() """
+        st = os.stat(self.filename)
+        with open(self.filename, 'rb') as f:
+            content = f.read()
+        self.stamp = [st.st_mtime, st.st_size]
+        self.sha = hashlib.sha256(content).hexdigest()
+        return content
+
+    def iterparse_xml(self):
+        """ :return: the iterparse_minigraph() results, recording the minigraph stamp and sha256 for save() """
+        st = os.stat(self.filename)
+        sha = hashlib.sha256()
+        with open(self.filename, 'rb') as f:
+            (root, names) = iterparse_minigraph(_HashingReader(f, sha))
+        self.stamp = [st.st_mtime, st.st_size]
+        self.sha = sha.hexdigest()
+        return (root, names)
+
+    def load(self, args):
+        """ :return: the content saved for the same minigraph and arguments, None if there is none """
+        try:
+            st = os.stat(self.filename)
+            value = self.cache.get(self.key)
+            if value is None:
+                return None
+            snapshot = json.loads(value.decode('utf-8'))
+            if snapshot['version'] != SNAPSHOT_VERSION or _snapshot_decode(snapshot['args']) != args:
+                return None
+            if snapshot['stamp'] != [st.st_mtime, st.st_size]:
+                self.read_xml()
+                if snapshot['sha'] != self.sha:
+                    return None
+                # Same content under a new stamp, remember it to skip the sha256 next time
+                self.cache.put(self.key, json.dumps(dict(snapshot, stamp=self.stamp)).encode('utf-8'))
+            return _snapshot_decode(snapshot['content'])
+        except Exception:
+            return None
+
+    def save(self, args, content):
+        """ Save the content, which must have been produced from the minigraph as of the last read_xml() """
+        if self.sha is None:
+            return
+        try:
+            snapshot = {
+                'version': SNAPSHOT_VERSION,
+                'args': _snapshot_encode(args),
+                'stamp': self.stamp,
+                'sha': self.sha,
+                'content': _snapshot_encode(content)
+            }
+            value = json.dumps(snapshot).encode('utf-8')
+        except (TypeError, ValueError):
+            # Content which can't be saved as JSON, it is parsed again next time
+            return
+        self.cache.put(self.key, value)
+
+_parser_sha = None
+
+def _parser_digest():
+    """
+    :return: the sha256 of the code producing the snapshots, this module and the running
+    script (sonic-cfggen), so that the snapshots of an older parser are not used
+    """
+    global _parser_sha
+    if _parser_sha is None:
+        sha = hashlib.sha256()
+        source = os.path.splitext(__file__)[0] + '.py'
+        script = getattr(sys.modules.get('__main__'), '__file__', None)
+        for path in [source if os.path.exists(source) else __file__, script]:
+            if path is None:
+                continue
+            try:
+                with open(path, 'rb') as f:
+                    sha.update(f.read())
+            except (IOError, OSError):
+                sha.update(path.encode('utf-8'))
+        _parser_sha = sha.hexdigest()
+    return _parser_sha
+
+# The parse results hold tuples, tuple keys and ip addresses, which have no JSON
+# equivalent: they are saved as single key objects tagged with the type name
+_TUPLE_TAG = '__tuple__'
+_ITEMS_TAG = '__items__'
+_IP_ADDRESS_TAG = '__ip_address__'
+_IP_NETWORK_TAG = '__ip_network__'
+
+def _snapshot_encode(obj):
+    """ :return: obj converted to JSON serializable types, see _snapshot_decode() """
+    if isinstance(obj, dict):
+        if all(isinstance(key, str) and not key.startswith('__') for key in obj):
+            return {key: _snapshot_encode(value) for key, value in obj.items()}
+        return {_ITEMS_TAG: [[_snapshot_encode(key), _snapshot_encode(value)] for key, value in obj.items()]}
+    if isinstance(obj, tuple):
+        return {_TUPLE_TAG: [_snapshot_encode(item) for item in obj]}
+    if isinstance(obj, list):
+        return [_snapshot_encode(item) for item in obj]
+    if isinstance(obj, (ipaddress.IPv4Address, ipaddress.IPv6Address)):
+        return {_IP_ADDRESS_TAG: str(obj)}
+    if isinstance(obj, (ipaddress.IPv4Network, ipaddress.IPv6Network)):
+        return {_IP_NETWORK_TAG: str(obj)}
+    if obj is None or isinstance(obj, (bool, int, float, str, type(u''))):
+        return obj
+    raise TypeError('%r can not be saved in a minigraph snapshot' % type(obj))
+
+def _snapshot_decode(obj):
+    """ :return: the object which _snapshot_encode() converted to obj """
+    if isinstance(obj, dict):
+        if len(obj) == 1:
+            (tag, value), = obj.items()
+            if tag == _TUPLE_TAG:
+                return tuple(_snapshot_decode(item) for item in value)
+            if tag == _ITEMS_TAG:
+                return {_snapshot_decode(key): _snapshot_decode(item) for key, item in value}
+            if tag == _IP_ADDRESS_TAG:
+                return ipaddress.IPAddress(value)
+            if tag == _IP_NETWORK_TAG:
+                return ipaddress.IPNetwork(value)
+        return {_snapshot_decode(key): _snapshot_decode(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [_snapshot_decode(item) for item in obj]
+    if isinstance(obj, type(u'')) and str is bytes:
+        # python 2: lxml gives str for the ascii text, which json loads as unicode
+        try:
+            return obj.encode('ascii')
+        except UnicodeEncodeError:
+            return obj
+    return obj
+
+class _StderrRecorder(object):
+    """ Pass writes through to stderr and keep them, to replay the parse warnings on snapshot hits """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.output = []
+
+    def write(self, text):
+        self.output.append(text)
+        self.stream.write(text)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+class _HashingReader(object):
+    """ File object wrapper updating a hash with the content read """
+
+    def __init__(self, f, sha):
+        self.f = f
+        self.sha = sha
+
+    def read(self, size=-1):
+        content = self.f.read(size)
+        self.sha.update(content)
+        return content
+
+def _port_config_digest(port_config):
+    return hashlib.sha256(json.dumps(port_config, sort_keys=True).encode('utf-8')).hexdigest()
+
+def get_asic_sub_roles(filename, root=None):
+    """
+    :param root: the parsed minigraph, if the caller has it already
+    :return: dictionary of the lowercase device names to their SubRole in the minigraph metadata
+    """
+    snapshot = MinigraphSnapshot(filename, 'sub_roles')
+    sub_roles = snapshot.load(())
+    if sub_roles is not None:
+        return sub_roles
+
+    if root is None:
+        root = ET.fromstring(snapshot.read_xml())
+    else:
+        snapshot.read_xml()
+    sub_roles = {}
+    for child in root:
+        if child.tag == str(QName(ns, "MetadataDeclaration")):
+            sub_roles = parse_asic_sub_roles(child)
+            break
+    snapshot.save((), sub_roles)
+    return sub_roles
+
 ###############################################################################
 #
 # Main functions
 #
 ###############################################################################
-def parse_xml(filename, platform=None, port_config_file=None, asic_name=None, hwsku_config_file=None):
+def parse_xml(filename, platform=None, port_config_file=None, asic_name=None, hwsku_config_file=None, streaming=False):
     """ Parse minigraph xml file.
 
+    The results are saved in a snapshot of the file (see MinigraphSnapshot) and
+    returned from it by the following calls with the same arguments, as long as
+    neither the minigraph nor the port config changed.
+
     Keyword arguments:
     filename -- minigraph file name
     platform -- device platform
     port_config_file -- port config file name
     asic_name -- asic name; to parse multi-asic device minigraph to 
     generate asic specific configuration.
+    streaming -- read the file with iterparse_minigraph(), for large minigraphs
      """
 
-    root = ET.parse(filename).getroot()
+    snapshot = MinigraphSnapshot(filename, asic_name or 'host')
+    args = (platform, port_config_file, asic_name, hwsku_config_file)
+    results = _load_snapshot(snapshot, args)
+    if results is None:
+        root = _read_root(snapshot, streaming, [asic_name] if asic_name else [])
+        results = _parse_and_save(root, filename, snapshot, args)
+    return results
+
+def parse_xml_namespaces(filename, platform=None, port_config_file=None, asic_names=None, hwsku_config_file=None, asic_port_config_file=None, streaming=False):
+    """ Parse minigraph xml file for the host and all the asics at once.
+
+    The file is parsed a single time, instead of once per parse_xml() call, and
+    not at all when the snapshots of all the namespaces are valid.
+
+    Keyword arguments:
+    filename -- minigraph file name
+    platform -- device platform
+    port_config_file -- port config file name of the host
+    asic_names -- list of the asic names; by default the Asic devices of the minigraph
+    hwsku_config_file -- hwsku config file name
+    asic_port_config_file -- port config file name of the asics, with '{}' replaced by
+    the asic id; found from the platform if not given
+    streaming -- read the file with iterparse_minigraph(), for large minigraphs
+
+    Returns a dictionary of the namespace names ('' for the host) to the
+    parse_xml() results of the namespace.
+    """
+    xml = MinigraphSnapshot(filename, 'host')
+    root = None
+    if asic_names is None:
+        root = _read_root(xml, streaming)
+        asic_names = parse_asic_names(root)
+
+    # port_alias_map and port_alias_asic_map are per namespace, as in a parse_xml() call from a new process
+    saved_port_alias_map = dict(port_alias_map)
+    saved_port_alias_asic_map = dict(port_alias_asic_map)
+    namespaces = {}
+    try:
+        for asic_name in [None] + list(asic_names):
+            port_alias_map.clear()
+            port_alias_asic_map.clear()
+            if asic_name is None:
+                snapshot = xml
+                namespace_port_config_file = port_config_file
+            else:
+                snapshot = MinigraphSnapshot(filename, asic_name)
+                namespace_port_config_file = None
+                if asic_port_config_file is not None:
+                    namespace_port_config_file = asic_port_config_file.format(get_asic_id_from_name(asic_name))
+            args = (platform, namespace_port_config_file, asic_name, hwsku_config_file)
+            results = _load_snapshot(snapshot, args)
+            if results is None:
+                if root is None:
+                    root = _read_root(xml, streaming, asic_names)
+                # All the snapshots are taken from the same read of the file
+                snapshot.stamp, snapshot.sha = xml.stamp, xml.sha
+                results = _parse_and_save(root, filename, snapshot, args)
+            namespaces[asic_name or DEFAULT_NAMESPACE] = results
+    finally:
+        port_alias_map.clear()
+        port_alias_map.update(saved_port_alias_map)
+        port_alias_asic_map.clear()
+        port_alias_asic_map.update(saved_port_alias_asic_map)
+    return namespaces
+
+def parse_asic_names(root):
+    """ :return: the sorted namespace names of the Asic devices of the minigraph """
+    asic_names = []
+    for child in root:
+        if child.tag == str(QName(ns, "PngDec")):
+            devices = child.find(str(QName(ns, "Devices")))
+            for device in devices.findall(str(QName(ns, "Device"))):
+                (_, _, name, _, d_type, _) = parse_device(device)
+                if d_type == 'Asic' and name.lower().startswith(ASIC_NAME_PREFIX):
+                    asic_names.append(name.lower())
+    return sorted(asic_names, key=lambda name: int(get_asic_id_from_name(name)))
+
+def _read_root(snapshot, streaming, asic_names=None):
+    """ Read the minigraph root for parse_xml(), see iterparse_minigraph().
+
+    A streamed minigraph whose dropped elements may be needed for the host or the
+    asics, by default all the Asic devices of the minigraph, is read again in full.
+    """
+    if streaming:
+        (root, names) = snapshot.iterparse_xml()
+        if asic_names is None:
+            asic_names = parse_asic_names(root)
+        if _iterparsed_for(root, names, asic_names):
+            return root
+    return ET.fromstring(snapshot.read_xml())
+
+def _load_snapshot(snapshot, args):
+    """ :return: the parse_xml() results saved in the snapshot if it is still valid, None otherwise """
+    saved = snapshot.load(args)
+    if saved is None:
+        return None
+    (platform, port_config_file, asic_name, hwsku_config_file) = args
+    asic_id = get_asic_id_from_name(asic_name) if asic_name is not None else None
+    port_config = get_port_config(hwsku=saved['hwsku'], platform=platform, port_config_file=port_config_file, asic=asic_id, hwsku_config_file=hwsku_config_file)
+    if _port_config_digest(port_config) != saved['port_config']:
+        return None
+    port_alias_map.update(port_config[1])
+    port_alias_asic_map.update(port_config[2])
+    sys.stderr.write(''.join(saved['warnings']))
+    return saved['results']
+
+def _parse_and_save(root, filename, snapshot, args):
+    """ :return: the parse_xml() results, saved in the snapshot with the warnings printed while parsing """
+    (platform, port_config_file, asic_name, hwsku_config_file) = args
+    stderr = sys.stderr
+    sys.stderr = _StderrRecorder(stderr)
+    try:
+        (results, hwsku, port_config) = _parse_xml_root(root, filename, platform, port_config_file, asic_name, hwsku_config_file)
+    finally:
+        warnings = sys.stderr.output
+        sys.stderr = stderr
+
+    snapshot.save(args, {
+        'hwsku': hwsku,
+        'port_config': port_config,
+        'warnings': warnings,
+        'results': results
+    })
+    return results
+
+def _parse_xml_root(root, filename, platform, port_config_file, asic_name, hwsku_config_file):
+    """ :return: the parse_xml() results, the hwsku and the digest of the port config it used """
 
     u_neighbors = None
     u_devices = None
@@ -861,9 +1319,14 @@ def parse_xml(filename, platform=None, port_config_file=None, asic_name=None, hw
             docker_routing_config_mode = child.text
 
     (ports, alias_map, alias_asic_map) = get_port_config(hwsku=hwsku, platform=platform, port_config_file=port_config_file, asic=asic_id, hwsku_config_file=hwsku_config_file)
+    port_config = _port_config_digest((ports, alias_map, alias_asic_map))
     port_alias_map.update(alias_map)
     port_alias_asic_map.update(alias_asic_map)
 
+    if asic_name is not None:
+        # Spare enable_internal_bgp_session() parsing the file again
+        get_asic_sub_roles(filename, root)
+
     for child in root:
         if asic_name is None:
             if child.tag == str(QName(ns, "DpgDec")):
@@ -896,12 +1359,17 @@ def parse_xml(filename, platform=None, port_config_file=None, asic_name=None, hw
             elif child.tag == str(QName(ns, "DeviceInfos")):
                 (port_speeds_default, port_descriptions) = parse_deviceinfo(child, hwsku)
 
+    # Case insensitive device name index, the first of the devices differing only by case wins
+    device_names = {}
+    for key in devices:
+        device_names.setdefault(key.lower(), key)
+
     # set the host device type in asic metadata also
-    device_type = [devices[key]['type'] for key in devices if key.lower() == hostname.lower()][0]
+    device_type = devices[device_names[hostname.lower()]]['type']
     if asic_name is None:
-        current_device = [devices[key] for key in devices if key.lower() == hostname.lower()][0]
+        current_device = devices[device_names[hostname.lower()]]
     else:
-        current_device = [devices[key] for key in devices if key.lower() == asic_name.lower()][0]
+        current_device = devices[device_names[asic_name.lower()]]
 
     results = {}
     results['DEVICE_METADATA'] = {'localhost': {
@@ -1042,8 +1510,8 @@ def parse_xml(filename, platform=None, port_config_file=None, asic_name=None, hw
         if port:
             port['admin_status'] = 'up'
 
-    for port in neighbors.keys():
-        if port in ports.keys():
+    for port in neighbors:
+        if port in ports:
             # make all neighbors connected ports to 'admin_up'
             ports[port]['admin_status'] = 'up'
 
@@ -1113,9 +1581,11 @@ def parse_xml(filename, platform=None, port_config_file=None, asic_name=None, hw
             del neighbors[nghbr]
     results['DEVICE_NEIGHBOR'] = neighbors
     if asic_name is None:
-        results['DEVICE_NEIGHBOR_METADATA'] = { key:devices[key] for key in devices if key.lower() != hostname.lower() }
+        hostname_lower = hostname.lower()
+        results['DEVICE_NEIGHBOR_METADATA'] = { key:devices[key] for key in devices if key.lower() != hostname_lower }
     else:
-        results['DEVICE_NEIGHBOR_METADATA'] = { key:devices[key] for key in devices if key in {device['name'] for device in neighbors.values()} }
+        neighbor_names = {device['name'] for device in neighbors.values()}
+        results['DEVICE_NEIGHBOR_METADATA'] = { key:devices[key] for key in devices if key in neighbor_names }
     results['SYSLOG_SERVER'] = dict((item, {}) for item in syslog_servers)
     results['DHCP_SERVER'] = dict((item, {}) for item in dhcp_servers)
     results['NTP_SERVER'] = dict((item, {}) for item in ntp_servers)
@@ -1170,7 +1640,7 @@ def parse_xml(filename, platform=None, port_config_file=None, asic_name=None, hw
     if current_device['type'] == spine_chassis_frontend_role:
         parse_spine_chassis_fe(results, vni, lo_intfs, phyport_intfs, pc_intfs, pc_members, devices)
 
-    return results
+    return (results, hwsku, port_config)
 
 
 def parse_device_desc_xml(filename):
@@ -1195,11 +1665,7 @@ def parse_device_desc_xml(filename):
 def parse_asic_sub_role(filename, asic_name):
     if not os.path.isfile(filename):
         return None
-    root = ET.parse(filename).getroot()
-    for child in root:
-        if child.tag == str(QName(ns, "MetadataDeclaration")):
-            sub_role = parse_asic_meta(child, asic_name)
-            return sub_role
+    return get_asic_sub_roles(filename).get(asic_name.lower())
 
 port_alias_map = {}
 port_alias_asic_map = {}
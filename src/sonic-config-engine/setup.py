@@ -36,7 +36,11 @@ setup(
     author_email = 'taoyl@microsoft.com',
     url = 'https://github.com/Azure/sonic-buildimage',
     py_modules = [
+        'cfggen_cache',
+        'cfggen_server',
+        'config_diff',
         'config_samples',
+        'file_bcc',
         'lazy_re',
         'minigraph',
         'openconfig_acl',
@@ -0,0 +1,24 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from cfggen_cache import CACHE_DIR_ENV
+
+
+@pytest.fixture(scope='session', autouse=True)
+def cache_dir():
+    """
+    Keep the sonic-cfggen caches of the test run, and of the sonic-cfggen processes it
+    starts, in a temporary directory instead of the cache directory of the host
+    """
+    directory = tempfile.mkdtemp()
+    saved = os.environ.get(CACHE_DIR_ENV)
+    os.environ[CACHE_DIR_ENV] = directory
+    yield directory
+    if saved is None:
+        del os.environ[CACHE_DIR_ENV]
+    else:
+        os.environ[CACHE_DIR_ENV] = saved
+    shutil.rmtree(directory)
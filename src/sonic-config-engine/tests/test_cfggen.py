@@ -1,11 +1,19 @@
 import json
 import subprocess
 import os
+import shutil
+import sys
+import tempfile
 
 import tests.common_utils as utils
 
 from unittest import TestCase
 
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
 TOR_ROUTER = 'ToRRouter'
 BACKEND_TOR_ROUTER = 'BackEndToRRouter'
 
@@ -102,6 +110,33 @@ class TestCfgGen(TestCase):
         output = self.run_script(argument)
         self.assertEqual(output.strip(), 'value1')
 
+    def test_multiple_vars(self):
+        argument = '-a \'{"key1":"value1", "key2":"value2"}\' -v key1 -v key2'
+        output = self.run_script(argument)
+        self.assertEqual(output, 'value1\nvalue2\n')
+
+    def test_multiple_vars_shell_format(self):
+        argument = '-a \'{"key1":"value1", "key2":"two words"}\' -v "V1=key1" -v "V2 = key2" -v "V3=key3" --var-format shell'
+        output = self.run_script(argument)
+        self.assertEqual(output, 'V1=value1\nV2=\'two words\'\nV3=\'\'\n')
+
+    def test_multiple_vars_json_format(self):
+        argument = '-m "' + self.sample_graph + '" -v "DEVICE_METADATA[\'localhost\'][\'hwsku\']" -v "TYPE=DEVICE_METADATA[\'localhost\'][\'type\']" --var-format json'
+        output = self.run_script(argument)
+        self.assertEqual(json.loads(output), {"DEVICE_METADATA['localhost']['hwsku']": 'Force10-Z9100', 'TYPE': 'LeafRouter'})
+
+    def test_var_file(self):
+        argument = '-a \'{"key1":"value1", "key2":"value2"}\' -v key1 --var-file - --var-format json <<EOF\n# comment\nkey2\nK3=key1 ~ key2\nEOF'
+        output = self.run_script(argument)
+        self.assertEqual(json.loads(output), {'key1': 'value1', 'key2': 'value2', 'K3': 'value1value2'})
+
+    def test_multiple_vars_error(self):
+        argument = '-a \'{"key1":"value1"}\' -v "V1=key1" -v "V2=undefined_var[\'x\'][\'y\']" --var-format shell'
+        with self.assertRaises(subprocess.CalledProcessError) as cm:
+            self.run_script(argument)
+        output = cm.exception.output.decode() if utils.PY3x else cm.exception.output
+        self.assertEqual(output, 'V1=value1\nV2=\'\'\n')
+
     def test_additional_json_data_level1_key(self):
         argument = '-a \'{"k1":{"k11":"v11","k12":"v12"}, "k2":{"k22":"v22"}}\' --var-json k1'
         output = self.run_script(argument)
@@ -112,6 +147,31 @@ class TestCfgGen(TestCase):
         output = self.run_script(argument)
         self.assertEqual(utils.to_dict(output.strip()), utils.to_dict('{\n    "k11": "v11"\n}'))
 
+    def test_merge_json_data(self):
+        with open(self.output_file, 'w') as f:
+            json.dump({
+                'INTERFACE': {'Ethernet0': {}, 'Ethernet0|10.0.0.0/31': {}},
+                'VLAN_MEMBER': {'Vlan1000|Ethernet8': {'tagging_mode': 'untagged'}}
+            }, f)
+        with open(self.output2_file, 'w') as f:
+            json.dump({
+                'VLAN': {'Vlan1000': {'vlanid': '1000'}},
+                'VLAN_MEMBER': {
+                    'Vlan1000|Ethernet8': {'tagging_mode': 'tagged'},
+                    'Vlan1000|Ethernet12': {'tagging_mode': 'untagged'}
+                }
+            }, f)
+        argument = '-j "' + self.output_file + '" -j "' + self.output2_file + '" --print-data'
+        output = self.run_script(argument)
+        self.assertEqual(json.loads(output), {
+            'INTERFACE': {'Ethernet0': {}, 'Ethernet0|10.0.0.0/31': {}},
+            'VLAN': {'Vlan1000': {'vlanid': '1000'}},
+            'VLAN_MEMBER': {
+                'Vlan1000|Ethernet8': {'tagging_mode': 'tagged'},
+                'Vlan1000|Ethernet12': {'tagging_mode': 'untagged'}
+            }
+        })
+
     def test_var_json_data(self):
         argument = '-m "' + self.sample_graph_simple + '" -p "' + self.port_config + '" --var-json VLAN_MEMBER'
         output = self.run_script(argument)
@@ -526,3 +586,193 @@ class TestCfgGen(TestCase):
         argument = '-a \'{"key1":"value"}\' --var-json INTERFACE'
         output = self.run_script(argument)
         self.assertEqual(output, '')
+
+
+def load_sonic_cfggen():
+    """ Import the sonic-cfggen script as a module, to call its functions directly """
+    path = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'sonic-cfggen')
+    if utils.PY3x:
+        import importlib.machinery
+        import importlib.util
+        loader = importlib.machinery.SourceFileLoader('sonic_cfggen', path)
+        spec = importlib.util.spec_from_loader('sonic_cfggen', loader)
+        module = importlib.util.module_from_spec(spec)
+        loader.exec_module(module)
+        return module
+    import imp
+    return imp.load_source('sonic_cfggen', path)
+
+
+class FakePipeline(object):
+
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def keys(self, pattern):
+        self.commands.append((self.client.keys, pattern))
+
+    def hgetall(self, key):
+        self.commands.append((self.client.hgetall, key))
+
+    def execute(self):
+        results = [command(arg) for command, arg in self.commands]
+        self.commands = []
+        return results
+
+
+class FakeRedis(object):
+
+    def __init__(self, configdb):
+        self.configdb = configdb
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def keys(self, pattern):
+        table = pattern[:-len('|*')]
+        self.configdb.reads.append(table)
+        return [key for key in self.configdb.content if key.startswith(table + '|')]
+
+    def hgetall(self, key):
+        return dict(self.configdb.content[key])
+
+
+class FakeConfigDB(object):
+    """ ConfigDBPipeConnector on a dict of redis keys, recording the tables read ('*' for all) """
+
+    TABLE_NAME_SEPARATOR = '|'
+    db_name = 'CONFIG_DB'
+    content = {}
+    reads = []
+
+    def __init__(self, **kwargs):
+        pass
+
+    def connect(self, *args):
+        pass
+
+    def get_redis_client(self, db_name):
+        return FakeRedis(self)
+
+    @staticmethod
+    def deserialize_key(key):
+        tokens = key.split('|')
+        return tuple(tokens) if len(tokens) > 1 else key
+
+    def raw_to_typed(self, raw):
+        typed = {}
+        for field, value in raw.items():
+            if field == 'NULL':
+                continue
+            if field.endswith('@'):
+                typed[field[:-1]] = value.split(',')
+            else:
+                typed[field] = value
+        return typed
+
+    def get_config(self):
+        self.reads.append('*')
+        data = {}
+        for key, raw in self.content.items():
+            (table, row) = key.split('|', 1)
+            data.setdefault(table, {})[self.deserialize_key(row)] = self.raw_to_typed(raw)
+        return data
+
+
+class TestCfgGenConfigDbTables(TestCase):
+
+    def setUp(self):
+        self.cfggen = load_sonic_cfggen()
+        self.cfggen.ConfigDBPipeConnector = FakeConfigDB
+        FakeConfigDB.content = {
+            'PORT|Ethernet0': {'mtu': '9100'},
+            'PORT|Ethernet4': {'mtu': '1500'},
+            'VLAN|Vlan1000': {'vlanid': '1000', 'members@': 'Ethernet0,Ethernet4'},
+            'ACL_TABLE|DATAACL': {'type': 'L3'},
+            'DEVICE_METADATA|localhost': {'hostname': 'switch'},
+        }
+        FakeConfigDB.reads = []
+        self.saved_env = dict(os.environ)
+        os.environ['SONIC_CFGGEN_BYTECODE_CACHE'] = 'none'
+        self.template_dir = tempfile.mkdtemp()
+        templates = {
+            'main.j2': "{% import 'macros.j2' as macros %}{% include 'ports.j2' %}{{ macros.vlans(VLAN) }}\n",
+            'ports.j2': "{% for port in PORT | sort %}{{ port }} {{ PORT[port]['mtu'] }}\n{% endfor %}",
+            'macros.j2': "{% macro vlans(vlans) %}{% for vlan in vlans | sort %}{{ vlan }}{% endfor %}{% endmacro %}",
+            'dynamic.j2': "{% include template_name %}",
+        }
+        for name, source in templates.items():
+            with open(os.path.join(self.template_dir, name), 'w') as f:
+                f.write(source)
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.saved_env)
+        shutil.rmtree(self.template_dir)
+
+    def run_main(self, argv):
+        saved_stdout = sys.stdout
+        sys.stdout = StringIO()
+        try:
+            self.cfggen.main(argv)
+            return sys.stdout.getvalue()
+        finally:
+            sys.stdout = saved_stdout
+
+    def render(self, template, *extra_args):
+        argv = ['-d', '--no-render-cache', '-t', os.path.join(self.template_dir, template)] + list(extra_args)
+        return self.run_main(argv)
+
+    def test_tables_of_included_and_imported_templates(self):
+        env = self.cfggen._get_jinja2_env([self.template_dir])
+        self.assertEqual(self.cfggen._find_referenced_tables(env, [], ['main.j2']), set(['PORT', 'VLAN']))
+        self.assertEqual(self.cfggen._find_referenced_tables(env, ["DEVICE_METADATA['localhost']['hostname']"], ['ports.j2']),
+                         set(['PORT', 'DEVICE_METADATA']))
+        self.assertIsNone(self.cfggen._find_referenced_tables(env, [], ['dynamic.j2']))
+
+        self.assertEqual(self.render('main.j2'), 'Ethernet0 9100\nEthernet4 1500\nVlan1000\n')
+        self.assertEqual(sorted(FakeConfigDB.reads), ['PORT', 'VLAN'])
+
+    def test_tables_option_same_as_full_read(self):
+        full = self.run_main(['-d', '--print-data'])
+        self.assertEqual(FakeConfigDB.reads, ['*'])
+        FakeConfigDB.reads = []
+        tables = self.run_main(['-d', '--tables', 'PORT,VLAN,ACL_TABLE,DEVICE_METADATA', '--print-data'])
+        self.assertNotIn('*', FakeConfigDB.reads)
+        self.assertEqual(json.loads(tables), json.loads(full))
+
+        self.assertEqual(self.render('main.j2', '--tables', 'PORT,VLAN'), self.render('main.j2'))
+        self.assertEqual(self.run_main(['-d', '-v', 'VLAN']), self.run_main(['-d', '--tables', 'VLAN,PORT', '-v', 'VLAN']))
+
+    def test_lazy_fetch_per_table(self):
+        # The template included dynamically can't be analyzed, the tables are fetched when they are looked up
+        self.assertEqual(self.render('dynamic.j2', '-a', '{"template_name": "ports.j2"}'), self.render('ports.j2'))
+        self.assertEqual(FakeConfigDB.reads, ['PORT', 'PORT'])
+
+    def test_lazy_fetch_all_when_iterating(self):
+        data = self.cfggen.LazyConfigData({'extra': 'value'}, FakeConfigDB())
+        self.assertEqual(data['PORT'], {'Ethernet0': {'mtu': '9100'}, 'Ethernet4': {'mtu': '1500'}})
+        self.assertNotIn('LOOPBACK_INTERFACE', data)
+        self.assertEqual(data.get('extra'), 'value')
+        self.assertEqual(FakeConfigDB.reads, ['PORT', 'LOOPBACK_INTERFACE'])
+
+        self.assertEqual(sorted(data), ['ACL_TABLE', 'DEVICE_METADATA', 'PORT', 'VLAN', 'extra'])
+        self.assertEqual(FakeConfigDB.reads, ['PORT', 'LOOPBACK_INTERFACE', '*'])
+        self.assertEqual(data['VLAN'], {'Vlan1000': {'vlanid': '1000', 'members': ['Ethernet0', 'Ethernet4']}})
+        self.assertEqual(FakeConfigDB.reads, ['PORT', 'LOOPBACK_INTERFACE', '*'])
+
+    def test_template_error_location(self):
+        with open(os.path.join(self.template_dir, 'broken.j2'), 'w') as f:
+            f.write("{% include template_name %}\n{{ PORT['Ethernet8']['mtu'] }}\n")
+        try:
+            self.render('broken.j2', '-a', '{"template_name": "ports.j2"}')
+        except Exception:
+            tb = sys.exc_info()[2]
+            frames = []
+            while tb is not None:
+                frames.append((tb.tb_frame.f_code.co_filename, tb.tb_lineno))
+                tb = tb.tb_next
+            self.assertIn((os.path.join(self.template_dir, 'broken.j2'), 2), frames)
+        else:
+            self.fail('rendering a broken template succeeded')
@@ -0,0 +1,95 @@
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+
+import tests.common_utils as utils
+
+from unittest import TestCase
+
+
+class TestCfgGenCache(TestCase):
+
+    def setUp(self):
+        self.test_dir = os.path.dirname(os.path.realpath(__file__))
+        self.script_file = os.path.join(self.test_dir, '..', 'sonic-cfggen')
+        self.t0_minigraph = os.path.join(self.test_dir, 't0-sample-graph.xml')
+        self.t0_port_config = os.path.join(self.test_dir, 't0-sample-port-config.ini')
+        self.lldpd_conf_template = os.path.join(self.test_dir, '..', '..', '..', 'dockers', 'docker-lldp', 'lldpd.conf.j2')
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def run_script(self, argument):
+        env = dict(os.environ)
+        env['SONIC_CFGGEN_CACHE_DIR'] = self.cache_dir
+        env['SONIC_CFGGEN_SOCKET'] = ''
+        output = subprocess.check_output([utils.PYTHON_INTERPRETTER, self.script_file] + argument, env=env)
+        if utils.PY3x:
+            output = output.decode()
+        return output
+
+    def get_stats(self, cache='render'):
+        return json.loads(self.run_script(['--cache-stats']))[cache]
+
+    def test_hit_and_miss(self):
+        argument = ['-m', self.t0_minigraph, '-p', self.t0_port_config, '-t', self.lldpd_conf_template]
+        first = self.run_script(argument)
+        self.assertEqual(self.get_stats()['misses'], 1)
+        self.assertEqual(self.get_stats()['entries'], 1)
+
+        second = self.run_script(argument)
+        self.assertEqual(first, second)
+        self.assertEqual(self.get_stats()['hits'], 1)
+
+        with open(os.path.join(self.test_dir, 'sample_output', utils.PYvX_DIR, 'lldpd.conf')) as f:
+            self.assertEqual(second, f.read())
+
+    def test_data_change(self):
+        argument = ['-m', self.t0_minigraph, '-p', self.t0_port_config, '-t', self.lldpd_conf_template]
+        self.run_script(argument)
+        output = self.run_script(argument + ['-a', '{"DEVICE_METADATA": {"localhost": {"hostname": "switch-t1"}}}'])
+        self.assertIn('configure system hostname switch-t1', output)
+        self.assertEqual(self.get_stats()['misses'], 2)
+
+    def test_unused_data_change(self):
+        argument = ['-m', self.t0_minigraph, '-p', self.t0_port_config, '-t', self.lldpd_conf_template]
+        self.run_script(argument)
+        self.run_script(argument + ['-a', '{"NOT_USED": {"key": "value"}}'])
+        self.assertEqual(self.get_stats()['hits'], 1)
+
+    def test_bypass(self):
+        argument = ['-m', self.t0_minigraph, '-p', self.t0_port_config, '-t', self.lldpd_conf_template, '--no-render-cache']
+        self.run_script(argument)
+        self.run_script(argument)
+        stats = self.get_stats()
+        self.assertEqual(stats['entries'], 0)
+        self.assertNotIn('hits', stats)
+        self.assertNotIn('misses', stats)
+
+    def test_bytecode_cache(self):
+        argument = ['-m', self.t0_minigraph, '-p', self.t0_port_config, '-t', self.lldpd_conf_template, '--no-render-cache']
+        first = self.run_script(argument)
+        stats = self.get_stats('bytecode')
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['entries'], 1)
+
+        self.assertEqual(self.run_script(argument), first)
+        stats = self.get_stats('bytecode')
+        self.assertEqual(stats['hits'], 1)
+        self.assertIn('compile_time_saved', stats)
+
+    def test_untrusted_entries(self):
+        argument = ['-m', self.t0_minigraph, '-p', self.t0_port_config, '-t', self.lldpd_conf_template, '--no-render-cache']
+        first = self.run_script(argument)
+        bytecode_dir = os.path.join(self.cache_dir, 'bytecode')
+        for name in os.listdir(bytecode_dir):
+            if name.endswith('.cache'):
+                os.chmod(os.path.join(bytecode_dir, name), 0o666)
+        # Bytecode others could have written is compiled again instead of being loaded
+        self.assertEqual(self.run_script(argument), first)
+        stats = self.get_stats('bytecode')
+        self.assertEqual(stats['misses'], 2)
+        self.assertNotIn('hits', stats)
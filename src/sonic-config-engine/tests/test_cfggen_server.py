@@ -0,0 +1,105 @@
+import os
+import socket
+import stat
+import subprocess
+import tempfile
+import time
+
+import tests.common_utils as utils
+
+from cfggen_server import forward_to_server
+
+from unittest import TestCase
+
+
+class TestCfgGenServer(TestCase):
+
+    def setUp(self):
+        self.test_dir = os.path.dirname(os.path.realpath(__file__))
+        self.script_file = os.path.join(self.test_dir, '..', 'sonic-cfggen')
+        self.sample_graph_t0 = os.path.join(self.test_dir, 't0-sample-graph.xml')
+        self.port_config = os.path.join(self.test_dir, 't0-sample-port-config.ini')
+        self.socket_path = os.path.join(tempfile.mkdtemp(), 'sonic-cfggen.sock')
+        self.server = subprocess.Popen([utils.PYTHON_INTERPRETTER, self.script_file, '--server', self.socket_path, '--server-idle-timeout', '30'])
+        for _ in range(100):
+            if os.path.exists(self.socket_path):
+                break
+            time.sleep(0.1)
+
+    def tearDown(self):
+        self.server.terminate()
+        self.server.wait()
+
+    def run_script(self, argument, socket_path):
+        env = dict(os.environ)
+        env['SONIC_CFGGEN_SOCKET'] = socket_path
+        proc = subprocess.Popen([utils.PYTHON_INTERPRETTER, self.script_file] + argument, env=env, cwd=self.test_dir,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        output, _ = proc.communicate()
+        if utils.PY3x:
+            output = output.decode()
+        return proc.returncode, output
+
+    def test_server_is_running(self):
+        self.assertTrue(os.path.exists(self.socket_path))
+        self.assertIsNone(self.server.poll())
+
+    def test_var(self):
+        argument = ['-m', 't0-sample-graph.xml', '-p', 't0-sample-port-config.ini', '-v', "DEVICE_METADATA['localhost']['hostname']"]
+        served = self.run_script(argument, self.socket_path)
+        local = self.run_script(argument, '')
+        self.assertEqual(served, (0, 'switch-t0\n'))
+        self.assertEqual(served, local)
+        # Second request is answered from the warm source cache
+        self.assertEqual(self.run_script(argument, self.socket_path), served)
+
+    def test_template(self):
+        template = os.path.join(self.test_dir, '..', '..', '..', 'dockers', 'docker-lldp', 'lldpd.conf.j2')
+        argument = ['-m', self.sample_graph_t0, '-p', self.port_config, '-t', template]
+        served = self.run_script(argument, self.socket_path)
+        self.assertEqual(served, self.run_script(argument, ''))
+
+    def test_template_to_file(self):
+        template = os.path.join(self.test_dir, '..', '..', '..', 'dockers', 'docker-lldp', 'lldpd.conf.j2')
+        output_file = os.path.join(os.path.dirname(self.socket_path), 'lldpd.conf')
+        argument = ['-m', self.sample_graph_t0, '-p', self.port_config, '-t', template + ',' + output_file]
+        self.assertEqual(self.run_script(argument, self.socket_path), (0, ''))
+        with open(output_file) as f:
+            self.assertEqual(f.read(), self.run_script(['-m', self.sample_graph_t0, '-p', self.port_config, '-t', template], '')[1])
+
+    def test_environment(self):
+        argument = ['-m', 't0-sample-graph.xml', '-p', 't0-sample-port-config.ini', '-v', "DEVICE_METADATA['localhost']['namespace_id']"]
+        env = dict(os.environ)
+        env['SONIC_CFGGEN_SOCKET'] = self.socket_path
+        env['NAMESPACE_ID'] = '3'
+        output = subprocess.check_output([utils.PYTHON_INTERPRETTER, self.script_file] + argument, env=env, cwd=self.test_dir)
+        if utils.PY3x:
+            output = output.decode()
+        self.assertEqual(output, '3\n')
+
+    def test_error(self):
+        rc, _ = self.run_script(['--no-such-option'], self.socket_path)
+        self.assertEqual(rc, 2)
+        self.assertIsNone(self.server.poll())
+
+    def test_fallback_without_server(self):
+        argument = ['-m', 't0-sample-graph.xml', '-p', 't0-sample-port-config.ini', '-v', "DEVICE_METADATA['localhost']['hostname']"]
+        missing_socket = os.path.join(os.path.dirname(self.socket_path), 'missing.sock')
+        self.assertEqual(self.run_script(argument, missing_socket), (0, 'switch-t0\n'))
+
+    def test_socket_permissions(self):
+        self.assertEqual(stat.S_IMODE(os.stat(self.socket_path).st_mode), 0o600)
+
+    def test_no_rerun_on_hung_server(self):
+        # A server which accepts the connection, but never answers. The request may still
+        # be run by the server, so it fails instead of being run locally
+        hung_socket_path = os.path.join(os.path.dirname(self.socket_path), 'hung.sock')
+        hung_server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            hung_server.bind(hung_socket_path)
+            hung_server.listen(1)
+            start = time.time()
+            self.assertEqual(forward_to_server(['-v', 'DEVICE_METADATA'], hung_socket_path, timeout=0.5), 1)
+            self.assertLess(time.time() - start, 5)
+        finally:
+            hung_server.close()
@@ -0,0 +1,143 @@
+import fnmatch
+
+from unittest import TestCase
+
+import config_diff
+
+
+class FakeRedis(object):
+    """ Enough of a redis client for config_diff, recording the write commands """
+
+    def __init__(self, content):
+        self.content = content
+        self.writes = []
+
+    def keys(self, pattern):
+        return [key for key in self.content if fnmatch.fnmatchcase(key, pattern)]
+
+    def hgetall(self, key):
+        return dict(self.content.get(key, {}))
+
+    def hmset(self, key, fields):
+        self.writes.append(('hmset', key, fields))
+        self.content.setdefault(key, {}).update(fields)
+
+    def delete(self, key):
+        self.writes.append(('delete', key))
+        self.content.pop(key, None)
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline(object):
+
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((name, args))
+
+    def execute(self):
+        results = [getattr(self.client, name)(*args) for name, args in self.commands]
+        self.commands = []
+        return results
+
+
+class FakeConfigDB(object):
+    """ The ConfigDBConnector methods used by config_diff """
+
+    db_name = 'CONFIG_DB'
+    TABLE_NAME_SEPARATOR = '|'
+
+    def __init__(self, content):
+        self.client = FakeRedis(content)
+
+    def get_redis_client(self, db_name):
+        return self.client
+
+    @staticmethod
+    def serialize_key(key):
+        return '|'.join(key) if type(key) is tuple else str(key)
+
+    def typed_to_raw(self, typed):
+        if typed == {}:
+            return {'NULL': 'NULL'}
+        raw = {}
+        for field, value in typed.items():
+            if type(value) is list:
+                raw[field + '@'] = ','.join(value)
+            else:
+                raw[field] = str(value)
+        return raw
+
+
+class TestConfigDiff(TestCase):
+
+    def setUp(self):
+        self.configdb = FakeConfigDB({
+            'PORT|Ethernet0': {'mtu': '9100', 'speed': '100000'},
+            'PORT|Ethernet4': {'mtu': '9100', 'speed': '100000'},
+            'VLAN_MEMBER|Vlan1000|Ethernet8': {'tagging_mode': 'untagged'},
+            'LOOPBACK_INTERFACE|Loopback0': {'NULL': 'NULL'},
+            'ACL_TABLE|DATAACL': {'type': 'L3', 'ports@': 'Ethernet0,Ethernet4'},
+            'ACL_TABLE|EVERFLOW': {'type': 'MIRROR'},
+        })
+
+    def test_unchanged(self):
+        commands, counters = config_diff.get_config_diff(self.configdb, {
+            'PORT': {'Ethernet0': {'mtu': '9100', 'speed': '100000'}, 'Ethernet4': {'mtu': '9100'}},
+            'VLAN_MEMBER': {('Vlan1000', 'Ethernet8'): {'tagging_mode': 'untagged'}},
+            'LOOPBACK_INTERFACE': {'Loopback0': {}},
+            'ACL_TABLE': {'DATAACL': {'type': 'L3', 'ports': ['Ethernet0', 'Ethernet4']}},
+        })
+        self.assertEqual(commands, [])
+        self.assertEqual(counters['unchanged'], 5)
+
+    def test_changes(self):
+        commands, counters = config_diff.get_config_diff(self.configdb, {
+            'PORT': {'Ethernet0': {'mtu': '1500', 'speed': '100000'}, 'Ethernet8': {'mtu': '9100'}, 'Ethernet4': None},
+            'VLAN_MEMBER': {('Vlan1000', 'Ethernet12'): None},
+            'ACL_TABLE': None,
+        })
+        self.assertEqual(sorted(commands), [
+            ('DEL', 'ACL_TABLE|DATAACL', None),
+            ('DEL', 'ACL_TABLE|EVERFLOW', None),
+            ('DEL', 'PORT|Ethernet4', None),
+            ('HSET', 'PORT|Ethernet0', {'mtu': '1500'}),
+            ('HSET', 'PORT|Ethernet8', {'mtu': '9100'}),
+        ])
+        self.assertEqual(counters, {'added': 1, 'modified': 1, 'deleted': 3, 'fields': 2, 'unchanged': 0})
+
+    def test_apply_same_as_mod_config(self):
+        data = {
+            'PORT': {'Ethernet0': {'mtu': '1500'}, 'Ethernet8': {'mtu': '9100'}},
+            'VLAN_MEMBER': {('Vlan1000', 'Ethernet8'): None},
+            'LOOPBACK_INTERFACE': {'Loopback1': {}},
+        }
+        expected = dict((key, dict(fields)) for key, fields in self.configdb.client.content.items())
+        expected['PORT|Ethernet0']['mtu'] = '1500'
+        expected['PORT|Ethernet8'] = {'mtu': '9100'}
+        del expected['VLAN_MEMBER|Vlan1000|Ethernet8']
+        expected['LOOPBACK_INTERFACE|Loopback1'] = {'NULL': 'NULL'}
+
+        commands, _ = config_diff.get_config_diff(self.configdb, data)
+        config_diff.apply_config_diff(self.configdb, commands)
+        self.assertEqual(self.configdb.client.content, expected)
+        self.assertEqual(len(self.configdb.client.writes), 4)
+
+        # Writing the same data again changes nothing
+        commands, _ = config_diff.get_config_diff(self.configdb, data)
+        self.assertEqual(commands, [])
+
+    def test_format(self):
+        commands, counters = config_diff.get_config_diff(self.configdb, {
+            'PORT': {'Ethernet0': {'mtu': '1500', 'speed': '40000'}},
+            'VLAN_MEMBER': {('Vlan1000', 'Ethernet8'): None},
+        })
+        self.assertEqual(config_diff.format_config_diff(commands, counters), [
+            'HSET PORT|Ethernet0 mtu=1500 speed=40000',
+            'DEL VLAN_MEMBER|Vlan1000|Ethernet8',
+            '0 added, 1 modified (2 fields set), 1 deleted, 0 unchanged',
+        ])
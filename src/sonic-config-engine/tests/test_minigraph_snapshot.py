@@ -0,0 +1,139 @@
+import os
+import shutil
+import subprocess
+import tempfile
+
+import tests.common_utils as utils
+
+from unittest import TestCase
+
+
+class TestMinigraphSnapshot(TestCase):
+
+    def setUp(self):
+        self.test_dir = os.path.dirname(os.path.realpath(__file__))
+        self.script_file = os.path.join(self.test_dir, '..', 'sonic-cfggen')
+        self.work_dir = tempfile.mkdtemp()
+        self.sample_graph = os.path.join(self.work_dir, 't0-sample-graph.xml')
+        shutil.copy(os.path.join(self.test_dir, 't0-sample-graph.xml'), self.sample_graph)
+        self.port_config = os.path.join(self.test_dir, 't0-sample-port-config.ini')
+        self.cache_dir = tempfile.mkdtemp()
+        self.snapshot_dir = os.path.join(self.cache_dir, 'minigraph')
+        self.env = dict(os.environ)
+        self.env['SONIC_CFGGEN_CACHE_DIR'] = self.cache_dir
+        self.env['SONIC_CFGGEN_SOCKET'] = ''
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+        shutil.rmtree(self.cache_dir)
+
+    def get_snapshots(self):
+        return sorted(os.path.join(self.snapshot_dir, name) for name in os.listdir(self.snapshot_dir) if name.endswith('.cache'))
+
+    def run_script(self, argument):
+        output = subprocess.check_output([utils.PYTHON_INTERPRETTER, self.script_file] + argument, env=self.env)
+        if utils.PY3x:
+            output = output.decode()
+        return output
+
+    def get_hostname(self):
+        return self.run_script(['-m', self.sample_graph, '-p', self.port_config, '-v', "DEVICE_METADATA['localhost']['hostname']"])
+
+    def test_snapshot_reused(self):
+        self.assertEqual(self.get_hostname(), 'switch-t0\n')
+        (snapshot,) = self.get_snapshots()
+        with open(snapshot) as f:
+            content = f.read()
+        self.assertEqual(self.get_hostname(), 'switch-t0\n')
+        self.assertEqual(self.get_snapshots(), [snapshot])
+        with open(snapshot) as f:
+            self.assertEqual(f.read(), content)
+        # Nothing is written next to the minigraph
+        self.assertEqual(os.listdir(self.work_dir), ['t0-sample-graph.xml'])
+
+    def test_minigraph_changed(self):
+        self.assertEqual(self.get_hostname(), 'switch-t0\n')
+        with open(self.sample_graph) as f:
+            content = f.read()
+        with open(self.sample_graph, 'w') as f:
+            f.write(content.replace('switch-t0', 'switch-t1'))
+        self.assertEqual(self.get_hostname(), 'switch-t1\n')
+
+    def test_same_output(self):
+        argument = ['-m', self.sample_graph, '-p', self.port_config, '--print-data']
+        parsed = self.run_script(argument)
+        self.assertEqual(self.run_script(argument), parsed)
+
+    def test_corrupted_snapshot(self):
+        self.assertEqual(self.get_hostname(), 'switch-t0\n')
+        for snapshot in self.get_snapshots():
+            with open(snapshot, 'w') as f:
+                f.write('garbage')
+        self.assertEqual(self.get_hostname(), 'switch-t0\n')
+
+    def test_untrusted_snapshot(self):
+        self.assertEqual(self.get_hostname(), 'switch-t0\n')
+        for snapshot in self.get_snapshots():
+            with open(snapshot) as f:
+                content = f.read()
+            with open(snapshot, 'w') as f:
+                f.write(content.replace('switch-t0', 'switch-t1'))
+            os.chmod(snapshot, 0o666)
+        self.assertEqual(self.get_hostname(), 'switch-t0\n')
+
+    def test_parser_changed(self):
+        self.assertEqual(self.get_hostname(), 'switch-t0\n')
+        script_file = os.path.join(self.work_dir, 'sonic-cfggen')
+        with open(self.script_file) as f:
+            content = f.read()
+        with open(script_file, 'w') as f:
+            f.write(content + '\n# changed\n')
+        self.env['PYTHONPATH'] = os.pathsep.join([os.path.dirname(self.script_file)] + os.environ.get('PYTHONPATH', '').split(os.pathsep))
+        subprocess.check_output([utils.PYTHON_INTERPRETTER, script_file, '-m', self.sample_graph, '-p', self.port_config, '--print-data'], env=self.env)
+        self.assertEqual(len(self.get_snapshots()), 2)
+
+    def test_unsupported_content(self):
+        import minigraph
+        snapshot = minigraph.MinigraphSnapshot(self.sample_graph, 'host')
+        snapshot.read_xml()
+        snapshot.save((), {'ports': set(['Ethernet0'])})
+        self.assertIsNone(snapshot.load(()))
+        snapshot.save((), {'ports': ['Ethernet0']})
+        self.assertEqual(snapshot.load(()), {'ports': ['Ethernet0']})
+
+    def test_read_only_directory(self):
+        os.chmod(self.cache_dir, 0o555)
+        try:
+            self.assertEqual(self.get_hostname(), 'switch-t0\n')
+            if os.access(self.cache_dir, os.W_OK):
+                # root ignores the permissions
+                return
+            self.assertFalse(os.path.exists(self.snapshot_dir))
+        finally:
+            os.chmod(self.cache_dir, 0o755)
+
+    def test_multi_asic_sub_role(self):
+        sample_graph = os.path.join(self.work_dir, 'sample-minigraph.xml')
+        shutil.copy(os.path.join(self.test_dir, 'multi_npu_data', 'sample-minigraph.xml'), sample_graph)
+        port_config = os.path.join(self.test_dir, 'multi_npu_data', 'sample_port_config-3.ini')
+        argument = ['-m', sample_graph, '-p', port_config, '-n', 'asic3', '--var-json', 'BGP_NEIGHBOR']
+        parsed = self.run_script(argument)
+        # The sub roles and the asic3 results
+        self.assertEqual(len(self.get_snapshots()), 2)
+        self.assertIn('"admin_status": "up"', parsed)
+        self.assertEqual(self.run_script(argument), parsed)
+
+    def test_streaming_same_output(self):
+        argument = ['-m', self.sample_graph, '-p', self.port_config, '--print-data']
+        parsed = self.run_script(argument)
+        shutil.rmtree(self.snapshot_dir)
+        self.assertEqual(self.run_script(argument + ['--minigraph-streaming']), parsed)
+
+    def test_streaming_multi_asic(self):
+        sample_graph = os.path.join(self.work_dir, 'sample-minigraph.xml')
+        shutil.copy(os.path.join(self.test_dir, 'multi_npu_data', 'sample-minigraph.xml'), sample_graph)
+        port_config = os.path.join(self.test_dir, 'multi_npu_data', 'sample_port_config-0.ini')
+        argument = ['-m', sample_graph, '-p', port_config, '-n', 'asic0', '--print-data']
+        parsed = self.run_script(argument)
+        shutil.rmtree(self.snapshot_dir)
+        self.assertEqual(self.run_script(argument + ['--minigraph-streaming']), parsed)
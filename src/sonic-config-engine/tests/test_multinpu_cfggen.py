@@ -347,3 +347,15 @@ class TestMultiNpuCfgGen(TestCase):
                 }
             }
         )
+
+    def test_all_namespaces(self):
+        asic_port_config = os.path.join(self.test_data_dir, "sample_port_config-{}.ini")
+        argument = "-m \"{}\" --all-namespaces --asic-port-config \"{}\" --print-data".format(self.sample_graph, asic_port_config)
+        output = json.loads(self.run_script(argument))
+        self.assertEqual(sorted(output.keys()), ['', 'asic0', 'asic1', 'asic2', 'asic3'])
+        argument = "-m \"{}\" --print-data".format(self.sample_graph)
+        self.assertDictEqual(output[''], json.loads(self.run_script(argument)))
+        for asic in range(NUM_ASIC):
+            argument = "-m \"{}\" --print-data".format(self.sample_graph)
+            asic_output = json.loads(self.run_script_for_asic(argument, asic, self.port_config[asic]))
+            self.assertDictEqual(output['asic{}'.format(asic)], asic_output)